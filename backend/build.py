@@ -1,5 +1,6 @@
 """Build script gets called on uv/pip build."""
 
+import importlib.util
 import pathlib
 import shutil
 import subprocess
@@ -67,6 +68,23 @@ def copy_copilot(project_root: pathlib.Path):
     copy_directory(copilot_dist, backend_copilot_dir, "copilot assets")
 
 
+def precompress_directory(directory: pathlib.Path):
+    """Write the compressed side files served by chainlit.static_files."""
+    # Loaded from its file, as chainlit and its dependencies may not be installed
+    spec = importlib.util.spec_from_file_location(
+        "chainlit_precompress",
+        pathlib.Path(__file__).resolve().parent / "chainlit" / "precompress.py",
+    )
+    assert spec is not None
+    assert spec.loader is not None
+    precompress = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(precompress)
+
+    print(f"Precompressing assets in {directory}")
+    count = precompress.precompress_directory(directory)
+    print(f"Wrote {count} compressed side files")
+
+
 def build():
     """Main build function with proper error handling"""
 
@@ -93,6 +111,8 @@ def build():
         pnpm_buildui(project_root, pnpm)
         copy_frontend(project_root)
         copy_copilot(project_root)
+        precompress_directory(backend_dir / "chainlit" / "frontend" / "dist")
+        precompress_directory(backend_dir / "chainlit" / "copilot" / "dist")
 
     except KeyboardInterrupt:
         print("\nBuild interrupted by user")
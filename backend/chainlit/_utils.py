@@ -1,8 +1,29 @@
 """Util functions which are explicitly not part of the public API."""
 
+import hashlib
 from pathlib import Path
+from typing import Optional, Union
 
 
 def is_path_inside(child_path: Path, parent_path: Path) -> bool:
     """Check if the child path is inside the parent path."""
     return parent_path.resolve() in child_path.resolve().parents
+
+
+def make_etag(content: Union[str, bytes]) -> str:
+    """Strong ETag of a response body."""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag, using the weak comparison."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag.removeprefix("W/")
+        for candidate in if_none_match.split(",")
+    )
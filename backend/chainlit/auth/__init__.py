@@ -1,3 +1,4 @@
+import dataclasses
 import os
 
 from fastapi import Depends, HTTPException
@@ -13,7 +14,13 @@ from .cookie import (
     get_token_from_cookies,
     set_auth_cookie,
 )
-from .jwt import create_jwt, decode_jwt, get_jwt_secret
+from .jwt import create_jwt, decode_jwt, decode_jwt_with_expiry, get_jwt_secret
+from .user_cache import (
+    cache_user,
+    get_cached_user,
+    get_or_create_persisted_user,
+    invalidate_token,
+)
 
 reuseable_oauth = OAuth2PasswordBearerWithCookie(tokenUrl="/login", auto_error=False)
 
@@ -56,8 +63,11 @@ def get_configuration():
 
 
 async def authenticate_user(token: str = Depends(reuseable_oauth)):
+    if token and (cached_user := get_cached_user(token)):
+        return cached_user
+
     try:
-        user = decode_jwt(token)
+        user, expires_at = decode_jwt_with_expiry(token)
     except Exception as e:
         raise HTTPException(
             status_code=401, detail="Invalid authentication token"
@@ -66,20 +76,22 @@ async def authenticate_user(token: str = Depends(reuseable_oauth)):
     if data_layer := get_data_layer():
         # Get or create persistent user if we've a data layer available.
         try:
-            persisted_user = await data_layer.get_user(user.identifier)
-            if persisted_user is None:
-                persisted_user = await data_layer.create_user(user)
-                assert persisted_user
+            persisted_user = await get_or_create_persisted_user(data_layer, user)
         except Exception as e:
             logger.exception("Unable to get persisted_user from data layer: %s", e)
             return user
 
         if user and user.display_name:
             # Copy ephemeral display_name from authenticated user to persistent user.
-            persisted_user.display_name = user.display_name
+            # The persisted user may be shared by concurrent lookups, so it is copied.
+            persisted_user = dataclasses.replace(
+                persisted_user, display_name=user.display_name
+            )
 
+        cache_user(token, persisted_user, expires_at)
         return persisted_user
 
+    cache_user(token, user, expires_at)
     return user
 
 
@@ -93,8 +105,10 @@ async def get_current_user(token: str = Depends(reuseable_oauth)):
 __all__ = [
     "clear_auth_cookie",
     "create_jwt",
+    "decode_jwt",
     "get_configuration",
     "get_current_user",
     "get_token_from_cookies",
+    "invalidate_token",
     "set_auth_cookie",
 ]
@@ -0,0 +1,85 @@
+import asyncio
+import hashlib
+import time
+from typing import Dict, Union
+
+from chainlit.config import config
+from chainlit.config_cache import ConfigCache
+from chainlit.data.base import BaseDataLayer
+from chainlit.user import PersistedUser, User
+
+# Maximum number of tokens whose user is kept in memory
+AUTH_CACHE_SIZE = 1024
+
+# Token hash -> user authenticated by the token
+_authenticated_users: ConfigCache[Union[User, PersistedUser]] = ConfigCache(
+    maxsize=AUTH_CACHE_SIZE
+)
+# User identifier -> pending lookup of the persisted user
+_user_lookups: Dict[str, "asyncio.Task[PersistedUser]"] = {}
+
+
+def _token_key(token: str) -> str:
+    # Tokens are credentials, only their hash is kept
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def get_cached_user(token: str) -> Union[User, PersistedUser, None]:
+    """Get the user authenticated by a token, if it was verified recently."""
+    if config.project.auth_cache_ttl <= 0:
+        return None
+    return _authenticated_users.get(_token_key(token))
+
+
+def cache_user(token: str, user: Union[User, PersistedUser], expires_at: float):
+    """
+    Cache the user authenticated by a token, until the token expires.
+
+    Entries live at most project.auth_cache_ttl seconds, so that changes to the
+    persisted user are eventually picked up.
+    """
+    ttl = min(float(config.project.auth_cache_ttl), expires_at - time.time())
+    if ttl > 0:
+        _authenticated_users.set(_token_key(token), user, ttl=ttl)
+
+
+def invalidate_token(token: str):
+    """Forget the user authenticated by a token, e.g. when logging out."""
+    _authenticated_users.pop(_token_key(token))
+
+
+def clear_user_cache():
+    _authenticated_users.clear()
+
+
+async def _get_or_create_user(data_layer: BaseDataLayer, user: User) -> PersistedUser:
+    persisted_user = await data_layer.get_user(user.identifier)
+    if persisted_user is None:
+        persisted_user = await data_layer.create_user(user)
+        assert persisted_user
+    return persisted_user
+
+
+async def get_or_create_persisted_user(
+    data_layer: BaseDataLayer, user: User
+) -> PersistedUser:
+    """
+    Get the persisted user of an authenticated user, creating it if needed.
+
+    Concurrent calls for the same identifier, e.g. the burst of requests of a
+    client loading the app, share a single data layer lookup.
+    """
+    identifier = user.identifier
+    task = _user_lookups.get(identifier)
+    if task is None or task.get_loop() is not asyncio.get_running_loop():
+        task = asyncio.ensure_future(_get_or_create_user(data_layer, user))
+        _user_lookups[identifier] = task
+
+        def forget(done: "asyncio.Task[PersistedUser]"):
+            if _user_lookups.get(identifier) is done:
+                del _user_lookups[identifier]
+
+        task.add_done_callback(forget)
+
+    # A cancelled caller must not cancel the lookup awaited by the others
+    return await asyncio.shield(task)
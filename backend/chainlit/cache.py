@@ -1,8 +1,19 @@
+import asyncio
+import functools
+import hashlib
 import importlib
 import importlib.util
+import inspect
 import os
+import pickle
+import sqlite3
 import threading
-from typing import Any
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple, TypedDict
+
+from asyncer import asyncify
 
 from chainlit.config import config
 from chainlit.logger import logger
@@ -40,23 +51,321 @@ def init_lc_cache():
                 )
 
 
-_cache: dict[tuple, Any] = {}
-_cache_lock = threading.Lock()
+class CacheStats(TypedDict):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    disk_hits: int
+
+
+# Separates the positional arguments from the keyword arguments in cache keys
+_KWARGS_MARK = object()
+_MISSING: Any = object()
+
+
+class DiskCache:
+    """Second cache tier persisted to a SQLite database, surviving restarts."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                function TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                expires_at REAL,
+                PRIMARY KEY (function, key)
+            )
+            """
+        )
+
+    @staticmethod
+    def _key(key: tuple) -> Optional[str]:
+        # Keys are stored as the hash of their pickle, objects that cannot be
+        # pickled are only cached in memory
+        try:
+            return hashlib.sha256(pickle.dumps(key)).hexdigest()
+        except Exception:
+            return None
+
+    def get(self, function: str, key: tuple) -> Any:
+        if (disk_key := self._key(key)) is None:
+            return _MISSING
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE function = ? AND key = ?",
+                (function, disk_key),
+            ).fetchone()
+        if row is None:
+            return _MISSING
+
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            return _MISSING
+        try:
+            return pickle.loads(value)
+        except Exception as e:
+            logger.warning(f"Failed to load cached {function} from {self.path}: {e!s}")
+            return _MISSING
+
+    def set(self, function: str, key: tuple, value: Any, ttl: Optional[float]):
+        if (disk_key := self._key(key)) is None:
+            return
+        try:
+            data = pickle.dumps(value)
+        except Exception as e:
+            logger.debug(f"Not caching {function} to disk: {e!s}")
+            return
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (function, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (function, disk_key, data, expires_at),
+            )
+
+    def clear(self, function: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE function = ?", (function,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class FunctionCache:
+    """
+    Results of a function, keyed by its arguments.
+
+    Holds at most `maxsize` results (unbounded when None), evicting the least
+    recently used ones, for at most `ttl` seconds (forever when None). Concurrent
+    misses on the same key compute the result once: the other callers wait for
+    it instead of holding up the calls for other keys.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: Optional[int] = None,
+        ttl: Optional[float] = None,
+        disk: Optional[DiskCache] = None,
+    ):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        # Key -> (value, expiry time or None)
+        self._entries: OrderedDict[tuple, Tuple[Any, Optional[float]]] = OrderedDict()
+        # Only guards the bookkeeping, never held while computing a result
+        self._lock = threading.Lock()
+        # Key -> event set once the pending computation of the key is over
+        self._pending: Dict[tuple, threading.Event] = {}
+        self._pending_async: Dict[tuple, asyncio.Event] = {}
+
+    def _lookup(self, key: tuple) -> Any:
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            return _MISSING
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            return _MISSING
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def _store(self, key: tuple, value: Any):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while self.maxsize is not None and len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _load_from_disk(self, key: tuple) -> Any:
+        if self.disk is None:
+            return _MISSING
+        value = self.disk.get(self.name, key)
+        if value is not _MISSING:
+            self.disk_hits += 1
+            self._store(key, value)
+        return value
+
+    def _compute(self, key: tuple, func: Callable[..., Any], args, kwargs) -> Any:
+        value = self._load_from_disk(key)
+        if value is _MISSING:
+            value = func(*args, **kwargs)
+            if self.disk is not None:
+                self.disk.set(self.name, key, value, self.ttl)
+            self._store(key, value)
+        return value
+
+    def get_or_compute(self, key: tuple, func: Callable[..., Any], args, kwargs):
+        while True:
+            with self._lock:
+                value = self._lookup(key)
+                if value is not _MISSING:
+                    return value
+                event = self._pending.get(key)
+                if event is None:
+                    event = self._pending[key] = threading.Event()
+                    self.misses += 1
+                    break
 
+            # Computed by another thread, read it from the cache once done. If it
+            # failed, one of the waiting threads computes it in turn.
+            event.wait()
 
-def cache(func):
-    def wrapper(*args, **kwargs):
-        # Create a cache key based on the function name, arguments, and keyword arguments
-        cache_key = (
-            (func.__name__,) + args + tuple((k, v) for k, v in sorted(kwargs.items()))
+        try:
+            return self._compute(key, func, args, kwargs)
+        finally:
+            with self._lock:
+                del self._pending[key]
+            event.set()
+
+    async def aget_or_compute(self, key: tuple, func: Callable[..., Any], args, kwargs):
+        while True:
+            with self._lock:
+                value = self._lookup(key)
+                if value is not _MISSING:
+                    return value
+                event = self._pending_async.get(key)
+                if event is None:
+                    event = self._pending_async[key] = asyncio.Event()
+                    self.misses += 1
+                    break
+
+            await event.wait()
+
+        try:
+            value = await asyncify(self._load_from_disk)(key)
+            if value is _MISSING:
+                value = await func(*args, **kwargs)
+                if self.disk is not None:
+                    await asyncify(self.disk.set)(self.name, key, value, self.ttl)
+                self._store(key, value)
+            return value
+        finally:
+            with self._lock:
+                del self._pending_async[key]
+            event.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.disk is not None:
+            self.disk.clear(self.name)
+
+    def stats(self) -> CacheStats:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "disk_hits": self.disk_hits,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _CacheRegistry:
+    """Caches of every decorated function, to clear or count them at once."""
+
+    def __init__(self):
+        self._caches: weakref.WeakSet[FunctionCache] = weakref.WeakSet()
+
+    def add(self, function_cache: FunctionCache):
+        self._caches.add(function_cache)
+
+    def clear(self):
+        for function_cache in list(self._caches):
+            with function_cache._lock:
+                function_cache._entries.clear()
+
+    def __len__(self) -> int:
+        return sum(len(function_cache) for function_cache in list(self._caches))
+
+
+_cache = _CacheRegistry()
+_disk_caches: Dict[str, DiskCache] = {}
+
+
+def _get_disk_cache(path: str) -> DiskCache:
+    path = os.path.abspath(path)
+    if path not in _disk_caches:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _disk_caches[path] = DiskCache(path)
+    return _disk_caches[path]
+
+
+def cache(
+    func: Optional[Callable] = None,
+    *,
+    maxsize: Optional[int] = None,
+    ttl: Optional[float] = None,
+    disk: Optional[str] = None,
+):
+    """
+    Cache the results of a function, or of a coroutine function, per arguments.
+
+    Can be used bare (`@cache`) or with options (`@cache(maxsize=32, ttl=600)`).
+    Arguments must be hashable. `disk` is the path of a SQLite database results
+    are also written to, for expensive loads worth keeping across restarts. Such
+    results (and arguments) must be picklable.
+
+    The decorated function exposes `cache_info()` and `cache_clear()`.
+    """
+
+    def decorator(func: Callable):
+        function_cache = FunctionCache(
+            f"{func.__module__}.{func.__qualname__}",
+            maxsize=maxsize,
+            ttl=ttl,
+            disk=_get_disk_cache(disk) if disk else None,
         )
+        _cache.add(function_cache)
+
+        def make_key(args, kwargs) -> tuple:
+            if not kwargs:
+                return args
+            return args + (_KWARGS_MARK,) + tuple(sorted(kwargs.items()))
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await function_cache.aget_or_compute(
+                    make_key(args, kwargs), func, args, kwargs
+                )
+
+            wrapper: Any = async_wrapper
+        else:
+
+            @functools.wraps(func)
+            def sync_wrapper(*args, **kwargs):
+                return function_cache.get_or_compute(
+                    make_key(args, kwargs), func, args, kwargs
+                )
 
-        with _cache_lock:
-            # Check if the result is already in the cache
-            if cache_key not in _cache:
-                # If not, call the function and store the result in the cache
-                _cache[cache_key] = func(*args, **kwargs)
+            wrapper = sync_wrapper
 
-        return _cache[cache_key]
+        wrapper.cache_info = function_cache.stats
+        wrapper.cache_clear = function_cache.clear
+        return wrapper
 
-    return wrapper
+    if func is not None:
+        return decorator(func)
+    return decorator
@@ -1,11 +1,14 @@
-from typing import TYPE_CHECKING, Dict, List
+from typing import TYPE_CHECKING, List
 
 from chainlit.context import context
+from chainlit.session_store import InMemorySessionStore, approximate_size
 
 if TYPE_CHECKING:
     from chainlit.message import Message
 
-chat_contexts: Dict[str, List["Message"]] = {}
+chat_contexts: InMemorySessionStore[List["Message"]] = InMemorySessionStore(
+    "chat_contexts"
+)
 
 
 class ChatContext:
@@ -28,6 +31,7 @@ class ChatContext:
 
         if message not in chat_contexts[context.session.id]:
             chat_contexts[context.session.id].append(message)
+            chat_contexts.grow(context.session.id, approximate_size(message))
 
         return message
 
@@ -40,6 +44,7 @@ class ChatContext:
 
         if message in chat_contexts[context.session.id]:
             chat_contexts[context.session.id].remove(message)
+            chat_contexts.grow(context.session.id, -approximate_size(message))
             return True
 
         return False
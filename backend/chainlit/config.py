@@ -1,7 +1,9 @@
+import hashlib
 import json
 import os
 import site
 import sys
+from collections import OrderedDict
 from importlib import util
 from pathlib import Path
 from typing import (
@@ -13,6 +15,7 @@ from typing import (
     List,
     Literal,
     Optional,
+    Tuple,
     Union,
 )
 
@@ -90,6 +93,30 @@ mask_user_env = false
 # Authorized origins
 allow_origins = ["*"]
 
+# Coalesce streamed tokens into a single frame sent at most every N milliseconds (0 sends every token immediately)
+stream_token_interval_ms = 0
+
+# Flush a coalesced token frame early once it reaches this size (in bytes)
+stream_token_max_bytes = 4096
+
+# Memory (in MB) sessions may use before the least recently used disconnected ones are evicted (0 disables the limit)
+session_memory_limit_mb = 0
+
+# SQLite database evicted user sessions and chat contexts spill to, instead of being dropped
+# session_spill_path = ".chainlit/sessions.db"
+
+# Hash algorithm (any hashlib algorithm, e.g. "sha256") used to fingerprint uploaded files as they are written to disk
+# upload_hash_algorithm = "sha256"
+
+# Store the content of identical session files once, deleting it when the last session referencing it is deleted
+deduplicate_files = false
+
+# Seconds the results of set_chat_profiles, set_starters and set_starter_categories are cached for, per user and language (0 disables the cache)
+settings_callbacks_cache_ttl = 0
+
+# Seconds an authenticated user is cached for, per token, sparing the JWT verification and the data layer lookup on every request (0 disables the cache)
+auth_cache_ttl = 60
+
 [features]
 # Process and display HTML in messages. This can be a security risk (see https://stackoverflow.com/questions/19603097/why-is-it-dangerous-to-render-user-generated-html-or-javascript)
 unsafe_allow_html = false
@@ -458,6 +485,33 @@ class ProjectSettings(BaseModel):
     persist_user_env: Optional[bool] = False
     # Whether to mask user environment variables (API keys) in the UI with password type
     mask_user_env: Optional[bool] = False
+    # Interval (in milliseconds) during which streamed tokens are coalesced into a single frame. 0 disables coalescing.
+    stream_token_interval_ms: int = 0
+    # Size (in bytes) at which a coalesced token frame is flushed before the interval elapses
+    stream_token_max_bytes: int = 4096
+    # Memory (in MB) sessions may use before the least recently used disconnected ones are evicted. 0 disables the limit.
+    session_memory_limit_mb: int = 0
+    # Path of the SQLite database evicted user sessions and chat contexts spill to
+    session_spill_path: Optional[str] = None
+    # Hash algorithm used to fingerprint uploaded files, computed as they are written to disk
+    upload_hash_algorithm: Optional[str] = None
+    # Store the content of identical session files once, shared by the sessions referencing it
+    deduplicate_files: bool = False
+    # Seconds the results of the settings callbacks are cached for, per user and language. 0 disables the cache.
+    settings_callbacks_cache_ttl: int = 0
+    # Seconds an authenticated user is cached for, per token. 0 disables the cache.
+    auth_cache_ttl: int = 60
+
+
+# Incremented whenever the config is loaded or reloaded, so that what is derived from it can be cached
+_config_generation = 0
+
+# Maximum number of configs merged with chat profile overrides kept in memory
+OVERRIDES_CACHE_SIZE = 128
+# (base config id, profile, overrides hash, config generation) -> (base config, merged config)
+_overrides_cache: "OrderedDict[tuple, Tuple[ChainlitConfig, ChainlitConfig]]" = (
+    OrderedDict()
+)
 
 
 class ChainlitConfigOverrides(BaseModel):
@@ -538,6 +592,37 @@ class ChainlitConfig(BaseSettings):
         return translation
 
     def with_overrides(
+        self,
+        overrides: "ChainlitConfigOverrides | None",
+        profile: Optional[str] = None,
+    ) -> "ChainlitConfig":
+        """
+        Return a copy of the config with the overrides of a chat profile applied.
+
+        The merged config is cached per profile, overrides and config generation,
+        and the same instance is shared by every caller: it must not be mutated.
+        """
+        overrides_json = (
+            overrides.model_dump_json(exclude_unset=True) if overrides else ""
+        )
+        key = (
+            id(self),
+            profile,
+            hashlib.sha256(overrides_json.encode()).hexdigest(),
+            _config_generation,
+        )
+        if cached := _overrides_cache.get(key):
+            _overrides_cache.move_to_end(key)
+            return cached[1]
+
+        merged_config = self._merge_overrides(overrides)
+        # Keep a reference to the base config, so that its id is not reused
+        _overrides_cache[key] = (self, merged_config)
+        while len(_overrides_cache) > OVERRIDES_CACHE_SIZE:
+            _overrides_cache.popitem(last=False)
+        return merged_config
+
+    def _merge_overrides(
         self, overrides: "ChainlitConfigOverrides | None"
     ) -> "ChainlitConfig":
         base = self.model_dump()
@@ -659,9 +744,14 @@ def load_settings():
         }
 
 
+def get_config_generation() -> int:
+    """Number of times the configuration has been loaded or reloaded."""
+    return _config_generation
+
+
 def reload_config():
     """Reload the configuration from the config file."""
-    global config
+    global config, _config_generation
     if config is None:
         return
 
@@ -680,12 +770,16 @@ def reload_config():
         config.run.module_name = original_module_name
     config.project = new_cfg.project
     config.code = new_cfg.code
+    _config_generation += 1
+    _overrides_cache.clear()
 
 
 def load_config():
     """Load the configuration from the config file."""
+    global _config_generation
     init_config()
     settings = load_settings()
+    _config_generation += 1
     return ChainlitConfig(**settings)
 
 
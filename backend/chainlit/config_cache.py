@@ -0,0 +1,62 @@
+import time
+from collections import OrderedDict
+from typing import Any, Generic, Hashable, Optional, Tuple, TypeVar
+
+from chainlit.config import get_config_generation
+
+V = TypeVar("V")
+
+_MISSING: Any = object()
+
+
+class ConfigCache(Generic[V]):
+    """
+    Cache of values derived from the config, dropped whenever it is (re)loaded.
+
+    Holds at most `maxsize` entries, evicting the least recently used ones.
+    Entries can also be given a time to live, for values that depend on more
+    than the config, like the results of user callbacks.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.generation = get_config_generation()
+        # Key -> (value, expiry time or None)
+        self._entries: OrderedDict[Hashable, Tuple[V, Optional[float]]] = OrderedDict()
+
+    def _check_generation(self):
+        if (generation := get_config_generation()) != self.generation:
+            self._entries.clear()
+            self.generation = generation
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        self._check_generation()
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            return default
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None):
+        self._check_generation()
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[0]
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,15 +1,41 @@
 import os
 import warnings
-from typing import Optional
+from typing import Any, Dict, Optional
 
 from .base import BaseDataLayer
 from .utils import (
     queue_until_user_message as queue_until_user_message,  # TODO: Consider deprecating re-export.; Redundant alias tells type checkers to STFU.
+    sign_element_urls as sign_element_urls,
 )
 
 _data_layer: Optional[BaseDataLayer] = None
 _data_layer_initialized = False
 
+# Environment variables tuning the connection pool of the default data layer
+DATABASE_POOL_SETTINGS = {
+    "DATABASE_POOL_MIN_SIZE": ("pool_min_size", int),
+    "DATABASE_POOL_MAX_SIZE": ("pool_max_size", int),
+    "DATABASE_POOL_ACQUIRE_TIMEOUT": ("pool_acquire_timeout", float),
+    "DATABASE_POOL_MAX_INACTIVE_LIFETIME": (
+        "pool_max_inactive_connection_lifetime",
+        float,
+    ),
+    "DATABASE_COMMAND_TIMEOUT": ("command_timeout", float),
+    "DATABASE_STATEMENT_CACHE_SIZE": ("statement_cache_size", int),
+    "DATABASE_STATEMENT_CACHE_LIFETIME": ("max_cached_statement_lifetime", int),
+}
+
+
+def _database_pool_settings() -> Dict[str, Any]:
+    settings: Dict[str, Any] = {}
+    for env_var, (name, cast) in DATABASE_POOL_SETTINGS.items():
+        if value := os.environ.get(env_var):
+            try:
+                settings[name] = cast(value)
+            except ValueError:
+                warnings.warn(f"Ignoring invalid {env_var}: {value!r}")
+    return settings
+
 
 def get_data_layer():
     global _data_layer, _data_layer_initialized
@@ -93,8 +119,19 @@ def get_data_layer():
                         storage_key=azure_storage_key,
                     )
 
+                # Requires the indexes added by ChainlitDataLayer.create_search_index
+                full_text_search = os.environ.get(
+                    "DATABASE_FULL_TEXT_SEARCH", ""
+                ).lower() in ("1", "true")
+
                 _data_layer = ChainlitDataLayer(
-                    database_url=database_url, storage_client=storage_client
+                    database_url=database_url,
+                    storage_client=storage_client,
+                    full_text_search=full_text_search,
+                    search_language=os.environ.get(
+                        "DATABASE_SEARCH_LANGUAGE", "simple"
+                    ),
+                    **_database_pool_settings(),
                 )
             elif api_key := os.environ.get("LITERAL_API_KEY"):
                 # When LITERAL_API_KEY is defined, use Literal AI data layer
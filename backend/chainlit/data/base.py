@@ -5,6 +5,8 @@ from chainlit.types import (
     Feedback,
     PaginatedResponse,
     Pagination,
+    ResumeCursor,
+    ThreadDelta,
     ThreadDict,
     ThreadFilter,
 )
@@ -91,6 +93,19 @@ class BaseDataLayer(ABC):
     async def get_thread(self, thread_id: str) -> "Optional[ThreadDict]":
         pass
 
+    async def get_thread_steps_since(
+        self, thread_id: str, cursor: ResumeCursor
+    ) -> Optional[ThreadDelta]:
+        """
+        Get the steps of a thread from the cursor step on, and their elements.
+
+        The cursor step is included, as it may have been updated since the client
+        received it. Returns None if the cursor step is not part of the thread, in
+        which case the whole thread is sent to the client. Data layers which do not
+        implement it always send the whole thread.
+        """
+        return None
+
     @abstractmethod
     async def update_thread(
         self,
@@ -1,14 +1,33 @@
 import json
+import re
 import uuid
+import weakref
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypedDict,
+    Union,
+)
 
 import aiofiles
 import asyncpg  # type: ignore
 
+from chainlit.context import ChainlitContextException, context
 from chainlit.data.base import BaseDataLayer
 from chainlit.data.storage_clients.base import BaseStorageClient
-from chainlit.data.utils import queue_until_user_message
+from chainlit.data.utils import (
+    URL_SIGNING_CONCURRENCY,
+    queue_until_user_message,
+    sign_element_urls,
+)
+from chainlit.data.write_behind import WriteBehindQueue
 from chainlit.element import ElementDict
 from chainlit.logger import logger
 from chainlit.step import StepDict
@@ -18,6 +37,8 @@ from chainlit.types import (
     PageInfo,
     PaginatedResponse,
     Pagination,
+    ResumeCursor,
+    ThreadDelta,
     ThreadDict,
     ThreadFilter,
 )
@@ -36,6 +57,246 @@ if TYPE_CHECKING:
 
 ISO_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
 
+UPSERT_STEP_QUERY = """
+INSERT INTO "Step" (
+    id, "threadId", "parentId", input, metadata, name, output,
+    type, "startTime", "endTime", "showInput", "isError"
+) VALUES (
+    $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12
+)
+ON CONFLICT (id) DO UPDATE SET
+    "parentId" = COALESCE(EXCLUDED."parentId", "Step"."parentId"),
+    input = COALESCE(NULLIF(EXCLUDED.input, ''), "Step".input),
+    metadata = CASE
+        WHEN EXCLUDED.metadata <> '{}' THEN EXCLUDED.metadata
+        ELSE "Step".metadata
+    END,
+    name = COALESCE(EXCLUDED.name, "Step".name),
+    output = COALESCE(NULLIF(EXCLUDED.output, ''), "Step".output),
+    type = CASE
+        WHEN EXCLUDED.type = 'run' THEN "Step".type
+        ELSE EXCLUDED.type
+    END,
+    "threadId" = COALESCE(EXCLUDED."threadId", "Step"."threadId"),
+    "endTime" = COALESCE(EXCLUDED."endTime", "Step"."endTime"),
+    "startTime" = LEAST(EXCLUDED."startTime", "Step"."startTime"),
+    "showInput" = COALESCE(EXCLUDED."showInput", "Step"."showInput"),
+    "isError" = COALESCE(EXCLUDED."isError", "Step"."isError")
+"""
+
+UPSERT_ELEMENT_QUERY = """
+INSERT INTO "Element" (
+    id, "threadId", "stepId", metadata, mime, name, "objectKey", url,
+    "chainlitKey", display, size, language, page, props
+) VALUES (
+    $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14
+)
+ON CONFLICT (id) DO UPDATE SET
+    props = EXCLUDED.props
+"""
+
+# Placeholders making sure the rows referenced by a batch of writes exist
+INSERT_THREAD_PLACEHOLDER_QUERY = """
+INSERT INTO "Thread" (id, metadata, "updatedAt")
+VALUES ($1, $2, $3)
+ON CONFLICT (id) DO NOTHING
+"""
+
+INSERT_STEP_PLACEHOLDER_QUERY = """
+INSERT INTO "Step" (
+    id, "threadId", metadata, type, "startTime", "endTime", "showInput", "isError"
+) VALUES (
+    $1, $2, $3, $4, $5, $6, $7, $8
+)
+ON CONFLICT (id) DO NOTHING
+"""
+
+# Without write-behind, upsert a step along with placeholders for its thread and
+# parent step, when they don't exist yet, in a single round trip. Takes the parameters of UPSERT_STEP_QUERY.
+# Foreign keys are checked at the end of the statement, once every row is written.
+CREATE_STEP_QUERY = (
+    """
+WITH thread AS (
+    INSERT INTO "Thread" (id, metadata, "updatedAt")
+    SELECT $2, '{}', $9
+    WHERE $2 IS NOT NULL
+    ON CONFLICT (id) DO NOTHING
+), parent AS (
+    INSERT INTO "Step" (
+        id, "threadId", metadata, type, "startTime", "endTime", "showInput", "isError"
+    )
+    SELECT $3, $2, '{}', 'run', $9, $9, 'json', false
+    WHERE $3 IS NOT NULL
+    ON CONFLICT (id) DO NOTHING
+)"""
+    + UPSERT_STEP_QUERY
+)
+
+# Same for an element, its thread and its step. Takes the parameters of
+# UPSERT_ELEMENT_QUERY, followed by the timestamp of the placeholders.
+CREATE_ELEMENT_QUERY = (
+    """
+WITH thread AS (
+    INSERT INTO "Thread" (id, metadata, "updatedAt")
+    SELECT $2, '{}', $15
+    WHERE $2 IS NOT NULL
+    ON CONFLICT (id) DO NOTHING
+), step AS (
+    INSERT INTO "Step" (
+        id, "threadId", metadata, type, "startTime", "endTime", "showInput", "isError"
+    )
+    SELECT $3, $2, '{}', 'run', $15, $15, 'json', false
+    ON CONFLICT (id) DO NOTHING
+)"""
+    + UPSERT_ELEMENT_QUERY
+)
+
+GET_THREAD_QUERY = """
+SELECT
+    t.*,
+    u.identifier AS user_identifier,
+    (
+        SELECT COALESCE(json_agg(s ORDER BY s."startTime"), '[]'::json)
+        FROM (
+            SELECT
+                s.*,
+                f.id feedback_id,
+                f.value feedback_value,
+                f."comment" feedback_comment
+            FROM "Step" s LEFT JOIN "Feedback" f ON s.id = f."stepId"
+            WHERE s."threadId" = t.id
+        ) s
+    )::text AS steps,
+    (
+        SELECT COALESCE(json_agg(e), '[]'::json)
+        FROM "Element" e
+        WHERE e."threadId" = t.id
+    )::text AS elements
+FROM "Thread" t
+LEFT JOIN "User" u ON t."userId" = u.id
+WHERE t.id = $1 AND t."deletedAt" IS NULL
+"""
+
+# Steps started since the cursor step, itself included, with their elements. No row
+# is returned if the cursor step is not part of the thread.
+GET_THREAD_STEPS_SINCE_QUERY = """
+WITH cursor_step AS (
+    SELECT s."startTime"
+    FROM "Step" s JOIN "Thread" t ON s."threadId" = t.id
+    WHERE s."threadId" = $1 AND s.id = $2 AND t."deletedAt" IS NULL
+)
+SELECT
+    (
+        SELECT COALESCE(json_agg(s ORDER BY s."startTime"), '[]'::json)
+        FROM (
+            SELECT
+                s.*,
+                f.id feedback_id,
+                f.value feedback_value,
+                f."comment" feedback_comment
+            FROM "Step" s LEFT JOIN "Feedback" f ON s.id = f."stepId"
+            WHERE s."threadId" = $1 AND s."startTime" >= c."startTime"
+        ) s
+    )::text AS steps,
+    (
+        SELECT COALESCE(json_agg(e), '[]'::json)
+        FROM "Element" e JOIN "Step" s ON e."stepId" = s.id
+        WHERE e."threadId" = $1 AND s."startTime" >= c."startTime"
+    )::text AS elements
+FROM cursor_step c
+"""
+
+GET_USER_QUERY = """
+SELECT * FROM "User"
+WHERE identifier = $1
+"""
+
+GET_THREAD_METADATA_QUERY = 'SELECT "metadata" FROM "Thread" WHERE id = $1'
+
+# Queries of the hot paths, by name. Nothing prepares them explicitly: their text
+# never changes, so asyncpg's implicit statement cache of each connection keeps
+# them prepared after their first use. Dynamic queries (update_thread,
+# list_threads) only come in a handful of variants, which fit in the cache as well.
+HOT_PATH_QUERIES = {
+    "upsert_step": UPSERT_STEP_QUERY,
+    "upsert_element": UPSERT_ELEMENT_QUERY,
+    "create_step": CREATE_STEP_QUERY,
+    "create_element": CREATE_ELEMENT_QUERY,
+    "get_thread": GET_THREAD_QUERY,
+    "get_thread_steps_since": GET_THREAD_STEPS_SINCE_QUERY,
+    "get_user": GET_USER_QUERY,
+    "get_thread_metadata": GET_THREAD_METADATA_QUERY,
+}
+_HOT_PATH_QUERY_NAMES = {query: name for name, query in HOT_PATH_QUERIES.items()}
+
+# Names weigh more than messages when ranking search results
+SEARCH_NAME_WEIGHT = 2
+
+# Characters of a name or output that are indexed. Postgres rejects tsvectors over
+# 1MB, which would make the writes of the row fail, not only its search.
+SEARCH_MAX_CHARS = 100_000
+
+
+def full_text_search_migration(language: str = "simple") -> List[str]:
+    """
+    Statements adding the columns and indexes used by full-text search.
+
+    Thread names and step outputs get a generated tsvector column, kept up to
+    date by Postgres (12+), and a GIN index. Only their first SEARCH_MAX_CHARS
+    characters are indexed. The statements are idempotent.
+    """
+    return [
+        f"""
+        ALTER TABLE "Thread" ADD COLUMN IF NOT EXISTS "searchVector" tsvector
+        GENERATED ALWAYS AS (
+            to_tsvector('{language}', left(COALESCE(name, ''), {SEARCH_MAX_CHARS}))
+        ) STORED
+        """,
+        'CREATE INDEX IF NOT EXISTS "Thread_searchVector_idx" ON "Thread" USING GIN ("searchVector")',
+        f"""
+        ALTER TABLE "Step" ADD COLUMN IF NOT EXISTS "searchVector" tsvector
+        GENERATED ALWAYS AS (
+            to_tsvector('{language}', left(COALESCE(output, ''), {SEARCH_MAX_CHARS}))
+        ) STORED
+        """,
+        'CREATE INDEX IF NOT EXISTS "Step_searchVector_idx" ON "Step" USING GIN ("searchVector")',
+    ]
+
+
+# Kind and parameters of a queued write, and whether the thread and step it
+# references were known to exist when it was queued
+PendingWrite = Tuple[str, Dict[str, Any], bool]
+
+
+# Maximum number of thread and step ids remembered per session
+KNOWN_ROWS_LIMIT = 10_000
+
+
+@dataclass
+class KnownRows:
+    """Threads and steps a session has written, which are known to exist."""
+
+    threads: Set[str] = field(default_factory=set)
+    steps: Set[str] = field(default_factory=set)
+
+    def add(self, thread_id: Optional[str] = None, *step_ids: Optional[str]):
+        if len(self.threads) + len(self.steps) >= KNOWN_ROWS_LIMIT:
+            self.threads.clear()
+            self.steps.clear()
+        if thread_id:
+            self.threads.add(thread_id)
+        self.steps.update(step_id for step_id in step_ids if step_id)
+
+    def has(self, thread_id: Optional[str], step_id: Optional[str]) -> bool:
+        return (not thread_id or thread_id in self.threads) and (
+            not step_id or step_id in self.steps
+        )
+
+
+class QueryStats(TypedDict):
+    executions: int
+    hot_path_executions: Dict[str, int]
+
 
 class ChainlitDataLayer(BaseDataLayer):
     def __init__(
@@ -43,19 +304,112 @@ class ChainlitDataLayer(BaseDataLayer):
         database_url: str,
         storage_client: Optional[BaseStorageClient] = None,
         show_logger: bool = False,
+        write_behind: bool = True,
+        write_batch_size: int = 100,
+        write_flush_interval: float = 0.05,
+        write_queue_size: int = 10_000,
+        url_signing_concurrency: int = URL_SIGNING_CONCURRENCY,
+        full_text_search: bool = False,
+        search_language: str = "simple",
+        pool_min_size: int = 10,
+        pool_max_size: int = 10,
+        pool_acquire_timeout: Optional[float] = None,
+        pool_max_inactive_connection_lifetime: float = 300.0,
+        command_timeout: Optional[float] = None,
+        statement_cache_size: int = 100,
+        max_cached_statement_lifetime: int = 300,
     ):
         self.database_url = database_url
         self.pool: Optional[asyncpg.Pool] = None
+        self.pool_min_size = pool_min_size
+        self.pool_max_size = pool_max_size
+        self.pool_acquire_timeout = pool_acquire_timeout
+        self.pool_max_inactive_connection_lifetime = (
+            pool_max_inactive_connection_lifetime
+        )
+        self.command_timeout = command_timeout
+        # Statements prepared and cached by each connection. Set to 0 behind
+        # PgBouncer in transaction mode, which does not support prepared statements.
+        self.statement_cache_size = statement_cache_size
+        self.max_cached_statement_lifetime = max_cached_statement_lifetime
+        # Search threads with the indexes of full_text_search_migration, rather than
+        # scanning their names. Run create_search_index once before enabling it.
+        self.full_text_search = full_text_search
+        if not re.fullmatch(r"[a-z_]+", search_language):
+            raise ValueError(f"Invalid text search configuration: {search_language}")
+        self.search_language = search_language
+        self._executions = 0
+        self._hot_path_executions = dict.fromkeys(HOT_PATH_QUERIES, 0)
+        # Session -> rows it wrote, whose existence does not need to be ensured again
+        self._known_rows: weakref.WeakKeyDictionary[Any, KnownRows] = (
+            weakref.WeakKeyDictionary()
+        )
         self.storage_client = storage_client
         self.show_logger = show_logger
+        # Maximum number of element URLs signed at once when loading a thread
+        self.url_signing_concurrency = url_signing_concurrency
+        # Step and element writes are queued and persisted in batches
+        self.write_queue: Optional[WriteBehindQueue[PendingWrite]] = (
+            WriteBehindQueue(
+                self._flush_writes,
+                max_batch_size=write_batch_size,
+                flush_interval=write_flush_interval,
+                max_size=write_queue_size,
+            )
+            if write_behind
+            else None
+        )
 
     async def connect(self):
         if not self.pool:
-            self.pool = await asyncpg.create_pool(self.database_url)
+            self.pool = await asyncpg.create_pool(
+                self.database_url,
+                min_size=self.pool_min_size,
+                max_size=self.pool_max_size,
+                max_inactive_connection_lifetime=self.pool_max_inactive_connection_lifetime,
+                command_timeout=self.command_timeout,
+                statement_cache_size=self.statement_cache_size,
+                max_cached_statement_lifetime=self.max_cached_statement_lifetime,
+            )
+
+    def _record_statement(self, query: str, executions: int = 1):
+        self._executions += executions
+        if name := _HOT_PATH_QUERY_NAMES.get(query):
+            self._hot_path_executions[name] += executions
+
+    def query_stats(self) -> QueryStats:
+        """
+        Number of queries executed, in total and for each of HOT_PATH_QUERIES.
+
+        Hot path queries are served from the statement cache of their connection
+        once it has run them, unless statement_cache_size is 0 or they were evicted.
+        """
+        return {
+            "executions": self._executions,
+            "hot_path_executions": dict(self._hot_path_executions),
+        }
 
     async def get_current_timestamp(self) -> datetime:
         return datetime.now()
 
+    def _session_known_rows(self) -> KnownRows:
+        """Rows known to exist by the current session, empty outside of a session."""
+        try:
+            session = context.session
+        except ChainlitContextException:
+            return KnownRows()
+        if session not in self._known_rows:
+            self._known_rows[session] = KnownRows()
+        return self._known_rows[session]
+
+    def _forget_rows(
+        self, thread_id: Optional[str] = None, step_id: Optional[str] = None
+    ):
+        """Forget deleted rows, in every session."""
+        for known_rows in list(self._known_rows.values()):
+            known_rows.threads.discard(thread_id)  # type: ignore[arg-type]
+            known_rows.steps.discard(step_id)  # type: ignore[arg-type]
+
     async def execute_query(
         self, query: str, params: Union[Dict, None] = None
     ) -> List[Dict[str, Any]]:
@@ -63,7 +417,10 @@ class ChainlitDataLayer(BaseDataLayer):
             await self.connect()
 
         try:
-            async with self.pool.acquire() as connection:  # type: ignore
+            async with self.pool.acquire(  # type: ignore
+                timeout=self.pool_acquire_timeout
+            ) as connection:
+                self._record_statement(query)
                 try:
                     if params:
                         records = await connection.fetch(query, *params.values())
@@ -82,12 +439,140 @@ class ChainlitDataLayer(BaseDataLayer):
             await self.cleanup()
             raise
 
-    async def get_user(self, identifier: str) -> Optional[PersistedUser]:
-        query = """
-        SELECT * FROM "User"
-        WHERE identifier = $1
+    async def execute_batch(self, statements: List[Tuple[str, List[Tuple]]]):
+        """Run each statement for all its parameter sets, in a single transaction."""
+        if not self.pool:
+            await self.connect()
+
+        try:
+            async with self.pool.acquire(  # type: ignore
+                timeout=self.pool_acquire_timeout
+            ) as connection:
+                try:
+                    async with connection.transaction():
+                        for query, args in statements:
+                            if args:
+                                self._record_statement(query, len(args))
+                                await connection.executemany(query, args)
+                except Exception as e:
+                    logger.error(f"Database error: {e!s}")
+                    raise
+        except (
+            asyncpg.exceptions.ConnectionDoesNotExistError,
+            asyncpg.exceptions.InterfaceError,
+        ) as e:
+            logger.error(f"Connection error: {e!s}")
+            await self.cleanup()
+            raise
+
+    async def flush(self):
+        """Wait for the queued step and element writes to be persisted."""
+        if self.write_queue:
+            await self.write_queue.drain()
+
+    async def _flush_writes(self, writes: List[PendingWrite]):
+        try:
+            await self._write_rows(writes)
+        except (
+            asyncpg.exceptions.ConnectionDoesNotExistError,
+            asyncpg.exceptions.InterfaceError,
+        ):
+            raise
+        except Exception:
+            if len(writes) == 1:
+                raise
+            # A batch mixes the writes of every session and a single bad row rolls
+            # it back: retry the writes one by one, only dropping the bad ones. The
+            # rows they reference are ensured to exist, in case a dropped write
+            # was meant to create them.
+            for kind, params, _ in writes:
+                try:
+                    await self._write_rows([(kind, params, False)])
+                except Exception as e:
+                    logger.error(f"Dropped {kind} write {params['id']}: {e!s}")
+
+    async def _write_rows(self, writes: List[PendingWrite]):
+        """
+        Upsert a batch of steps and elements in a single transaction.
+
+        Like CREATE_STEP_QUERY and CREATE_ELEMENT_QUERY without write-behind, the
+        threads and steps referenced by the batch are created if needed, with one
+        placeholder statement for the whole batch. Rows the writing session is
+        known to have written already are skipped.
         """
-        result = await self.execute_query(query, {"identifier": identifier})
+        # Merge the writes targeting the same row, a multi-row upsert
+        # can't affect the same row twice.
+        steps: Dict[str, Dict[str, Any]] = {}
+        elements: Dict[str, Dict[str, Any]] = {}
+        unknown: Set[Tuple[str, str]] = set()
+        for kind, params, known in writes:
+            rows = steps if kind == "step" else elements
+            if not known:
+                unknown.add((kind, params["id"]))
+            if previous := rows.get(params["id"]):
+                params = {
+                    **previous,
+                    **{k: v for k, v in params.items() if v not in (None, "", "{}")},
+                }
+                if kind == "step":
+                    params["start_time"] = min(
+                        previous["start_time"], params["start_time"]
+                    )
+            rows[params["id"]] = params
+
+        now = await self.get_current_timestamp()
+        unknown_steps = [
+            row for step_id, row in steps.items() if ("step", step_id) in unknown
+        ]
+        unknown_elements = [
+            row
+            for element_id, row in elements.items()
+            if ("element", element_id) in unknown
+        ]
+        thread_ids = {
+            row["thread_id"]
+            for row in [*unknown_steps, *unknown_elements]
+            if row["thread_id"]
+        }
+        parents: Dict[str, Dict[str, Any]] = {}
+        for row in unknown_steps:
+            if row["parent_id"]:
+                parents.setdefault(row["parent_id"], row)
+        for row in unknown_elements:
+            parents.setdefault(row["step_id"], {**row, "start_time": now})
+
+        await self.execute_batch(
+            [
+                (
+                    INSERT_THREAD_PLACEHOLDER_QUERY,
+                    [(thread_id, "{}", now) for thread_id in thread_ids],
+                ),
+                (
+                    INSERT_STEP_PLACEHOLDER_QUERY,
+                    [
+                        (
+                            parent_id,
+                            child["thread_id"],
+                            "{}",
+                            "run",
+                            child["start_time"],
+                            child["start_time"],
+                            "json",
+                            False,
+                        )
+                        for parent_id, child in parents.items()
+                    ],
+                ),
+                (UPSERT_STEP_QUERY, [tuple(row.values()) for row in steps.values()]),
+                (
+                    UPSERT_ELEMENT_QUERY,
+                    [tuple(row.values()) for row in elements.values()],
+                ),
+            ]
+        )
+
+    async def get_user(self, identifier: str) -> Optional[PersistedUser]:
+        result = await self.execute_query(GET_USER_QUERY, {"identifier": identifier})
         if not result or len(result) == 0:
             return None
         row = result[0]
@@ -156,40 +641,32 @@ class ChainlitDataLayer(BaseDataLayer):
         if not element.for_id:
             return
 
-        if element.thread_id:
-            query = 'SELECT id FROM "Thread" WHERE id = $1'
-            results = await self.execute_query(query, {"thread_id": element.thread_id})
-            if not results:
-                await self.update_thread(thread_id=element.thread_id)
-
-        if element.for_id:
-            query = 'SELECT id FROM "Step" WHERE id = $1'
-            results = await self.execute_query(query, {"step_id": element.for_id})
-            if not results:
-                await self.create_step(
-                    {
-                        "id": element.for_id,
-                        "metadata": {},
-                        "type": "run",
-                        "start_time": await self.get_current_timestamp(),
-                        "end_time": await self.get_current_timestamp(),
-                    }
-                )
+        path = await self._upload_element(element)
+        params = self._element_params(element, path)
+
+        known_rows = self._session_known_rows()
+        known = known_rows.has(element.thread_id, element.for_id)
+        if self.write_queue:
+            await self.write_queue.put(("element", params, known))
+        elif known:
+            await self.execute_query(UPSERT_ELEMENT_QUERY, params)
+        else:
+            # Create the missing thread and step in the same round trip
+            await self.execute_query(
+                CREATE_ELEMENT_QUERY,
+                {**params, "now": await self.get_current_timestamp()},
+            )
+        known_rows.add(element.thread_id, element.for_id)
 
+    async def _upload_element(self, element: "Element") -> Optional[str]:
+        """Upload the element file to the storage client, return its object key."""
         # Handle file uploads only if storage_client is configured
         path = None
         if self.storage_client:
-            content: Optional[Union[bytes, str]] = None
-
-            if element.path:
-                async with aiofiles.open(element.path, "rb") as f:
-                    content = await f.read()
-            elif element.content:
-                content = element.content
-            elif not element.url:
+            if not (element.path or element.content or element.url):
                 raise ValueError("Element url, path or content must be provided")
 
-            if content is not None:
+            if element.path or element.content:
                 if element.thread_id:
                     path = f"threads/{element.thread_id}/files/{element.id}"
                 else:
@@ -203,13 +680,26 @@ class ChainlitDataLayer(BaseDataLayer):
                     )
                     else None
                 )
-                await self.storage_client.upload_file(
-                    object_key=path,
-                    data=content,
-                    mime=element.mime or "application/octet-stream",
-                    overwrite=True,
-                    content_disposition=content_disposition,
-                )
+                mime = element.mime or "application/octet-stream"
+
+                if element.path:
+                    # Stream the file rather than loading it in memory
+                    async with aiofiles.open(element.path, "rb") as f:
+                        await self.storage_client.upload_stream(
+                            object_key=path,
+                            stream=f,
+                            mime=mime,
+                            overwrite=True,
+                            content_disposition=content_disposition,
+                        )
+                elif element.content:
+                    await self.storage_client.upload_file(
+                        object_key=path,
+                        data=element.content,
+                        mime=mime,
+                        overwrite=True,
+                        content_disposition=content_disposition,
+                    )
 
         else:
             # Log warning only if element has file content that needs uploading
@@ -219,18 +709,10 @@ class ChainlitDataLayer(BaseDataLayer):
                     "File will not be uploaded."
                 )
 
-        # Always persist element metadata to database
-        query = """
-        INSERT INTO "Element" (
-            id, "threadId", "stepId", metadata, mime, name, "objectKey", url,
-            "chainlitKey", display, size, language, page, props
-        ) VALUES (
-            $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14
-        )
-        ON CONFLICT (id) DO UPDATE SET
-            props = EXCLUDED.props
-        """
-        params = {
+        return path
+
+    def _element_params(self, element: "Element", path: Optional[str]) -> Dict:
+        return {
             "id": element.id,
             "thread_id": element.thread_id,
             "step_id": element.for_id,
@@ -254,11 +736,11 @@ class ChainlitDataLayer(BaseDataLayer):
             "page": getattr(element, "page", None),
             "props": json.dumps(getattr(element, "props", {})),
         }
-        await self.execute_query(query, params)
 
     async def get_element(
         self, thread_id: str, element_id: str
     ) -> Optional[ElementDict]:
+        await self.flush()
         query = """
         SELECT * FROM "Element"
         WHERE id = $1 AND "threadId" = $2
@@ -294,6 +776,7 @@ class ChainlitDataLayer(BaseDataLayer):
 
     @queue_until_user_message()
     async def delete_element(self, element_id: str, thread_id: Optional[str] = None):
+        await self.flush()
         query = """
         SELECT * FROM "Element"
         WHERE id = $1
@@ -319,62 +802,27 @@ class ChainlitDataLayer(BaseDataLayer):
 
     @queue_until_user_message()
     async def create_step(self, step_dict: StepDict):
-        if step_dict.get("threadId"):
-            thread_query = 'SELECT id FROM "Thread" WHERE id = $1'
-            thread_results = await self.execute_query(
-                thread_query, {"thread_id": step_dict["threadId"]}
-            )
-            if not thread_results:
-                await self.update_thread(thread_id=step_dict["threadId"])
-
-        if step_dict.get("parentId"):
-            parent_query = 'SELECT id FROM "Step" WHERE id = $1'
-            parent_results = await self.execute_query(
-                parent_query, {"parent_id": step_dict["parentId"]}
-            )
-            if not parent_results:
-                await self.create_step(
-                    {
-                        "id": step_dict["parentId"],
-                        "metadata": {},
-                        "type": "run",
-                        "createdAt": step_dict.get("createdAt"),
-                    }
-                )
-
-        query = """
-        INSERT INTO "Step" (
-            id, "threadId", "parentId", input, metadata, name, output,
-            type, "startTime", "endTime", "showInput", "isError"
-        ) VALUES (
-            $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12
-        )
-        ON CONFLICT (id) DO UPDATE SET
-            "parentId" = COALESCE(EXCLUDED."parentId", "Step"."parentId"),
-            input = COALESCE(NULLIF(EXCLUDED.input, ''), "Step".input),
-            metadata = CASE
-                WHEN EXCLUDED.metadata <> '{}' THEN EXCLUDED.metadata
-                ELSE "Step".metadata
-            END,
-            name = COALESCE(EXCLUDED.name, "Step".name),
-            output = COALESCE(NULLIF(EXCLUDED.output, ''), "Step".output),
-            type = CASE
-                WHEN EXCLUDED.type = 'run' THEN "Step".type
-                ELSE EXCLUDED.type
-            END,
-            "threadId" = COALESCE(EXCLUDED."threadId", "Step"."threadId"),
-            "endTime" = COALESCE(EXCLUDED."endTime", "Step"."endTime"),
-            "startTime" = LEAST(EXCLUDED."startTime", "Step"."startTime"),
-            "showInput" = COALESCE(EXCLUDED."showInput", "Step"."showInput"),
-            "isError" = COALESCE(EXCLUDED."isError", "Step"."isError")
-        """
+        params = await self._step_params(step_dict)
+
+        known_rows = self._session_known_rows()
+        thread_id, parent_id = params["thread_id"], params["parent_id"]
+        known = known_rows.has(thread_id, parent_id)
+        if self.write_queue:
+            await self.write_queue.put(("step", params, known))
+        elif known:
+            await self.execute_query(UPSERT_STEP_QUERY, params)
+        else:
+            # Create the missing thread and parent step in the same round trip
+            await self.execute_query(CREATE_STEP_QUERY, params)
+        known_rows.add(thread_id, parent_id, params["id"])
 
+    async def _step_params(self, step_dict: StepDict) -> Dict:
         timestamp = await self.get_current_timestamp()
         created_at = step_dict.get("createdAt")
         if created_at:
             timestamp = datetime.strptime(created_at, ISO_FORMAT)
 
-        params = {
+        return {
             "id": step_dict["id"],
             "thread_id": step_dict.get("threadId"),
             "parent_id": step_dict.get("parentId"),
@@ -388,7 +836,6 @@ class ChainlitDataLayer(BaseDataLayer):
             "show_input": str(step_dict.get("showInput", "json")),
             "is_error": step_dict.get("isError", False),
         }
-        await self.execute_query(query, params)
 
     @queue_until_user_message()
     async def update_step(self, step_dict: StepDict):
@@ -396,6 +843,7 @@ class ChainlitDataLayer(BaseDataLayer):
 
     @queue_until_user_message()
     async def delete_step(self, step_id: str):
+        await self.flush()
         # Delete associated elements and feedbacks first
         await self.execute_query(
             'DELETE FROM "Element" WHERE "stepId" = $1', {"step_id": step_id}
@@ -407,8 +855,10 @@ class ChainlitDataLayer(BaseDataLayer):
         await self.execute_query(
             'DELETE FROM "Step" WHERE id = $1', {"step_id": step_id}
         )
+        self._forget_rows(step_id=step_id)
 
     async def get_step(self, step_id: str) -> Optional[StepDict]:
+        await self.flush()
         # Get step and related feedback
         query = """
         SELECT  s.*,
@@ -436,6 +886,7 @@ class ChainlitDataLayer(BaseDataLayer):
         return results[0]["identifier"]
 
     async def delete_thread(self, thread_id: str):
+        await self.flush()
         elements_query = """
         SELECT * FROM "Element"
         WHERE "threadId" = $1
@@ -452,39 +903,82 @@ class ChainlitDataLayer(BaseDataLayer):
         await self.execute_query(
             'DELETE FROM "Thread" WHERE id = $1', {"thread_id": thread_id}
         )
+        self._forget_rows(thread_id=thread_id)
+
+    async def create_search_index(self):
+        """Add the full-text search columns and indexes to the database."""
+        for statement in full_text_search_migration(self.search_language):
+            await self.execute_query(statement)
 
     async def list_threads(
         self, pagination: Pagination, filters: ThreadFilter
     ) -> PaginatedResponse[ThreadDict]:
-        query = """
-        SELECT
-            t.*,
-            u.identifier as user_identifier,
-            (SELECT COUNT(*) FROM "Thread" WHERE "userId" = t."userId") as total
-        FROM "Thread" t
-        LEFT JOIN "User" u ON t."userId" = u.id
-        WHERE t."deletedAt" IS NULL
-        """
         params: Dict[str, Any] = {}
-        param_count = 1
-
-        if filters.search:
-            query += f" AND t.name ILIKE ${param_count}"
-            params["name"] = f"%{filters.search}%"
-            param_count += 1
 
-        if filters.userId:
-            query += f' AND t."userId" = ${param_count}'
-            params["user_id"] = filters.userId
-            param_count += 1
+        def param(name: str, value: Any) -> str:
+            params[name] = value
+            return f"${len(params)}"
 
-        if pagination.cursor:
-            query += f' AND t."updatedAt" < (SELECT "updatedAt" FROM "Thread" WHERE id = ${param_count})'
-            params["cursor"] = pagination.cursor
-            param_count += 1
+        user_filter = (
+            f' AND t."userId" = {param("user_id", filters.userId)}'
+            if filters.userId
+            else ""
+        )
 
-        query += f' ORDER BY t."updatedAt" DESC LIMIT ${param_count}'
-        params["limit"] = pagination.first + 1
+        if filters.search and self.full_text_search:
+            language = param("language", self.search_language)
+            search = param("search", filters.search)
+            # Threads whose name or messages match, best matches first
+            query = f"""
+            WITH search AS (
+                SELECT websearch_to_tsquery({language}::regconfig, {search}) AS query
+            ), step_matches AS (
+                SELECT s."threadId" AS id, MAX(ts_rank(s."searchVector", search.query)) AS rank
+                FROM "Step" s
+                CROSS JOIN search
+                WHERE s."searchVector" @@ search.query
+                    AND s.type IN ('user_message', 'assistant_message')
+                GROUP BY s."threadId"
+            ), matches AS (
+                SELECT
+                    t.*,
+                    u.identifier AS user_identifier,
+                    GREATEST(
+                        CASE WHEN t."searchVector" @@ search.query
+                            THEN {SEARCH_NAME_WEIGHT} * ts_rank(t."searchVector", search.query)
+                            ELSE 0
+                        END,
+                        COALESCE(sm.rank, 0)
+                    ) AS rank
+                FROM "Thread" t
+                CROSS JOIN search
+                LEFT JOIN step_matches sm ON sm.id = t.id
+                LEFT JOIN "User" u ON t."userId" = u.id
+                WHERE t."deletedAt" IS NULL
+                    AND (t."searchVector" @@ search.query OR sm.id IS NOT NULL){user_filter}
+            )
+            SELECT * FROM matches
+            """
+            if pagination.cursor:
+                query += f' WHERE (rank, "updatedAt") < (SELECT rank, "updatedAt" FROM matches WHERE id = {param("cursor", pagination.cursor)})'
+            query += f' ORDER BY rank DESC, "updatedAt" DESC LIMIT {param("limit", pagination.first + 1)}'
+        else:
+            # No total is counted, PaginatedResponse has no field for it and a
+            # count would keep the query from stopping at its LIMIT
+            query = """
+            SELECT
+                t.*,
+                u.identifier as user_identifier
+            FROM "Thread" t
+            LEFT JOIN "User" u ON t."userId" = u.id
+            WHERE t."deletedAt" IS NULL
+            """
+            if filters.search:
+                query += f" AND t.name ILIKE {param('name', f'%{filters.search}%')}"
+            query += user_filter
+            if pagination.cursor:
+                query += f' AND t."updatedAt" < (SELECT "updatedAt" FROM "Thread" WHERE id = {param("cursor", pagination.cursor)})'
+            query += f' ORDER BY t."updatedAt" DESC LIMIT {param("limit", pagination.first + 1)}'
 
         results = await self.execute_query(query, params)
         threads = results
@@ -518,47 +1012,24 @@ class ChainlitDataLayer(BaseDataLayer):
         )
 
     async def get_thread(self, thread_id: str) -> Optional[ThreadDict]:
-        query = """
-        SELECT t.*, u.identifier as user_identifier
-        FROM "Thread" t
-        LEFT JOIN "User" u ON t."userId" = u.id
-        WHERE t.id = $1 AND t."deletedAt" IS NULL
-        """
-        results = await self.execute_query(query, {"thread_id": thread_id})
+        await self.flush()
+        # Thread, steps and elements in a single round trip
+        results = await self.execute_query(GET_THREAD_QUERY, {"thread_id": thread_id})
 
         if not results:
             return None
 
         thread = results[0]
-
-        # Get steps and related feedback
-        steps_query = """
-        SELECT  s.*,
-                f.id feedback_id,
-                f.value feedback_value,
-                f."comment" feedback_comment
-        FROM "Step" s left join "Feedback" f on s.id = f."stepId"
-        WHERE s."threadId" = $1
-        ORDER BY "startTime"
-        """
-        steps_results = await self.execute_query(steps_query, {"thread_id": thread_id})
-
-        # Get elements
-        elements_query = """
-        SELECT * FROM "Element"
-        WHERE "threadId" = $1
-        """
-        elements_results = await self.execute_query(
-            elements_query, {"thread_id": thread_id}
+        steps_results = json.loads(thread["steps"])
+        elements_results = json.loads(thread["elements"])
+
+        await sign_element_urls(
+            self.storage_client,
+            elements_results,
+            concurrency=self.url_signing_concurrency,
+            overwrite=False,
         )
 
-        if self.storage_client is not None:
-            for elem in elements_results:
-                if not elem["url"] and elem["objectKey"]:
-                    elem["url"] = await self.storage_client.get_read_url(
-                        object_key=elem["objectKey"],
-                    )
-
         return ThreadDict(
             id=str(thread["id"]),
             createdAt=thread["createdAt"].isoformat(),
@@ -573,6 +1044,36 @@ class ChainlitDataLayer(BaseDataLayer):
             tags=[],
         )
 
+    async def get_thread_steps_since(
+        self, thread_id: str, cursor: ResumeCursor
+    ) -> Optional[ThreadDelta]:
+        await self.flush()
+        results = await self.execute_query(
+            GET_THREAD_STEPS_SINCE_QUERY,
+            {"thread_id": thread_id, "step_id": cursor["stepId"]},
+        )
+        if not results:
+            return None
+
+        elements_results = json.loads(results[0]["elements"])
+        await sign_element_urls(
+            self.storage_client,
+            elements_results,
+            concurrency=self.url_signing_concurrency,
+            overwrite=False,
+        )
+
+        return ThreadDelta(
+            id=thread_id,
+            steps=[
+                self._convert_step_row_to_dict(step)
+                for step in json.loads(results[0]["steps"])
+            ],
+            elements=[
+                self._convert_element_row_to_dict(elem) for elem in elements_results
+            ],
+        )
+
     async def update_thread(
         self,
         thread_id: str,
@@ -601,8 +1102,7 @@ class ChainlitDataLayer(BaseDataLayer):
         )
 
         existing = await self.execute_query(
-            'SELECT "metadata" FROM "Thread" WHERE id = $1',
-            {"thread_id": thread_id},
+            GET_THREAD_METADATA_QUERY, {"thread_id": thread_id}
         )
 
         thread_exists = isinstance(existing, list) and existing
@@ -660,6 +1160,7 @@ class ChainlitDataLayer(BaseDataLayer):
         await self.execute_query(query, {str(i + 1): v for i, v in enumerate(values)})
 
     async def get_favorite_steps(self, user_id: str) -> List[StepDict]:
+        await self.flush()
         query = """
                 SELECT s.*
                 FROM "Step" s
@@ -690,17 +1191,17 @@ class ChainlitDataLayer(BaseDataLayer):
             type=row["type"],
             input=row.get("input", {}),
             output=row.get("output", {}),
-            metadata=json.loads(row.get("metadata", "{}")),
-            createdAt=row["createdAt"].isoformat() if row.get("createdAt") else None,
-            start=row["startTime"].isoformat() if row.get("startTime") else None,
+            metadata=load_json(row.get("metadata")),
+            createdAt=isoformat(row.get("createdAt")),
+            start=isoformat(row.get("startTime")),
             showInput=row.get("showInput"),
             isError=row.get("isError"),
-            end=row["endTime"].isoformat() if row.get("endTime") else None,
+            end=isoformat(row.get("endTime")),
             feedback=self._extract_feedback_dict_from_step_row(row),
         )
 
     def _convert_element_row_to_dict(self, row: Dict) -> ElementDict:
-        metadata = json.loads(row.get("metadata", "{}"))
+        metadata = load_json(row.get("metadata"))
         return ElementDict(
             id=str(row["id"]),
             threadId=str(row["threadId"]) if row.get("threadId") else None,
@@ -717,7 +1218,7 @@ class ChainlitDataLayer(BaseDataLayer):
             page=row["page"],
             autoPlay=row.get("autoPlay"),
             playerConfig=row.get("playerConfig"),
-            props=json.loads(row.get("props") or "{}"),
+            props=load_json(row.get("props")),
         )
 
     async def build_debug_url(self) -> str:
@@ -729,8 +1230,12 @@ class ChainlitDataLayer(BaseDataLayer):
             logger.debug("Cleaning up connection pool")
             await self.pool.close()
             self.pool = None
+            self._statement_caches.clear()
 
     async def close(self) -> None:
+        # Persist the queued writes before releasing the connections
+        if self.write_queue:
+            await self.write_queue.close()
         if self.storage_client:
             await self.storage_client.close()
         await self.cleanup()
@@ -738,3 +1243,17 @@ class ChainlitDataLayer(BaseDataLayer):
 
 def truncate(text: Optional[str], max_length: int = 255) -> Optional[str]:
     return None if text is None else text[:max_length]
+
+
+def load_json(value: Union[str, Dict, None]) -> Dict:
+    """Decode a JSON column, already decoded when aggregated with json_agg."""
+    if not value:
+        return {}
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def isoformat(value: Union[datetime, str, None]) -> Optional[str]:
+    """Format a timestamp column, already formatted when aggregated with json_agg."""
+    if not value:
+        return None
+    return value.isoformat() if isinstance(value, datetime) else value
@@ -1,12 +1,25 @@
 import asyncio
+import functools
 import json
 import logging
 import os
 import random
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import asdict
 from datetime import datetime
 from decimal import Decimal
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union, cast
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    TypeVar,
+    Union,
+    cast,
+)
 
 import aiofiles
 import aiohttp
@@ -16,7 +29,7 @@ from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
 from chainlit.context import context
 from chainlit.data.base import BaseDataLayer
 from chainlit.data.storage_clients.base import BaseStorageClient
-from chainlit.data.utils import queue_until_user_message
+from chainlit.data.utils import queue_until_user_message, sign_element_urls
 from chainlit.element import ElementDict
 from chainlit.logger import logger
 from chainlit.step import StepDict
@@ -39,6 +52,11 @@ if TYPE_CHECKING:
 _logger = logger.getChild("DynamoDB")
 _logger.setLevel(logging.WARNING)
 
+# Maximum number of requests of a BatchWriteItem call
+BATCH_WRITE_SIZE = 25
+
+T = TypeVar("T")
+
 
 class DynamoDBDataLayer(BaseDataLayer):
     def __init__(
@@ -47,6 +65,7 @@ class DynamoDBDataLayer(BaseDataLayer):
         client: Optional["DynamoDBClient"] = None,
         storage_provider: Optional[BaseStorageClient] = None,
         user_thread_limit: int = 10,
+        max_workers: int = 10,
     ):
         if client:
             self.client = client
@@ -61,6 +80,66 @@ class DynamoDBDataLayer(BaseDataLayer):
         self._type_deserializer = TypeDeserializer()
         self._type_serializer = TypeSerializer()
 
+        # boto3 is blocking: its calls run in dedicated threads, bounding how many
+        # requests are in flight at once, rather than blocking the event loop
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="DynamoDB"
+            )
+        return self._executor
+
+    async def _call(self, fn: Callable[..., T], **kwargs: Any) -> T:
+        """Run a client method in the executor."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(fn, **kwargs)
+        )
+
+    async def _query_all(self, **query_args: Any) -> List[Dict[str, Any]]:
+        """Run a query, following its pages."""
+        items: List[Dict[str, Any]] = []
+        while True:
+            response = await self._call(self.client.query, **query_args)
+            items.extend(response.get("Items", []))
+            if "LastEvaluatedKey" not in response:
+                return items
+            query_args["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    async def _batch_write_chunk(self, requests: List[Dict[str, Any]]):
+        response = await self._call(
+            self.client.batch_write_item,
+            RequestItems={self.table_name: requests},
+        )
+
+        backoff_time = 1
+        while response.get("UnprocessedItems"):
+            backoff_time *= 2
+            # Cap the backoff time at 32 seconds & add jitter
+            delay = min(backoff_time, 32) + random.uniform(0, 1)
+            await asyncio.sleep(delay)
+
+            response = await self._call(
+                self.client.batch_write_item,
+                RequestItems=response["UnprocessedItems"],
+            )
+
+    async def _batch_write(self, requests: List[Dict[str, Any]]):
+        """
+        Write requests in batches of BATCH_WRITE_SIZE, sent concurrently.
+
+        Each batch retries its own unprocessed items, with an exponential backoff.
+        """
+        await asyncio.gather(
+            *(
+                self._batch_write_chunk(requests[i : i + BATCH_WRITE_SIZE])
+                for i in range(0, len(requests), BATCH_WRITE_SIZE)
+            )
+        )
+
     def _get_current_timestamp(self) -> str:
         return datetime.now().isoformat() + "Z"
 
@@ -96,7 +175,7 @@ class DynamoDBDataLayer(BaseDataLayer):
             for key, value in item.items()
         }
 
-    def _update_item(self, key: Dict[str, Any], updates: Dict[str, Any]):
+    async def _update_item(self, key: Dict[str, Any], updates: Dict[str, Any]):
         update_expr: List[str] = []
         expression_attribute_names = {}
         expression_attribute_values = {}
@@ -110,7 +189,8 @@ class DynamoDBDataLayer(BaseDataLayer):
             expression_attribute_names[k] = attr
             expression_attribute_values[v] = value
 
-        self.client.update_item(
+        await self._call(
+            self.client.update_item,
             TableName=self.table_name,
             Key=self._serialize_item(key),
             UpdateExpression="SET " + ", ".join(update_expr),
@@ -125,7 +205,8 @@ class DynamoDBDataLayer(BaseDataLayer):
     async def get_user(self, identifier: str) -> Optional["PersistedUser"]:
         _logger.info("DynamoDB: get_user identifier=%s", identifier)
 
-        response = self.client.get_item(
+        response = await self._call(
+            self.client.get_item,
             TableName=self.table_name,
             Key={
                 "PK": {"S": f"USER#{identifier}"},
@@ -160,7 +241,8 @@ class DynamoDBDataLayer(BaseDataLayer):
             "createdAt": ts,
         }
 
-        self.client.put_item(
+        await self._call(
+            self.client.put_item,
             TableName=self.table_name,
             Item=self._serialize_item(item),
         )
@@ -180,7 +262,8 @@ class DynamoDBDataLayer(BaseDataLayer):
         thread_id = thread_id.strip("THREAD#")
         step_id = step_id.strip("STEP#")
 
-        self.client.update_item(
+        await self._call(
+            self.client.update_item,
             TableName=self.table_name,
             Key={
                 "PK": {"S": f"THREAD#{thread_id}"},
@@ -208,7 +291,8 @@ class DynamoDBDataLayer(BaseDataLayer):
         feedback.id = f"THREAD#{feedback.threadId}::STEP#{feedback.forId}"
         serialized_feedback = self._type_serializer.serialize(asdict(feedback))
 
-        self.client.update_item(
+        await self._call(
+            self.client.update_item,
             TableName=self.table_name,
             Key={
                 "PK": {"S": f"THREAD#{feedback.threadId}"},
@@ -246,9 +330,8 @@ class DynamoDBDataLayer(BaseDataLayer):
             content = element.content
 
         elif element.path:
-            _logger.debug("DynamoDB: create_element reading file %s", element.path)
-            async with aiofiles.open(element.path, "rb") as f:
-                content = await f.read()
+            # Streamed below, rather than loaded in memory
+            _logger.debug("DynamoDB: create_element streaming file %s", element.path)
 
         elif element.url:
             _logger.debug("DynamoDB: create_element http %s", element.url)
@@ -264,7 +347,7 @@ class DynamoDBDataLayer(BaseDataLayer):
         else:
             raise ValueError("Element url, path or content must be provided")
 
-        if content is None:
+        if content is None and not element.path:
             raise ValueError("Content is None, cannot upload file")
 
         if not element.mime:
@@ -274,12 +357,21 @@ class DynamoDBDataLayer(BaseDataLayer):
         user_folder = getattr(context_user, "id", "unknown")
         file_object_key = f"{user_folder}/{element.thread_id}/{element.id}"
 
-        uploaded_file = await self.storage_provider.upload_file(
-            object_key=file_object_key,
-            data=content,
-            mime=element.mime,
-            overwrite=True,
-        )
+        if content is not None:
+            uploaded_file = await self.storage_provider.upload_file(
+                object_key=file_object_key,
+                data=content,
+                mime=element.mime,
+                overwrite=True,
+            )
+        else:
+            async with aiofiles.open(element.path, "rb") as f:
+                uploaded_file = await self.storage_provider.upload_stream(
+                    object_key=file_object_key,
+                    stream=f,
+                    mime=element.mime,
+                    overwrite=True,
+                )
         if not uploaded_file:
             raise ValueError(
                 "DynamoDB Error: create_element, Failed to persist data in storage_provider",
@@ -295,7 +387,8 @@ class DynamoDBDataLayer(BaseDataLayer):
             }
         )
 
-        self.client.put_item(
+        await self._call(
+            self.client.put_item,
             TableName=self.table_name,
             Item=self._serialize_item(element_dict),
         )
@@ -307,7 +400,8 @@ class DynamoDBDataLayer(BaseDataLayer):
             "DynamoDB: get_element thread=%s element=%s", thread_id, element_id
         )
 
-        response = self.client.get_item(
+        response = await self._call(
+            self.client.get_item,
             TableName=self.table_name,
             Key={
                 "PK": {"S": f"THREAD#{thread_id}"},
@@ -327,7 +421,8 @@ class DynamoDBDataLayer(BaseDataLayer):
             "DynamoDB: delete_element thread=%s element=%s", thread_id, element_id
         )
 
-        self.client.delete_item(
+        await self._call(
+            self.client.delete_item,
             TableName=self.table_name,
             Key={
                 "PK": {"S": f"THREAD#{thread_id}"},
@@ -353,7 +448,8 @@ class DynamoDBDataLayer(BaseDataLayer):
             }
         )
 
-        self.client.put_item(
+        await self._call(
+            self.client.put_item,
             TableName=self.table_name,
             Item=self._serialize_item(item),
         )
@@ -367,7 +463,7 @@ class DynamoDBDataLayer(BaseDataLayer):
         )
         _logger.debug("DynamoDB: update_step: %s", step_dict)
 
-        self._update_item(
+        await self._update_item(
             key={
                 # ignore type, dynamo needs these so we want to fail if not set
                 "PK": f"THREAD#{step_dict['threadId']}",  # type: ignore
@@ -381,7 +477,8 @@ class DynamoDBDataLayer(BaseDataLayer):
         thread_id = self.context.session.thread_id
         _logger.info("DynamoDB: delete_feedback thread=%s step=%s", thread_id, step_id)
 
-        self.client.delete_item(
+        await self._call(
+            self.client.delete_item,
             TableName=self.table_name,
             Key={
                 "PK": {"S": f"THREAD#{thread_id}"},
@@ -392,7 +489,8 @@ class DynamoDBDataLayer(BaseDataLayer):
     async def get_thread_author(self, thread_id: str) -> str:
         _logger.info("DynamoDB: get_thread_author thread=%s", thread_id)
 
-        response = self.client.get_item(
+        response = await self._call(
+            self.client.get_item,
             TableName=self.table_name,
             Key={
                 "PK": {"S": f"THREAD#{thread_id}"},
@@ -410,41 +508,28 @@ class DynamoDBDataLayer(BaseDataLayer):
     async def delete_thread(self, thread_id: str):
         _logger.info("DynamoDB: delete_thread thread=%s", thread_id)
 
-        thread = await self.get_thread(thread_id)
-        if not thread:
+        # Only the keys are needed, not the whole steps and elements
+        keys = await self._query_all(
+            TableName=self.table_name,
+            KeyConditionExpression="#pk = :pk",
+            ProjectionExpression="#pk, #sk",
+            ExpressionAttributeNames={"#pk": "PK", "#sk": "SK"},
+            ExpressionAttributeValues={":pk": {"S": f"THREAD#{thread_id}"}},
+        )
+        if not any(key["SK"]["S"] == "THREAD" for key in keys):
             return
 
-        items: List[Any] = thread["steps"]
-        if thread["elements"]:
-            items.extend(thread["elements"])
-
-        delete_requests = []
-        for item in items:
-            key = self._serialize_item({"PK": item["PK"], "SK": item["SK"]})
-            req = {"DeleteRequest": {"Key": key}}
-            delete_requests.append(req)
-
-        BATCH_ITEM_SIZE = 25  # pylint: disable=invalid-name
-        for i in range(0, len(delete_requests), BATCH_ITEM_SIZE):
-            chunk = delete_requests[i : i + BATCH_ITEM_SIZE]
-            response = self.client.batch_write_item(
-                RequestItems={
-                    self.table_name: chunk,  # type: ignore
-                }
-            )
-
-            backoff_time = 1
-            while response.get("UnprocessedItems"):
-                backoff_time *= 2
-                # Cap the backoff time at 32 seconds & add jitter
-                delay = min(backoff_time, 32) + random.uniform(0, 1)
-                await asyncio.sleep(delay)
-
-                response = self.client.batch_write_item(
-                    RequestItems=response["UnprocessedItems"]
-                )
+        # The thread itself is deleted last, once its items are gone
+        await self._batch_write(
+            [
+                {"DeleteRequest": {"Key": key}}
+                for key in keys
+                if key["SK"]["S"] != "THREAD"
+            ]
+        )
 
-        self.client.delete_item(
+        await self._call(
+            self.client.delete_item,
             TableName=self.table_name,
             Key={
                 "PK": {"S": f"THREAD#{thread_id}"},
@@ -489,7 +574,7 @@ class DynamoDBDataLayer(BaseDataLayer):
             query_args["ExpressionAttributeNames"]["#name"] = "name"
             query_args["ExpressionAttributeValues"][":search"] = {"S": filters.search}
 
-        response = self.client.query(**query_args)  # type: ignore
+        response = await self._call(self.client.query, **query_args)
 
         if "LastEvaluatedKey" in response:
             paginated_response.pageInfo.hasNextPage = True
@@ -511,25 +596,24 @@ class DynamoDBDataLayer(BaseDataLayer):
     async def get_thread(self, thread_id: str) -> "Optional[ThreadDict]":
         _logger.info("DynamoDB: get_thread thread=%s", thread_id)
 
-        # Get all thread records
-        thread_items: List[Any] = []
-
-        cursor: Dict[str, Any] = {}
-        while True:
-            response = self.client.query(
+        # The thread, its steps and its elements are fetched concurrently
+        def query_prefix(prefix: str) -> Awaitable[List[Dict[str, Any]]]:
+            return self._query_all(
                 TableName=self.table_name,
-                KeyConditionExpression="#pk = :pk",
-                ExpressionAttributeNames={"#pk": "PK"},
-                ExpressionAttributeValues={":pk": {"S": f"THREAD#{thread_id}"}},
-                **cursor,
+                KeyConditionExpression="#pk = :pk AND begins_with(#sk, :prefix)",
+                ExpressionAttributeNames={"#pk": "PK", "#sk": "SK"},
+                ExpressionAttributeValues={
+                    ":pk": {"S": f"THREAD#{thread_id}"},
+                    ":prefix": {"S": prefix},
+                },
             )
 
-            deserialized_items = map(self._deserialize_item, response["Items"])
-            thread_items.extend(deserialized_items)
-
-            if "LastEvaluatedKey" not in response:
-                break
-            cursor["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        results = await asyncio.gather(
+            query_prefix("THREAD"), query_prefix("STEP#"), query_prefix("ELEMENT#")
+        )
+        thread_items: List[Any] = [
+            self._deserialize_item(item) for items in results for item in items
+        ]
 
         if len(thread_items) == 0:
             return None
@@ -544,10 +628,6 @@ class DynamoDBDataLayer(BaseDataLayer):
                 thread_dict = item
 
             elif item["SK"].startswith("ELEMENT"):
-                if self.storage_provider is not None:
-                    item["url"] = await self.storage_provider.get_read_url(
-                        object_key=item["objectKey"],
-                    )
                 elements.append(item)
 
             elif item["SK"].startswith("STEP"):
@@ -562,6 +642,8 @@ class DynamoDBDataLayer(BaseDataLayer):
                 )
             return None
 
+        await sign_element_urls(self.storage_provider, elements)
+
         steps.sort(key=lambda i: i["createdAt"])
         thread_dict.update(
             {
@@ -607,7 +689,7 @@ class DynamoDBDataLayer(BaseDataLayer):
             # user_id may be None on subsequent calls, don't update UserThreadPK to "USER#{None}"
             item["UserThreadPK"] = f"USER#{user_id}"
 
-        self._update_item(
+        await self._update_item(
             key={
                 "PK": f"THREAD#{thread_id}",
                 "SK": "THREAD",
@@ -618,62 +700,52 @@ class DynamoDBDataLayer(BaseDataLayer):
     async def get_favorite_steps(self, user_id: str) -> List["StepDict"]:
         _logger.info("DynamoDB: get_favorite_steps user_id=%s", user_id)
 
-        thread_ids = []
-        query_args: Dict[str, Any] = {
-            "TableName": self.table_name,
-            "IndexName": "UserThread",
-            "KeyConditionExpression": "#UserThreadPK = :pk",
-            "ExpressionAttributeNames": {"#UserThreadPK": "UserThreadPK"},
-            "ExpressionAttributeValues": {":pk": {"S": f"USER#{user_id}"}},
-        }
-
-        while True:
-            response = self.client.query(**query_args)  # type: ignore
-            for item in response.get("Items", []):
-                pk = item.get("PK", {}).get("S")
-                if pk:
-                    thread_ids.append(pk.removeprefix("THREAD#"))
-
-            if "LastEvaluatedKey" not in response:
-                break
-            query_args["ExclusiveStartKey"] = response["LastEvaluatedKey"]
-
-        favorite_steps: List[Dict[str, Any]] = []
-
-        for thread_id in thread_ids:
-            t_query_args: Dict[str, Any] = {
-                "TableName": self.table_name,
-                "KeyConditionExpression": "#pk = :pk AND begins_with(#sk, :sk_prefix)",
-                "FilterExpression": "#metadata.#favorite = :true",
-                "ExpressionAttributeNames": {
+        user_threads = await self._query_all(
+            TableName=self.table_name,
+            IndexName="UserThread",
+            KeyConditionExpression="#UserThreadPK = :pk",
+            ExpressionAttributeNames={"#UserThreadPK": "UserThreadPK"},
+            ExpressionAttributeValues={":pk": {"S": f"USER#{user_id}"}},
+        )
+        thread_ids = [
+            pk.removeprefix("THREAD#")
+            for item in user_threads
+            if (pk := item.get("PK", {}).get("S"))
+        ]
+
+        def query_favorites(thread_id: str) -> Awaitable[List[Dict[str, Any]]]:
+            return self._query_all(
+                TableName=self.table_name,
+                KeyConditionExpression="#pk = :pk AND begins_with(#sk, :sk_prefix)",
+                FilterExpression="#metadata.#favorite = :true",
+                ExpressionAttributeNames={
                     "#pk": "PK",
                     "#sk": "SK",
                     "#metadata": "metadata",
                     "#favorite": "favorite",
                 },
-                "ExpressionAttributeValues": {
+                ExpressionAttributeValues={
                     ":pk": {"S": f"THREAD#{thread_id}"},
                     ":sk_prefix": {"S": "STEP#"},
                     ":true": {"BOOL": True},
                 },
-            }
-
-            while True:
-                response = self.client.query(**t_query_args)  # type: ignore
-                for item in response.get("Items", []):
-                    step = self._deserialize_item(item)
-                    if "PK" in step:
-                        del step["PK"]
-                    if "SK" in step:
-                        del step["SK"]
-                    if "feedback" in step:
-                        del step["feedback"]
+            )
 
-                    favorite_steps.append(step)
+        # Threads are queried concurrently, bounded by the executor
+        results = await asyncio.gather(*map(query_favorites, thread_ids))
 
-                if "LastEvaluatedKey" not in response:
-                    break
-                t_query_args["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        favorite_steps: List[Dict[str, Any]] = []
+        for items in results:
+            for item in items:
+                step = self._deserialize_item(item)
+                if "PK" in step:
+                    del step["PK"]
+                if "SK" in step:
+                    del step["SK"]
+                if "feedback" in step:
+                    del step["feedback"]
+
+                favorite_steps.append(step)
 
         favorite_steps.sort(key=lambda x: x.get("createdAt", ""), reverse=True)
         return cast(List["StepDict"], favorite_steps)
@@ -684,4 +756,7 @@ class DynamoDBDataLayer(BaseDataLayer):
     async def close(self) -> None:
         if self.storage_provider:
             await self.storage_provider.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
         self.client.close()
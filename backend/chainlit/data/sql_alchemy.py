@@ -3,7 +3,7 @@ import ssl
 import uuid
 from dataclasses import asdict
 from datetime import datetime
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union, cast
 
 import aiofiles
 import aiohttp
@@ -14,7 +14,7 @@ from sqlalchemy.orm import sessionmaker
 
 from chainlit.data.base import BaseDataLayer
 from chainlit.data.storage_clients.base import BaseStorageClient
-from chainlit.data.utils import queue_until_user_message
+from chainlit.data.utils import queue_until_user_message, sign_element_urls
 from chainlit.element import ElementDict
 from chainlit.logger import logger
 from chainlit.step import StepDict
@@ -327,56 +327,93 @@ class SQLAlchemyDataLayer(BaseDataLayer):
             )
         if not filters.userId:
             raise ValueError("userId is required")
-        all_user_threads: List[ThreadDict] = (
-            await self.get_all_user_threads(user_id=filters.userId) or []
-        )
 
-        search_keyword = filters.search.lower() if filters.search else None
-        feedback_value = int(filters.feedback) if filters.feedback else None
-
-        filtered_threads = []
-        for thread in all_user_threads:
-            keyword_match = True
-            feedback_match = True
-            if search_keyword or feedback_value is not None:
-                if search_keyword:
-                    keyword_match = any(
-                        search_keyword in step["output"].lower()
-                        for step in thread["steps"]
-                        if "output" in step
-                    )
-                if feedback_value is not None:
-                    feedback_match = False  # Assume no match until found
-                    for step in thread["steps"]:
-                        feedback = step.get("feedback")
-                        if feedback and feedback.get("value") == feedback_value:
-                            feedback_match = True
-                            break
-            if keyword_match and feedback_match:
-                filtered_threads.append(thread)
-
-        start = 0
+        # Only thread headers are listed, steps and elements are loaded by get_thread
+        conditions = []
+        parameters: Dict[str, Any] = {
+            "user_id": filters.userId,
+            "limit": pagination.first + 1,
+        }
+        if filters.search:
+            conditions.append(
+                """EXISTS (
+                    SELECT 1 FROM steps s
+                    WHERE s."threadId" = ut.thread_id AND LOWER(s."output") LIKE :search
+                )"""
+            )
+            parameters["search"] = f"%{filters.search.lower()}%"
+        if filters.feedback is not None:
+            conditions.append(
+                """EXISTS (
+                    SELECT 1 FROM feedbacks f JOIN steps s ON f."forId" = s."id"
+                    WHERE s."threadId" = ut.thread_id AND f."value" = :feedback
+                )"""
+            )
+            parameters["feedback"] = int(filters.feedback)
         if pagination.cursor:
-            for i, thread in enumerate(filtered_threads):
-                if (
-                    thread["id"] == pagination.cursor
-                ):  # Find the start index using pagination.cursor
-                    start = i + 1
-                    break
-        end = start + pagination.first
-        paginated_threads = filtered_threads[start:end] or []
-
-        has_next_page = len(filtered_threads) > end
-        start_cursor = paginated_threads[0]["id"] if paginated_threads else None
-        end_cursor = paginated_threads[-1]["id"] if paginated_threads else None
+            # Keyset pagination on (updated_at, thread_id)
+            conditions.append(
+                """EXISTS (
+                    SELECT 1 FROM user_threads c
+                    WHERE c.thread_id = :cursor
+                    AND (
+                        ut.updated_at < c.updated_at
+                        OR (ut.updated_at = c.updated_at AND ut.thread_id < c.thread_id)
+                    )
+                )"""
+            )
+            parameters["cursor"] = pagination.cursor
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"""
+            WITH user_threads AS (
+                SELECT
+                    t."id" AS thread_id,
+                    t."createdAt" AS thread_createdat,
+                    t."name" AS thread_name,
+                    t."userId" AS user_id,
+                    t."userIdentifier" AS user_identifier,
+                    t."tags" AS thread_tags,
+                    t."metadata" AS thread_metadata,
+                    COALESCE(
+                        (SELECT MAX(s."createdAt") FROM steps s WHERE s."threadId" = t."id"),
+                        t."createdAt",
+                        ''
+                    ) AS updated_at
+                FROM threads t
+                WHERE t."userId" = :user_id
+            )
+            SELECT * FROM user_threads ut
+            {where}
+            ORDER BY ut.updated_at DESC, ut.thread_id DESC
+            LIMIT :limit
+        """
+        rows = await self.execute_sql(query=query, parameters=parameters)
+        rows = rows if isinstance(rows, list) else []
+
+        has_next_page = len(rows) > pagination.first
+        threads = [
+            ThreadDict(
+                id=row["thread_id"],
+                createdAt=row["thread_createdat"],
+                name=row["thread_name"],
+                userId=row["user_id"],
+                userIdentifier=row["user_identifier"],
+                tags=row["thread_tags"],
+                metadata=row["thread_metadata"],
+                steps=[],
+                elements=[],
+            )
+            for row in rows[: pagination.first]
+        ]
 
         return PaginatedResponse(
             pageInfo=PageInfo(
                 hasNextPage=has_next_page,
-                startCursor=start_cursor,
-                endCursor=end_cursor,
+                startCursor=threads[0]["id"] if threads else None,
+                endCursor=threads[-1]["id"] if threads else None,
             ),
-            data=paginated_threads,
+            data=threads,
         )
 
     ###### Steps ######
@@ -591,8 +628,8 @@ class SQLAlchemyDataLayer(BaseDataLayer):
         content: Optional[Union[bytes, str]] = None
 
         if element.path:
-            async with aiofiles.open(element.path, "rb") as f:
-                content = await f.read()
+            # Streamed below, rather than loaded in memory
+            pass
         elif element.url:
             async with aiohttp.ClientSession() as session:
                 async with session.get(element.url) as response:
@@ -604,7 +641,7 @@ class SQLAlchemyDataLayer(BaseDataLayer):
             content = element.content
         else:
             raise ValueError("Element url, path or content must be provided")
-        if content is None:
+        if content is None and not element.path:
             raise ValueError("Content is None, cannot upload file")
 
         user_id: str = await self._get_user_id_by_thread(element.thread_id) or "unknown"
@@ -615,9 +652,22 @@ class SQLAlchemyDataLayer(BaseDataLayer):
         if not element.mime:
             element.mime = "application/octet-stream"
 
-        uploaded_file = await self.storage_provider.upload_file(
-            object_key=file_object_key, data=content, mime=element.mime, overwrite=True
-        )
+        if element.path:
+            async with aiofiles.open(element.path, "rb") as f:
+                uploaded_file = await self.storage_provider.upload_stream(
+                    object_key=file_object_key,
+                    stream=f,
+                    mime=element.mime,
+                    overwrite=True,
+                )
+        else:
+            assert content is not None
+            uploaded_file = await self.storage_provider.upload_file(
+                object_key=file_object_key,
+                data=content,
+                mime=element.mime,
+                overwrite=True,
+            )
         if not uploaded_file:
             raise ValueError(
                 "SQLAlchemy Error: create_element, Failed to persist data in storage_provider"
@@ -826,33 +876,16 @@ class SQLAlchemyDataLayer(BaseDataLayer):
                     thread_dicts[thread_id]["steps"].append(step_dict)
 
         if isinstance(elements, list):
+            element_dicts: List[ElementDict] = []
             for element in elements:
                 thread_id = element["element_threadid"]
                 if thread_id is not None:
-                    element_url: str | None = None
-                    object_key_val = element.get("element_objectkey")
-                    if (
-                        self.storage_provider is not None
-                        and isinstance(object_key_val, str)
-                        and object_key_val.strip()
-                    ):
-                        try:
-                            element_url = await self.storage_provider.get_read_url(
-                                object_key=object_key_val,
-                            )
-                        except Exception as e:
-                            logger.warning(
-                                f"Failed to get read URL for object_key '{object_key_val}': {e}. Falling back to stored URL."
-                            )
-                            element_url = element.get("element_url")
-                    else:
-                        element_url = element.get("element_url")
                     element_dict = ElementDict(
                         id=element["element_id"],
                         threadId=thread_id,
                         type=element["element_type"],
                         chainlitKey=element.get("element_chainlitkey"),
-                        url=element_url,
+                        url=element.get("element_url"),
                         objectKey=element.get("element_objectkey"),
                         name=element["element_name"],
                         display=element["element_display"],
@@ -866,6 +899,13 @@ class SQLAlchemyDataLayer(BaseDataLayer):
                         mime=element.get("element_mime"),
                     )
                     thread_dicts[thread_id]["elements"].append(element_dict)  # type: ignore
+                    element_dicts.append(element_dict)
+
+            # Read URLs of the elements of every thread, signed concurrently
+            await sign_element_urls(
+                self.storage_provider,
+                cast(List[Dict[str, Any]], element_dicts),
+            )
 
         return list(thread_dicts.values())
 
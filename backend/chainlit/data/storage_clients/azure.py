@@ -7,7 +7,11 @@ from azure.storage.filedatalake import (
     FileSystemClient,
 )
 
-from chainlit.data.storage_clients.base import BaseStorageClient
+from chainlit.data.storage_clients.base import (
+    BaseStorageClient,
+    UploadStream,
+    iter_parts,
+)
 from chainlit.logger import logger
 
 if TYPE_CHECKING:
@@ -83,6 +87,50 @@ class AzureStorageClient(BaseStorageClient):
             logger.warning(f"AzureStorageClient, upload_file error: {e}")
             return {}
 
+    async def upload_stream(
+        self,
+        object_key: str,
+        stream: UploadStream,
+        mime: str = "application/octet-stream",
+        overwrite: bool = True,
+        content_disposition: str | None = None,
+    ) -> Dict[str, Any]:
+        """Append the stream to the file one `part_size` part at a time, then flush it."""
+        try:
+            file_client: DataLakeFileClient = self.container_client.get_file_client(
+                object_key
+            )
+            if not overwrite and await self.run_in_upload_executor(file_client.exists):
+                raise Exception(
+                    f"File {object_key} already exists and overwrite is False"
+                )
+
+            content_settings = ContentSettings(
+                content_type=mime, content_disposition=content_disposition
+            )
+            await self.run_in_upload_executor(
+                file_client.create_file, content_settings=content_settings
+            )
+            offset = 0
+            async for part in iter_parts(stream, self.part_size):
+                await self.run_in_upload_executor(
+                    file_client.append_data, part, offset, len(part)
+                )
+                offset += len(part)
+            await self.run_in_upload_executor(
+                file_client.flush_data, offset, content_settings=content_settings
+            )
+
+            url = (
+                f"{file_client.url}{self.sas_token}"
+                if self.sas_token
+                else file_client.url
+            )
+            return {"object_key": object_key, "url": url}
+        except Exception as e:
+            logger.warning(f"AzureStorageClient, upload_stream error: {e}")
+            return {}
+
     async def close(self) -> None:
         self.container_client.close()
         self.data_lake_client.close()
@@ -4,7 +4,12 @@ from typing import Any, Dict, Union
 from azure.storage.blob import BlobSasPermissions, ContentSettings, generate_blob_sas
 from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
 
-from chainlit.data.storage_clients.base import BaseStorageClient, storage_expiry_time
+from chainlit.data.storage_clients.base import (
+    BaseStorageClient,
+    UploadStream,
+    iter_parts,
+    storage_expiry_time,
+)
 from chainlit.logger import logger
 
 
@@ -28,6 +33,9 @@ class AzureBlobStorageClient(BaseStorageClient):
         logger.info("AzureBlobStorageClient initialized")
 
     async def get_read_url(self, object_key: str) -> str:
+        return await self.get_cached_read_url(object_key, self._sign_read_url)
+
+    async def _sign_read_url(self, object_key: str) -> str:
         if not self.storage_key:
             raise Exception("Not using Azure Storage")
 
@@ -84,7 +92,38 @@ class AzureBlobStorageClient(BaseStorageClient):
         except Exception as e:
             raise Exception(f"Failed to upload file to Azure Blob Storage: {e!s}")
 
+    async def upload_stream(
+        self,
+        object_key: str,
+        stream: UploadStream,
+        mime: str = "application/octet-stream",
+        overwrite: bool = True,
+        content_disposition: str | None = None,
+    ) -> Dict[str, Any]:
+        """Upload the stream as blocks staged by the native async client."""
+        try:
+            blob_client = self.container_client.get_blob_client(object_key)
+            content_settings = ContentSettings(
+                content_type=mime, content_disposition=content_disposition
+            )
+
+            await blob_client.upload_blob(
+                iter_parts(stream, self.part_size),
+                overwrite=overwrite,
+                content_settings=content_settings,
+                max_concurrency=self.upload_concurrency,
+            )
+
+            return {
+                "path": object_key,
+                "object_key": object_key,
+                "url": await self.get_read_url(object_key),
+            }
+        except Exception as e:
+            raise Exception(f"Failed to upload file to Azure Blob Storage: {e!s}")
+
     async def delete_file(self, object_key: str) -> bool:
+        self.url_cache.invalidate(object_key)
         try:
             blob_client = self.container_client.get_blob_client(blob=object_key)
             await blob_client.delete_blob()
@@ -1,13 +1,187 @@
+import asyncio
+import functools
+import inspect
 import os
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Union
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    IO,
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Optional,
+    Tuple,
+    TypedDict,
+    TypeVar,
+    Union,
+)
 
 storage_expiry_time = int(os.getenv("STORAGE_EXPIRY_TIME", 3600))
+# Signed URLs are reused until this many seconds before they expire
+storage_expiry_margin = int(os.getenv("STORAGE_EXPIRY_MARGIN", 300))
+# Maximum number of signed URLs cached per storage client
+storage_url_cache_size = int(os.getenv("STORAGE_URL_CACHE_SIZE", 1024))
+# Size of the parts streamed uploads are split into (S3 requires at least 5 MB,
+# GCS rounds it up to a multiple of 256 KiB)
+storage_upload_part_size = int(os.getenv("STORAGE_UPLOAD_PART_SIZE", 8 * 1024 * 1024))
+# Maximum number of parts uploaded at once by a storage client
+storage_upload_concurrency = int(os.getenv("STORAGE_UPLOAD_CONCURRENCY", 4))
+
+T = TypeVar("T")
+
+# File object (sync or async, e.g. opened with aiofiles) or async iterator of bytes
+UploadStream = Union[IO[bytes], AsyncIterable[bytes], Any]
+
+
+async def iter_parts(stream: UploadStream, part_size: int) -> AsyncIterator[bytes]:
+    """Read a stream in parts of `part_size` bytes, only the last one being smaller."""
+    if (read := getattr(stream, "read", None)) is not None:
+        while True:
+            part = read(part_size)
+            if inspect.isawaitable(part):
+                part = await part
+            if not part:
+                return
+            yield part
+    else:
+        buffer = bytearray()
+        async for chunk in stream:
+            buffer += chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+            while len(buffer) >= part_size:
+                yield bytes(buffer[:part_size])
+                del buffer[:part_size]
+        if buffer:
+            yield bytes(buffer)
+
+
+class SignedUrlCacheStats(TypedDict):
+    size: int
+    hits: int
+    misses: int
+
+
+class SignedUrlCache:
+    """LRU cache of signed URLs, each kept until `ttl` seconds after it was signed."""
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._urls: OrderedDict[str, Tuple[str, float]] = OrderedDict()
+
+    def get(self, object_key: str) -> Optional[str]:
+        cached = self._urls.get(object_key)
+        if cached is None or cached[1] <= time.monotonic():
+            self._urls.pop(object_key, None)
+            self.misses += 1
+            return None
+
+        self._urls.move_to_end(object_key)
+        self.hits += 1
+        return cached[0]
+
+    def set(self, object_key: str, url: str):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+
+        self._urls[object_key] = (url, time.monotonic() + self.ttl)
+        self._urls.move_to_end(object_key)
+        while len(self._urls) > self.max_size:
+            self._urls.popitem(last=False)
+
+    def invalidate(self, object_key: str):
+        self._urls.pop(object_key, None)
+
+    def stats(self) -> SignedUrlCacheStats:
+        return {"size": len(self._urls), "hits": self.hits, "misses": self.misses}
 
 
 class BaseStorageClient(ABC):
     """Base class for non-text data persistence like Azure Data Lake, S3, Google Storage, etc."""
 
+    part_size: int = storage_upload_part_size
+    upload_concurrency: int = storage_upload_concurrency
+
+    _url_cache: Optional[SignedUrlCache] = None
+    _upload_executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def upload_executor(self) -> ThreadPoolExecutor:
+        """Threads dedicated to the blocking SDK calls of streamed uploads."""
+        if self._upload_executor is None:
+            self._upload_executor = ThreadPoolExecutor(
+                max_workers=self.upload_concurrency,
+                thread_name_prefix=f"{type(self).__name__}-upload",
+            )
+        return self._upload_executor
+
+    async def run_in_upload_executor(
+        self, fn: Callable[..., T], *args: Any, **kwargs: Any
+    ) -> T:
+        return await asyncio.get_running_loop().run_in_executor(
+            self.upload_executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    def shutdown_upload_executor(self):
+        if self._upload_executor is not None:
+            self._upload_executor.shutdown(wait=False)
+            self._upload_executor = None
+
+    async def upload_stream(
+        self,
+        object_key: str,
+        stream: UploadStream,
+        mime: str = "application/octet-stream",
+        overwrite: bool = True,
+        content_disposition: str | None = None,
+    ) -> Dict[str, Any]:
+        """
+        Upload a file object or an async iterator of bytes.
+
+        Clients without native streaming support read the whole stream and upload it
+        with `upload_file`.
+        """
+        data = b"".join([part async for part in iter_parts(stream, self.part_size)])
+        return await self.upload_file(
+            object_key,
+            data,
+            mime=mime,
+            overwrite=overwrite,
+            content_disposition=content_disposition,
+        )
+
+    @property
+    def url_cache(self) -> SignedUrlCache:
+        if self._url_cache is None:
+            self._url_cache = SignedUrlCache(
+                ttl=storage_expiry_time - storage_expiry_margin,
+                max_size=storage_url_cache_size,
+            )
+        return self._url_cache
+
+    async def get_cached_read_url(
+        self, object_key: str, sign: Callable[[str], Awaitable[str]]
+    ) -> str:
+        """
+        Return the cached signed URL of an object, signing it with `sign` on a miss.
+
+        Only signed URLs are cached: errors raised by `sign` propagate, and a bare
+        object key returned in place of a URL is not kept.
+        """
+        if url := self.url_cache.get(object_key):
+            return url
+
+        url = await sign(object_key)
+        if url and url != object_key:
+            self.url_cache.set(object_key, url)
+        return url
+
     @abstractmethod
     async def upload_file(
         self,
@@ -5,9 +5,22 @@ from google.cloud import storage  # type: ignore
 from google.oauth2 import service_account
 
 from chainlit import make_async
-from chainlit.data.storage_clients.base import BaseStorageClient, storage_expiry_time
+from chainlit.data.storage_clients.base import (
+    BaseStorageClient,
+    UploadStream,
+    iter_parts,
+    storage_expiry_time,
+)
 from chainlit.logger import logger
 
+# Resumable uploads require chunk sizes to be a multiple of 256 KiB
+RESUMABLE_CHUNK_MULTIPLE = 256 * 1024
+
+
+def resumable_chunk_size(part_size: int) -> int:
+    """Round the part size up to a chunk size accepted by resumable uploads."""
+    return max(1, -(-part_size // RESUMABLE_CHUNK_MULTIPLE)) * RESUMABLE_CHUNK_MULTIPLE
+
 
 class GCSStorageClient(BaseStorageClient):
     def __init__(
@@ -46,7 +59,9 @@ class GCSStorageClient(BaseStorageClient):
         )
 
     async def get_read_url(self, object_key: str) -> str:
-        return await make_async(self.sync_get_read_url)(object_key)
+        return await self.get_cached_read_url(
+            object_key, make_async(self.sync_get_read_url)
+        )
 
     def sync_upload_file(
         self,
@@ -89,6 +104,44 @@ class GCSStorageClient(BaseStorageClient):
             object_key, data, mime, overwrite
         )
 
+    async def upload_stream(
+        self,
+        object_key: str,
+        stream: UploadStream,
+        mime: str = "application/octet-stream",
+        overwrite: bool = True,
+        content_disposition: str | None = None,
+    ) -> Dict[str, Any]:
+        """
+        Upload the stream with a resumable upload, one `part_size` chunk at a time.
+
+        The part size is rounded up to a multiple of 256 KiB, as GCS requires.
+        """
+        blob = self.bucket.blob(object_key)
+        chunk_size = resumable_chunk_size(self.part_size)
+
+        try:
+            if not overwrite and await self.run_in_upload_executor(blob.exists):
+                raise Exception(
+                    f"File {object_key} already exists and overwrite is False"
+                )
+
+            writer = await self.run_in_upload_executor(
+                blob.open, "wb", chunk_size=chunk_size, content_type=mime
+            )
+            try:
+                async for part in iter_parts(stream, chunk_size):
+                    await self.run_in_upload_executor(writer.write, part)
+            finally:
+                await self.run_in_upload_executor(writer.close)
+
+            return {
+                "object_key": object_key,
+                "url": await self.get_read_url(object_key),
+            }
+        except Exception as e:
+            raise Exception(f"Failed to upload file to GCS: {e!s}")
+
     def sync_delete_file(self, object_key: str) -> bool:
         try:
             self.bucket.blob(object_key).delete()
@@ -98,7 +151,9 @@ class GCSStorageClient(BaseStorageClient):
             return False
 
     async def delete_file(self, object_key: str) -> bool:
+        self.url_cache.invalidate(object_key)
         return await make_async(self.sync_delete_file)(object_key)
 
     async def close(self) -> None:
+        self.shutdown_upload_executor()
         self.client.close()
@@ -1,10 +1,16 @@
+import asyncio
 import os
-from typing import Any, Dict, Union
+from typing import Any, Dict, List, Union
 
 import boto3  # type: ignore
 
 from chainlit import make_async
-from chainlit.data.storage_clients.base import BaseStorageClient, storage_expiry_time
+from chainlit.data.storage_clients.base import (
+    BaseStorageClient,
+    UploadStream,
+    iter_parts,
+    storage_expiry_time,
+)
 from chainlit.logger import logger
 
 
@@ -21,20 +27,26 @@ class S3StorageClient(BaseStorageClient):
         except Exception as e:
             logger.warning(f"S3StorageClient initialization error: {e}")
 
+    def _presign_read_url(self, object_key: str) -> str:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": object_key},
+            ExpiresIn=storage_expiry_time,
+        )
+
     def sync_get_read_url(self, object_key: str) -> str:
         try:
-            url = self.client.generate_presigned_url(
-                "get_object",
-                Params={"Bucket": self.bucket, "Key": object_key},
-                ExpiresIn=storage_expiry_time,
-            )
-            return url
+            return self._presign_read_url(object_key)
         except Exception as e:
             logger.warning(f"S3StorageClient, get_read_url error: {e}")
             return object_key
 
     async def get_read_url(self, object_key: str) -> str:
-        return await make_async(self.sync_get_read_url)(object_key)
+        # Failures raise rather than returning the object key: they are not cached,
+        # and callers fall back to the stored URL
+        return await self.get_cached_read_url(
+            object_key, make_async(self._presign_read_url)
+        )
 
     def sync_upload_file(
         self,
@@ -76,6 +88,107 @@ class S3StorageClient(BaseStorageClient):
             object_key, data, mime, overwrite, content_disposition
         )
 
+    async def upload_stream(
+        self,
+        object_key: str,
+        stream: UploadStream,
+        mime: str = "application/octet-stream",
+        overwrite: bool = True,
+        content_disposition: str | None = None,
+    ) -> Dict[str, Any]:
+        """Upload the stream with a multipart upload, at most `upload_concurrency` parts in flight."""
+        parts = iter_parts(stream, self.part_size)
+        first_part = await anext(parts, b"")
+        second_part = await anext(parts, None)
+
+        if second_part is None:
+            # Small enough for a single request
+            return await self.run_in_upload_executor(
+                self.sync_upload_file,
+                object_key,
+                first_part,
+                mime,
+                overwrite,
+                content_disposition,
+            )
+
+        extra_args = {"ContentType": mime}
+        if content_disposition is not None:
+            extra_args["ContentDisposition"] = content_disposition
+
+        upload_id = None
+        tasks: List[asyncio.Task] = []
+        semaphore = asyncio.Semaphore(self.upload_concurrency)
+
+        async def upload_part(part_number: int, body: bytes) -> Dict[str, Any]:
+            try:
+                response = await self.run_in_upload_executor(
+                    self.client.upload_part,
+                    Bucket=self.bucket,
+                    Key=object_key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=body,
+                )
+                return {"ETag": response["ETag"], "PartNumber": part_number}
+            finally:
+                semaphore.release()
+
+        async def all_parts():
+            yield first_part
+            yield second_part
+            async for part in parts:
+                yield part
+
+        try:
+            upload = await self.run_in_upload_executor(
+                self.client.create_multipart_upload,
+                Bucket=self.bucket,
+                Key=object_key,
+                **extra_args,
+            )
+            upload_id = upload["UploadId"]
+
+            part_number = 0
+            async for part in all_parts():
+                # Only read the next part once one of the in-flight parts is uploaded
+                await semaphore.acquire()
+                for task in tasks:
+                    if task.done() and task.exception():
+                        raise task.exception()  # type: ignore[misc]
+                part_number += 1
+                tasks.append(asyncio.create_task(upload_part(part_number, part)))
+
+            uploaded_parts = await asyncio.gather(*tasks)
+            await self.run_in_upload_executor(
+                self.client.complete_multipart_upload,
+                Bucket=self.bucket,
+                Key=object_key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": uploaded_parts},
+            )
+
+            endpoint = os.environ.get("DEV_AWS_ENDPOINT", "amazonaws.com")
+            url = f"https://{self.bucket}.s3.{endpoint}/{object_key}"
+            return {"object_key": object_key, "url": url}
+        except Exception as e:
+            logger.warning(f"S3StorageClient, upload_stream error: {e}")
+            for task in tasks:
+                task.cancel()
+            if upload_id is not None:
+                try:
+                    await self.run_in_upload_executor(
+                        self.client.abort_multipart_upload,
+                        Bucket=self.bucket,
+                        Key=object_key,
+                        UploadId=upload_id,
+                    )
+                except Exception as abort_error:
+                    logger.warning(
+                        f"S3StorageClient, abort_multipart_upload error: {abort_error}"
+                    )
+            return {}
+
     def sync_delete_file(self, object_key: str) -> bool:
         try:
             self.client.delete_object(Bucket=self.bucket, Key=object_key)
@@ -85,7 +198,9 @@ class S3StorageClient(BaseStorageClient):
             return False
 
     async def delete_file(self, object_key: str) -> bool:
+        self.url_cache.invalidate(object_key)
         return await make_async(self.sync_delete_file)(object_key)
 
     async def close(self) -> None:
+        self.shutdown_upload_executor()
         await self.client.close()
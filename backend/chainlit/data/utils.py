@@ -1,9 +1,19 @@
+import asyncio
 import functools
 from collections import deque
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional
 
 from chainlit.context import context
+from chainlit.logger import logger
 from chainlit.session import WebsocketSession
 
+if TYPE_CHECKING:
+    from chainlit.data.storage_clients.base import BaseStorageClient
+    from chainlit.types import ResumeCursor, ThreadDelta, ThreadDict
+
+# Maximum number of element URLs signed at once when loading threads
+URL_SIGNING_CONCURRENCY = 10
+
 
 def queue_until_user_message():
     def decorator(method):
@@ -27,3 +37,73 @@ def queue_until_user_message():
         return wrapper
 
     return decorator
+
+
+async def sign_element_urls(
+    storage_client: Optional["BaseStorageClient"],
+    elements: Iterable[Dict[str, Any]],
+    concurrency: int = URL_SIGNING_CONCURRENCY,
+    overwrite: bool = True,
+):
+    """
+    Set the `url` of elements stored in `storage_client` to a read URL of their object.
+
+    URLs are signed concurrently, `concurrency` at once, so that loading a thread
+    does not take longer with every element. An element whose URL cannot be signed
+    keeps its stored URL. Elements which already have one are left untouched unless
+    `overwrite` is set.
+    """
+    if storage_client is None:
+        return
+
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def sign(element: Dict[str, Any]):
+        object_key = element["objectKey"]
+        async with semaphore:
+            try:
+                element["url"] = await storage_client.get_read_url(
+                    object_key=object_key
+                )
+            except Exception as e:
+                logger.warning(
+                    f"Failed to get read URL for object_key '{object_key}': {e}. Falling back to stored URL."
+                )
+
+    await asyncio.gather(
+        *(
+            sign(element)
+            for element in elements
+            if isinstance(element.get("objectKey"), str)
+            and element["objectKey"].strip()
+            and (overwrite or not element.get("url"))
+        )
+    )
+
+
+def thread_delta(
+    thread: "ThreadDict", cursor: "ResumeCursor"
+) -> Optional["ThreadDelta"]:
+    """
+    Slice the steps of a loaded thread from the cursor step on, like
+    `BaseDataLayer.get_thread_steps_since`. Returns None if the cursor step is not
+    part of the thread.
+    """
+    steps = thread["steps"]
+    index = next(
+        (i for i, step in enumerate(steps) if step["id"] == cursor["stepId"]), None
+    )
+    if index is None:
+        return None
+
+    delta_steps = steps[index:]
+    step_ids = {step["id"] for step in delta_steps}
+    return {
+        "id": thread["id"],
+        "steps": delta_steps,
+        "elements": [
+            element
+            for element in thread.get("elements") or []
+            if element.get("forId") in step_ids
+        ],
+    }
@@ -0,0 +1,129 @@
+import asyncio
+import contextvars
+from collections import deque
+from typing import Awaitable, Callable, Deque, Generic, List, Optional, Tuple, TypeVar
+
+from chainlit.logger import logger
+
+T = TypeVar("T")
+
+
+class WriteBehindQueue(Generic[T]):
+    """
+    Bounded queue of pending writes, flushed in batches by a background worker.
+
+    A batch is flushed as soon as it holds `max_batch_size` writes, or `flush_interval`
+    seconds after its first write was queued. Once `max_size` writes are pending,
+    `put` waits for the worker to catch up.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[List[T]], Awaitable[None]],
+        max_batch_size: int = 100,
+        flush_interval: float = 0.05,
+        max_size: int = 10_000,
+    ):
+        self.flush = flush
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self._queue: Optional[asyncio.Queue[T]] = None
+        # Set when the current batch should be flushed without waiting for the interval
+        self._flush_now: Optional[asyncio.Event] = None
+        self._draining = 0
+        # Writes are flushed in order, so counting them tells which ones are persisted
+        self._queued = 0
+        self._flushed = 0
+        # Drains waiting for the writes queued before them, by number of writes
+        self._drain_waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        """Number of writes waiting to be flushed."""
+        return self._queue.qsize() if self._queue else 0
+
+    async def put(self, item: T):
+        """Queue a write, starting the worker if needed."""
+        if self._queue is None or self._flush_now is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+            self._flush_now = asyncio.Event()
+        if self._worker is None or self._worker.done():
+            # Run the worker in a blank context, it outlives the session queuing the write
+            self._worker = contextvars.Context().run(asyncio.create_task, self._run())
+        await self._queue.put(item)
+        self._queued += 1
+        if self._queue.qsize() >= self.max_batch_size:
+            self._flush_now.set()
+
+    async def _next_batch(
+        self, queue: "asyncio.Queue[T]", flush_now: asyncio.Event
+    ) -> List[T]:
+        batch = [await queue.get()]
+        if not flush_now.is_set():
+            # Give the batch a chance to fill up
+            try:
+                await asyncio.wait_for(flush_now.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+        while len(batch) < self.max_batch_size and not queue.empty():
+            batch.append(queue.get_nowait())
+        if not self._draining and queue.qsize() < self.max_batch_size:
+            flush_now.clear()
+        return batch
+
+    async def _run(self):
+        queue, flush_now = self._queue, self._flush_now
+        assert queue is not None
+        assert flush_now is not None
+        while True:
+            batch = await self._next_batch(queue, flush_now)
+            try:
+                await self.flush(batch)
+            except Exception as e:
+                logger.error(f"Failed to flush {len(batch)} pending writes: {e!s}")
+            finally:
+                self._flushed += len(batch)
+                self._wake_drains()
+
+    def _wake_drains(self):
+        while self._drain_waiters and self._drain_waiters[0][0] <= self._flushed:
+            _, waiter = self._drain_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def drain(self):
+        """
+        Flush the queued writes right away and wait until they are persisted.
+
+        Only the writes queued before the call are waited for, writes keep coming
+        in while other sessions are active.
+        """
+        if self._queue is None or self._flush_now is None:
+            return
+        if self._worker is None or self._worker.done():
+            return
+
+        if self._flushed >= self._queued:
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._drain_waiters.append((self._queued, waiter))
+        self._draining += 1
+        self._flush_now.set()
+        try:
+            await waiter
+        finally:
+            self._draining -= 1
+
+    async def close(self):
+        """Flush the pending writes and stop the worker."""
+        await self.drain()
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
@@ -1,6 +1,6 @@
 import asyncio
 import uuid
-from typing import Any, Dict, List, Literal, Optional, Union, cast, get_args
+from typing import Any, Dict, List, Literal, Optional, Tuple, Union, cast, get_args
 
 from socketio.exceptions import TimeoutError
 
@@ -23,6 +23,7 @@ from chainlit.types import (
     FileReference,
     MessagePayload,
     OutputAudioChunk,
+    ThreadDelta,
     ThreadDict,
     ToastType,
 )
@@ -30,6 +31,69 @@ from chainlit.user import PersistedUser
 from chainlit.utils import utc_now
 
 
+class TokenCoalescer:
+    """
+    Buffer the tokens streamed by the steps of a session and emit them as a single
+    `stream_token` frame per step every `interval` seconds, or as soon as the
+    buffered frame reaches `max_bytes`.
+    """
+
+    def __init__(self, session: WebsocketSession, interval: float, max_bytes: int):
+        self.session = session
+        self.interval = interval
+        self.max_bytes = max_bytes
+        # Pending frames keyed by (step id, is_input)
+        self.frames: Dict[Tuple[str, bool], Dict[str, Any]] = {}
+        self.timer: Optional[asyncio.Task] = None
+
+    async def push(self, id: str, token: str, is_sequence=False, is_input=False):
+        key = (id, is_input)
+        frame = self.frames.get(key)
+        if frame is None or is_sequence:
+            # A sequence replaces the content, previously buffered tokens are obsolete
+            frame = {"tokens": [], "size": 0, "isSequence": is_sequence}
+            self.frames[key] = frame
+        frame["tokens"].append(token)
+        frame["size"] += len(token.encode("utf-8"))
+
+        if frame["size"] >= self.max_bytes:
+            await self.flush(id)
+        elif self.timer is None:
+            self.timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.interval)
+        self.timer = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush streamed tokens: {e!s}")
+
+    async def flush(self, id: Optional[str] = None):
+        """Emit the pending frames of a step, or of every step if no id is given."""
+        keys = [key for key in self.frames if id is None or key[0] == id]
+        for key in keys:
+            # Another flush may have emitted the frame while this one was emitting
+            if (frame := self.frames.pop(key, None)) is None:
+                continue
+            await self.session.emit(
+                "stream_token",
+                {
+                    "id": key[0],
+                    "token": "".join(frame["tokens"]),
+                    "isSequence": frame["isSequence"],
+                    "isInput": key[1],
+                },
+            )
+
+    def close(self):
+        """Drop the pending frames and cancel the flush timer."""
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+        self.frames.clear()
+
+
 class BaseChainlitEmitter:
     """
     Chainlit Emitter Stub class. This class is used for testing purposes.
@@ -55,6 +119,10 @@ class BaseChainlitEmitter:
         """Stub method to resume a thread."""
         pass
 
+    async def resume_thread_delta(self, delta: ThreadDelta):
+        """Stub method to send the steps missed by a client resuming a thread."""
+        pass
+
     async def send_resume_thread_error(self, error: str):
         """Stub method to send a resume thread error."""
         pass
@@ -196,6 +264,10 @@ class ChainlitEmitter(BaseChainlitEmitter):
         """Send a thread to the UI to resume it"""
         return self.emit("resume_thread", thread_dict)
 
+    def resume_thread_delta(self, delta: ThreadDelta):
+        """Send the steps a client missed to the UI, to resume a thread it holds"""
+        return self.emit("resume_thread_delta", delta)
+
     def send_resume_thread_error(self, error: str):
         """Send a thread resume error to the UI"""
         return self.emit("resume_thread_error", error)
@@ -216,17 +288,43 @@ class ChainlitEmitter(BaseChainlitEmitter):
         """Stub method to send an element to the UI."""
         await self.emit("element", element_dict)
 
-    def send_step(self, step_dict: StepDict):
+    def _get_token_coalescer(self) -> Optional[TokenCoalescer]:
+        """Get the token coalescer of the session, creating it if coalescing is enabled."""
+        coalescer = getattr(self.session, "token_coalescer", None)
+        if isinstance(coalescer, TokenCoalescer):
+            return coalescer
+
+        if config.project.stream_token_interval_ms <= 0:
+            return None
+
+        coalescer = TokenCoalescer(
+            self.session,
+            interval=config.project.stream_token_interval_ms / 1000,
+            max_bytes=config.project.stream_token_max_bytes,
+        )
+        self.session.token_coalescer = coalescer
+        return coalescer
+
+    async def flush_tokens(self, id: Optional[str] = None):
+        """Emit the tokens buffered for a step (or every step) right away."""
+        coalescer = getattr(self.session, "token_coalescer", None)
+        if isinstance(coalescer, TokenCoalescer):
+            await coalescer.flush(id)
+
+    async def send_step(self, step_dict: StepDict):
         """Send a message to the UI."""
-        return self.emit("new_message", step_dict)
+        await self.flush_tokens(step_dict.get("id"))
+        return await self.emit("new_message", step_dict)
 
-    def update_step(self, step_dict: StepDict):
+    async def update_step(self, step_dict: StepDict):
         """Update a message in the UI."""
-        return self.emit("update_message", step_dict)
+        await self.flush_tokens(step_dict.get("id"))
+        return await self.emit("update_message", step_dict)
 
-    def delete_step(self, step_dict: StepDict):
+    async def delete_step(self, step_dict: StepDict):
         """Delete a message in the UI."""
-        return self.emit("delete_message", step_dict)
+        await self.flush_tokens(step_dict.get("id"))
+        return await self.emit("delete_message", step_dict)
 
     def send_timeout(self, event: Literal["ask_timeout", "call_fn_timeout"]):
         return self.emit(event, {})
@@ -430,9 +528,15 @@ class ChainlitEmitter(BaseChainlitEmitter):
             step_dict,
         )
 
-    def send_token(self, id: str, token: str, is_sequence=False, is_input=False):
-        """Send a message token to the UI."""
-        return self.emit(
+    async def send_token(self, id: str, token: str, is_sequence=False, is_input=False):
+        """Send a message token to the UI, coalesced with its neighbours if enabled."""
+        if coalescer := self._get_token_coalescer():
+            await coalescer.push(
+                id=id, token=token, is_sequence=is_sequence, is_input=is_input
+            )
+            return
+
+        await self.emit(
             "stream_token",
             {"id": id, "token": token, "isSequence": is_sequence, "isInput": is_input},
         )
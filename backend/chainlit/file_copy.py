@@ -0,0 +1,116 @@
+import errno
+import os
+import shutil
+import sys
+from typing import Callable, List, Literal, Tuple
+
+from asyncer import asyncify
+
+from chainlit.logger import logger
+
+CopyStrategy = Literal["link", "reflink", "copy_file_range", "sendfile", "chunked"]
+
+# Size of the chunks of the last resort copy
+COPY_CHUNK_SIZE = 1024 * 1024
+# FICLONE ioctl request, sharing the extents of a file on copy-on-write filesystems
+_FICLONE = 0x40049409
+
+
+def _unsupported(name: str) -> OSError:
+    return OSError(errno.ENOTSUP, f"{name} is not supported on this platform")
+
+
+def _short_copy(name: str, copied: int, size: int) -> OSError:
+    # The source shrank, or the kernel stopped early: the copy would be truncated
+    return OSError(errno.EIO, f"{name} copied {copied} of {size} bytes")
+
+
+def _link(src: str, dst: str):
+    os.link(src, dst)
+
+
+def _reflink(src: str, dst: str):
+    if not sys.platform.startswith("linux"):
+        raise _unsupported("reflink")
+
+    import fcntl
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+
+
+def _copy_file_range(src: str, dst: str):
+    if not hasattr(os, "copy_file_range"):
+        raise _unsupported("copy_file_range")
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        remaining = size
+        while remaining > 0:
+            copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+            if not copied:
+                raise _short_copy("copy_file_range", size - remaining, size)
+            remaining -= copied
+
+
+def _sendfile(src: str, dst: str):
+    if not sys.platform.startswith("linux"):
+        # Other platforms only send files to sockets
+        raise _unsupported("sendfile")
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, size - offset)
+            if not sent:
+                raise _short_copy("sendfile", offset, size)
+            offset += sent
+
+
+def _chunked(src: str, dst: str):
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        shutil.copyfileobj(fsrc, fdst, COPY_CHUNK_SIZE)
+
+
+COPY_STRATEGIES: List[Tuple[CopyStrategy, Callable[[str, str], None]]] = [
+    ("link", _link),
+    ("reflink", _reflink),
+    ("copy_file_range", _copy_file_range),
+    ("sendfile", _sendfile),
+    ("chunked", _chunked),
+]
+
+
+def copy_file(src: str, dst: str, link: bool = True) -> CopyStrategy:
+    """
+    Copy `src` to `dst` with the cheapest strategy the platform and filesystem allow.
+
+    Unless `link` is False, the file is hard linked when both paths are on the same
+    filesystem, which costs no I/O but means later changes to the source are
+    visible in the copy. Otherwise its extents are shared (reflink), or it is copied in the kernel
+    (copy_file_range, sendfile), falling back to a chunked copy in user space. A
+    kernel copy that stops short of the size of the source falls back as well.
+
+    Returns the strategy that was used.
+    """
+    for name, strategy in COPY_STRATEGIES[:-1]:
+        if name == "link" and not link:
+            continue
+        try:
+            strategy(src, dst)
+            return name
+        except OSError as e:
+            logger.debug(f"Failed to {name} {src} to {dst}: {e!s}")
+            try:
+                os.unlink(dst)
+            except FileNotFoundError:
+                pass
+
+    name, strategy = COPY_STRATEGIES[-1]
+    strategy(src, dst)
+    return name
+
+
+async def async_copy_file(src: str, dst: str, link: bool = True) -> CopyStrategy:
+    return await asyncify(copy_file)(src, dst, link)
@@ -0,0 +1,237 @@
+import hashlib
+import os
+import shutil
+import socket
+import uuid
+from pathlib import Path
+from typing import AsyncIterable, Dict, Optional, Set, Tuple, TypedDict
+
+import aiofiles
+from asyncer import asyncify
+
+from chainlit.file_copy import COPY_CHUNK_SIZE, async_copy_file
+from chainlit.logger import logger
+
+
+class FileStoreStats(TypedDict):
+    blobs: int
+    references: int
+    bytes: int
+    deduplicated_bytes: int
+
+
+def hash_file(path: str, algorithm: str) -> Tuple[str, int]:
+    """Hash a file, returning its hex digest and size."""
+    digest = hashlib.new(algorithm)
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(COPY_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+class ContentAddressedFileStore:
+    """
+    Store session files once per distinct content, keyed by their hash.
+
+    Every persisted file references the blob holding its content, and blobs are
+    deleted as soon as their last reference is released, typically when the
+    sessions holding them are deleted. References are tracked in memory, so a
+    store root must not be shared between processes.
+    """
+
+    def __init__(self, root: Path, hash_algorithm: str = "sha256"):
+        self.root = root
+        self.hash_algorithm = hash_algorithm
+        # Bytes that did not have to be written because the blob already existed
+        self.deduplicated_bytes = 0
+        # Blob name -> (session id, file id) of the files referencing it
+        self._references: Dict[str, Set[Tuple[str, str]]] = {}
+        # Session id -> file id -> blob name
+        self._sessions: Dict[str, Dict[str, str]] = {}
+        self._sizes: Dict[str, int] = {}
+
+    def clear(self):
+        """Delete every blob under the root, e.g. those left over by a previous run."""
+        self._references.clear()
+        self._sessions.clear()
+        self._sizes.clear()
+        if self.root.is_dir():
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    def blob_path(self, name: str) -> Path:
+        return self.root / name[:2] / name
+
+    def _temp_path(self) -> Path:
+        temp_dir = self.root / "tmp"
+        temp_dir.mkdir(parents=True, exist_ok=True)
+        return temp_dir / uuid.uuid4().hex
+
+    def _reference(self, name: str, size: int, session_id: str, file_id: str) -> Path:
+        if self._references.get(name):
+            self.deduplicated_bytes += size
+        self._references.setdefault(name, set()).add((session_id, file_id))
+        self._sessions.setdefault(session_id, {})[file_id] = name
+        self._sizes[name] = size
+        return self.blob_path(name)
+
+    async def put(
+        self,
+        session_id: str,
+        file_id: str,
+        suffix: str = "",
+        path: Optional[str] = None,
+        chunks: Optional[AsyncIterable[bytes]] = None,
+    ) -> Tuple[Path, str, int]:
+        """
+        Reference the content of the file at `path`, or of `chunks`, for a session file.
+
+        The content is only written when no blob holds it yet. `suffix` (usually the
+        file extension) is part of the blob name, so that blobs keep it.
+        Returns the path of the blob, the digest of the content and its size.
+        """
+        if path:
+            # Hash first, the source does not need to be copied if the blob exists
+            digest, size = await asyncify(hash_file)(path, self.hash_algorithm)
+            name = digest + suffix
+            blob_path = self.blob_path(name)
+            if blob_path.exists():
+                return self._reference(name, size, session_id, file_id), digest, size
+
+            temp_path = self._temp_path()
+            try:
+                # Never hard link, later changes to the source would alter the blob
+                await async_copy_file(path, str(temp_path), link=False)
+            except BaseException:
+                temp_path.unlink(missing_ok=True)
+                raise
+        elif chunks is not None:
+            temp_path = self._temp_path()
+            hasher = hashlib.new(self.hash_algorithm)
+            size = 0
+            try:
+                async with aiofiles.open(temp_path, "wb") as f:
+                    async for chunk in chunks:
+                        hasher.update(chunk)
+                        size += len(chunk)
+                        await f.write(chunk)
+            except BaseException:
+                temp_path.unlink(missing_ok=True)
+                raise
+            digest = hasher.hexdigest()
+            name = digest + suffix
+            blob_path = self.blob_path(name)
+        else:
+            raise ValueError("Either path or chunks must be provided")
+
+        if blob_path.exists():
+            temp_path.unlink()
+        else:
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(temp_path, blob_path)
+
+        return self._reference(name, size, session_id, file_id), digest, size
+
+    def _release(self, name: str, session_id: str, file_id: str) -> bool:
+        references = self._references.get(name)
+        if references is None:
+            return False
+
+        references.discard((session_id, file_id))
+        if references:
+            return False
+
+        del self._references[name]
+        self._sizes.pop(name, None)
+        try:
+            self.blob_path(name).unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Failed to delete blob {name}: {e!s}")
+        return True
+
+    def release(self, session_id: str, file_id: str) -> bool:
+        """Drop the reference of a session file, returning whether its blob was deleted."""
+        name = self._sessions.get(session_id, {}).pop(file_id, None)
+        if name is None:
+            return False
+        return self._release(name, session_id, file_id)
+
+    def release_session(self, session_id: str) -> int:
+        """Drop the references of every file of a session, returning the number of deleted blobs."""
+        files = self._sessions.pop(session_id, {})
+        return sum(
+            self._release(name, session_id, file_id) for file_id, name in files.items()
+        )
+
+    def stats(self) -> FileStoreStats:
+        return {
+            "blobs": len(self._references),
+            "references": sum(len(refs) for refs in self._references.values()),
+            "bytes": sum(self._sizes.values()),
+            "deduplicated_bytes": self.deduplicated_bytes,
+        }
+
+
+_file_store: Optional[ContentAddressedFileStore] = None
+
+
+def _is_process_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill would terminate the process on Windows, assume it is alive
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def remove_stale_roots(blobs_directory: Path, node_name: str) -> int:
+    """Delete the store roots of the dead processes of this node, returning their number."""
+    if not blobs_directory.is_dir():
+        return 0
+
+    removed = 0
+    for root in blobs_directory.iterdir():
+        prefix, _, pid = root.name.rpartition("-")
+        if prefix != node_name or not pid.isdigit() or not root.is_dir():
+            continue
+        if int(pid) == os.getpid() or _is_process_alive(int(pid)):
+            continue
+        shutil.rmtree(root, ignore_errors=True)
+        removed += 1
+    return removed
+
+
+def get_file_store() -> Optional[ContentAddressedFileStore]:
+    """Store backing session files, when project.deduplicate_files is enabled."""
+    global _file_store
+
+    from chainlit.config import FILES_DIRECTORY, config
+
+    if not config.project.deduplicate_files:
+        return None
+
+    if _file_store is None:
+        # References are tracked in memory, so every process sharing the files
+        # directory gets its own root, named after its node and pid. Sessions do not
+        # survive their process, so the roots of dead processes are deleted.
+        blobs_directory = FILES_DIRECTORY / ".blobs"
+        node_name = os.environ.get("CHAINLIT_NODE_ID") or socket.gethostname()
+        remove_stale_roots(blobs_directory, node_name)
+        _file_store = ContentAddressedFileStore(
+            blobs_directory / f"{node_name}-{os.getpid()}",
+            hash_algorithm=config.project.upload_hash_algorithm or "sha256",
+        )
+        # Left over by a dead process which had the same pid
+        _file_store.clear()
+    return _file_store
+
+
+def release_session_files(session_id: str):
+    """Release the blobs referenced by a session, even if deduplication was disabled since."""
+    if _file_store is not None:
+        _file_store.release_session(session_id)
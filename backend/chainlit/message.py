@@ -32,7 +32,9 @@ class MessageBase(ABC):
     id: str
     thread_id: str
     author: str
-    content: str = ""
+    _content: str = ""
+    # Tokens streamed since the content was last read, joined lazily
+    _content_chunks: Optional[List[str]] = None
     type: MessageStepType = "assistant_message"
     streaming = False
     created_at: Union[str, None] = None
@@ -58,6 +60,18 @@ class MessageBase(ABC):
         if not getattr(self, "id", None):
             self.id = str(uuid.uuid4())
 
+    @property
+    def content(self) -> str:
+        if self._content_chunks:
+            self._content += "".join(self._content_chunks)
+            self._content_chunks = None
+        return self._content
+
+    @content.setter
+    def content(self, content: str):
+        self._content_chunks = None
+        self._content = content
+
     @classmethod
     def from_dict(self, _dict: StepDict):
         type = _dict.get("type", "assistant_message")
@@ -185,7 +199,9 @@ class MessageBase(ABC):
         if is_sequence:
             self.content = token
         else:
-            self.content += token
+            if self._content_chunks is None:
+                self._content_chunks = []
+            self._content_chunks.append(token)
 
         assert self.id
 
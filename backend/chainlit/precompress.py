@@ -0,0 +1,138 @@
+"""
+Compressed side files of static assets, e.g. index-D5UwcQeN.js.gz.
+
+Only depends on the standard library (and brotli, if installed), so that the build
+hook can load it to precompress the frontend without importing chainlit.
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+import uuid
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# Brotli is optional, gzip is used when it is not installed
+try:
+    import brotli
+except ImportError:
+    brotli = None  # type: ignore[assignment]
+
+logger = logging.getLogger("chainlit")
+
+COMPRESSIBLE_EXTENSIONS = {
+    ".css",
+    ".html",
+    ".js",
+    ".json",
+    ".map",
+    ".mjs",
+    ".otf",
+    ".svg",
+    ".ttf",
+    ".txt",
+    ".wasm",
+    ".xml",
+}
+# Smaller files do not benefit from compression
+MIN_COMPRESS_SIZE = 1024
+
+# Supported encodings, in order of preference, with the suffix of their side files
+ENCODINGS: List[Tuple[str, str]] = [("br", ".br"), ("gzip", ".gz")]
+
+# Side files are written there when the build directory is read only
+FALLBACK_DIR = Path(tempfile.gettempdir()) / "chainlit-static"
+
+
+def is_compressible(path: Path) -> bool:
+    return path.suffix.lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def supported_encodings() -> List[Tuple[str, str]]:
+    return [
+        (encoding, suffix)
+        for encoding, suffix in ENCODINGS
+        if encoding != "br" or brotli is not None
+    ]
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        assert brotli is not None, "brotli is not installed"
+        return brotli.compress(data)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _write_atomically(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+    try:
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def _is_fresh(side_path: Path, source_mtime: float) -> bool:
+    try:
+        return side_path.stat().st_mtime >= source_mtime
+    except OSError:
+        return False
+
+
+def _fallback_path(path: Path, suffix: str) -> Path:
+    directory = hashlib.sha256(str(path.parent.resolve()).encode()).hexdigest()[:16]
+    return FALLBACK_DIR / directory / (path.name + suffix)
+
+
+def get_precompressed(path: Path, encoding: str, suffix: str) -> Optional[Path]:
+    """
+    Get the side file holding `path` compressed with `encoding`, creating it on first use.
+
+    Side files are expected next to the file (e.g. index-D5UwcQeN.js.br), as written
+    by `precompress_directory` at build time. They are otherwise compressed on first
+    use, next to the file or in a temporary directory if the build directory is read
+    only. Returns None if the file cannot be compressed.
+    """
+    try:
+        source_mtime = path.stat().st_mtime
+    except OSError:
+        return None
+
+    candidates = [path.with_name(path.name + suffix), _fallback_path(path, suffix)]
+    for side_path in candidates:
+        if _is_fresh(side_path, source_mtime):
+            return side_path
+
+    try:
+        data = compress(path.read_bytes(), encoding)
+    except OSError as e:
+        logger.debug("Failed to compress %s: %s", path, e)
+        return None
+
+    for side_path in candidates:
+        try:
+            _write_atomically(side_path, data)
+            return side_path
+        except OSError as e:
+            logger.debug("Failed to write %s: %s", side_path, e)
+    return None
+
+
+def precompress_directory(directory: Path) -> int:
+    """Write the compressed side files of every compressible file of a build directory."""
+    count = 0
+    for path in directory.rglob("*"):
+        if (
+            not path.is_file()
+            or not is_compressible(path)
+            or path.stat().st_size < MIN_COMPRESS_SIZE
+        ):
+            continue
+        for encoding, suffix in supported_encodings():
+            if get_precompressed(path, encoding, suffix):
+                count += 1
+    return count
@@ -10,7 +10,18 @@ import urllib.parse
 import webbrowser
 from contextlib import AsyncExitStack, asynccontextmanager
 from pathlib import Path
-from typing import TYPE_CHECKING, List, Optional, Union, cast
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
 
 import socketio
 from fastapi import (
@@ -34,7 +45,14 @@ from starlette.types import Receive, Scope, Send
 from typing_extensions import Annotated
 from watchfiles import awatch
 
-from chainlit.auth import create_jwt, decode_jwt, get_configuration, get_current_user
+from chainlit.auth import (
+    create_jwt,
+    decode_jwt,
+    get_configuration,
+    get_current_user,
+    invalidate_token,
+    reuseable_oauth,
+)
 from chainlit.auth.cookie import (
     clear_auth_cookie,
     clear_oauth_state_cookie,
@@ -50,16 +68,24 @@ from chainlit.config import (
     PACKAGE_ROOT,
     ChainlitConfig,
     config,
+    get_config_generation,
     load_module,
     public_dir,
     reload_config,
 )
+from chainlit.config_cache import ConfigCache
 from chainlit.data import get_data_layer
 from chainlit.data.acl import is_thread_author
 from chainlit.logger import logger
 from chainlit.markdown import get_markdown_str
 from chainlit.oauth_providers import get_oauth_provider
 from chainlit.secret import random_secret
+from chainlit.session_directory import (
+    close_forward_client,
+    forward_to_session_owner,
+    get_client_manager,
+)
+from chainlit.static_files import serve_static_file
 from chainlit.types import (
     AskFileSpec,
     CallActionRequest,
@@ -74,10 +100,11 @@ from chainlit.types import (
     UpdateFeedbackRequest,
     UpdateThreadRequest,
 )
+from chainlit.upload import MultipartFileStream
 from chainlit.user import PersistedUser, User
 from chainlit.utils import utc_now
 
-from ._utils import is_path_inside
+from ._utils import etag_matches, is_path_inside, make_etag
 
 if TYPE_CHECKING:
     from chainlit.element import CustomElement, ElementDict
@@ -185,6 +212,8 @@ async def lifespan(app: FastAPI):
 
             if data_layer := get_data_layer():
                 await data_layer.close()
+
+            await close_forward_client()
         except asyncio.exceptions.CancelledError:
             pass
 
@@ -227,7 +256,9 @@ copilot_build_dir = get_build_dir(os.path.join("libs", "copilot"), "copilot")
 
 app = FastAPI(lifespan=lifespan)
 
-sio = socketio.AsyncServer(cors_allowed_origins=[], async_mode="asgi")
+sio = socketio.AsyncServer(
+    cors_allowed_origins=[], async_mode="asgi", client_manager=get_client_manager()
+)
 
 asgi_app = socketio.ASGIApp(socketio_server=sio, socketio_path="")
 
@@ -244,13 +275,22 @@ app.add_middleware(
 )
 
 
+# Paths of the build directories, served by serve_static_file
+STATIC_ASSET_PATHS = (
+    f"{config.run.root_path}/assets/",
+    f"{config.run.root_path}/copilot/",
+)
+
+
 class SafariWebSocketsCompatibleGZipMiddleware(GZipMiddleware):
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         if scope["type"] != "http":
             return await self.app(scope, receive, send)
 
+        path = URL(scope=scope).path
         # Prevent gzip compression for HTTP requests to socket.io path due to a bug in Safari
-        if URL(scope=scope).path.startswith(SOCKET_IO_PATH):
+        # Static assets are served precompressed
+        if path.startswith(SOCKET_IO_PATH) or path.startswith(STATIC_ASSET_PATHS):
             await self.app(scope, receive, send)
         else:
             await super().__call__(scope, receive, send)
@@ -282,6 +322,7 @@ async def serve_public_file(
 
 @router.get("/assets/{filename:path}")
 async def serve_asset_file(
+    request: Request,
     filename: str,
 ):
     """Serve a file from assets dir."""
@@ -293,13 +334,14 @@ async def serve_asset_file(
         raise HTTPException(status_code=400, detail="Invalid filename")
 
     if file_path.is_file():
-        return FileResponse(file_path)
+        return await serve_static_file(request, file_path)
     else:
         raise HTTPException(status_code=404, detail="File not found")
 
 
 @router.get("/copilot/{filename:path}")
 async def serve_copilot_file(
+    request: Request,
     filename: str,
 ):
     """Serve a file from assets dir."""
@@ -311,7 +353,7 @@ async def serve_copilot_file(
         raise HTTPException(status_code=400, detail="Invalid filename")
 
     if file_path.is_file():
-        return FileResponse(file_path)
+        return await serve_static_file(request, file_path)
     else:
         raise HTTPException(status_code=404, detail="File not found")
 
@@ -436,6 +478,40 @@ def get_html_template(root_path):
         return content
 
 
+# Root path -> (cache key, rendered template, ETag)
+_html_template_cache: Dict[str, Tuple[tuple, str, str]] = {}
+
+
+def _mtime(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def get_cached_html_template(root_path: str) -> Tuple[str, str]:
+    """
+    Get the HTML template for the index view along with its ETag.
+
+    The template is rendered once per root path and config generation. The
+    modification times of index.html and theme.json are part of the cache key as
+    well, since neither triggers a config reload when edited.
+    """
+    key = (
+        get_config_generation(),
+        _mtime(Path(build_dir) / "index.html"),
+        _mtime(Path(public_dir) / "theme.json"),
+    )
+    cached = _html_template_cache.get(root_path)
+    if cached and cached[0] == key:
+        return cached[1], cached[2]
+
+    html_template = get_html_template(root_path)
+    etag = make_etag(html_template)
+    _html_template_cache[root_path] = (key, html_template, etag)
+    return html_template, etag
+
+
 def get_user_facing_url(url: URL):
     """
     Return the user facing URL for a given URL.
@@ -553,9 +629,16 @@ async def login(
 
 
 @router.post("/logout")
-async def logout(request: Request, response: Response):
+async def logout(
+    request: Request,
+    response: Response,
+    token: Optional[str] = Depends(reuseable_oauth),
+):
     """Logout the user by calling the on_logout callback."""
     clear_auth_cookie(request, response)
+    if token:
+        # Do not keep serving the user of the token from the cache
+        invalidate_token(token)
 
     if config.code.on_logout:
         return await config.code.on_logout(request, response)
@@ -781,8 +864,45 @@ async def set_session_cookie(request: Request, response: Response):
     return {"message": "Session cookie set"}
 
 
+_MISSING = object()
+
+# Responses and values derived from the config, dropped when it is reloaded
+translations_cache: ConfigCache[Tuple[bytes, str]] = ConfigCache()
+markdown_cache: ConfigCache[Optional[str]] = ConfigCache()
+profile_settings_cache: ConfigCache[Tuple[ChainlitConfig, dict, dict]] = ConfigCache()
+# Results of the user dependent settings callbacks, when project.settings_callbacks_cache_ttl is set
+settings_callbacks_cache: ConfigCache[Any] = ConfigCache(maxsize=1024)
+
+
+def cached_json_response(
+    request: Request, body: bytes, etag: str, cache_control: str = "no-cache"
+) -> Response:
+    """Serve a rendered JSON body with its ETag, or a 304 if the client has it already."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def call_settings_callback(
+    callback: Callable[..., Awaitable[Any]], key: tuple, *args: Any
+) -> Any:
+    """Call a settings callback, caching its result for project.settings_callbacks_cache_ttl seconds."""
+    ttl = config.project.settings_callbacks_cache_ttl
+    if not ttl:
+        return await callback(*args)
+
+    cache_key = (callback, *key)
+    result = settings_callbacks_cache.get(cache_key, _MISSING)
+    if result is _MISSING:
+        result = await callback(*args)
+        settings_callbacks_cache.set(cache_key, result, ttl=ttl)
+    return result
+
+
 @router.get("/project/translations")
 async def project_translations(
+    request: Request,
     language: str = Query(
         default="en-US", description="Language code", pattern=_language_pattern
     ),
@@ -792,18 +912,20 @@ async def project_translations(
     # Use configured language if set, otherwise use the language from query
     effective_language = config.ui.language or language
 
-    # Load translation based on the effective language
-    translation = config.load_translation(effective_language)
+    cached = translations_cache.get(effective_language)
+    if cached is None:
+        # Load translation based on the effective language
+        translation = config.load_translation(effective_language)
+        body = JSONResponse(content={"translation": translation}).body
+        cached = (body, make_etag(body))
+        translations_cache.set(effective_language, cached)
 
-    return JSONResponse(
-        content={
-            "translation": translation,
-        }
-    )
+    return cached_json_response(request, *cached)
 
 
 @router.get("/project/settings")
 async def project_settings(
+    request: Request,
     current_user: UserParam,
     language: str = Query(
         default="en-US", description="Language code", pattern=_language_pattern
@@ -818,13 +940,21 @@ async def project_settings(
     effective_language = config.ui.language or language
 
     # Load the markdown file based on the provided language
-    markdown = get_markdown_str(config.root, effective_language)
+    markdown = markdown_cache.get(effective_language, _MISSING)
+    if markdown is _MISSING:
+        markdown = get_markdown_str(config.root, effective_language)
+        markdown_cache.set(effective_language, markdown)
+
+    user_key = current_user.identifier if current_user else None
 
     chat_profiles = []
     profiles: list[dict] = []
     if config.code.set_chat_profiles:
-        chat_profiles = await config.code.set_chat_profiles(
-            current_user, effective_language
+        chat_profiles = await call_settings_callback(
+            config.code.set_chat_profiles,
+            (user_key, effective_language),
+            current_user,
+            effective_language,
         )
         if chat_profiles:
             for p in chat_profiles:
@@ -834,14 +964,23 @@ async def project_settings(
 
     starters = []
     if config.code.set_starters:
-        s = await config.code.set_starters(current_user, effective_language)
+        s = await call_settings_callback(
+            config.code.set_starters,
+            (user_key, effective_language),
+            current_user,
+            effective_language,
+        )
         if s:
             starters = [it.to_dict() for it in s]
 
     starter_categories = []
     if config.code.set_starter_categories:
-        sc = await config.code.set_starter_categories(
-            current_user, effective_language, chat_profile
+        sc = await call_settings_callback(
+            config.code.set_starter_categories,
+            (user_key, effective_language, chat_profile),
+            current_user,
+            effective_language,
+            chat_profile,
         )
         if sc:
             starter_categories = [it.to_dict() for it in sc]
@@ -851,18 +990,35 @@ async def project_settings(
         await data_layer.build_debug_url() if data_layer and config.run.debug else None
     )
 
-    cfg = config
+    overrides = None
     if chat_profile and chat_profiles:
         current_profile = next(
             (p for p in chat_profiles if p.name == chat_profile), None
         )
         if current_profile and getattr(current_profile, "config_overrides", None):
-            cfg = config.with_overrides(current_profile.config_overrides)
+            overrides = current_profile.config_overrides
 
-    return JSONResponse(
+    # The overrides come from a callback, so they are part of the key
+    profile_key = (
+        (chat_profile, overrides.model_dump_json(exclude_unset=True))
+        if overrides
+        else None
+    )
+    profile_settings = profile_settings_cache.get(profile_key)
+    if profile_settings is None:
+        cfg = (
+            config.with_overrides(overrides, profile=chat_profile)
+            if overrides
+            else config
+        )
+        profile_settings = (cfg, cfg.ui.model_dump(), cfg.features.model_dump())
+        profile_settings_cache.set(profile_key, profile_settings)
+    cfg, ui_settings, features_settings = profile_settings
+
+    body = JSONResponse(
         content={
-            "ui": cfg.ui.model_dump(),
-            "features": cfg.features.model_dump(),
+            "ui": ui_settings,
+            "features": features_settings,
             "userEnv": cfg.project.user_env,
             "maskUserEnv": cfg.project.mask_user_env,
             "dataPersistence": data_layer is not None,
@@ -878,6 +1034,11 @@ async def project_settings(
             "starterCategories": starter_categories,
             "debugUrl": debug_url,
         }
+    ).body
+
+    # The settings depend on the user, they must not be stored by shared caches
+    return cached_json_response(
+        request, body, make_etag(body), cache_control="private, no-cache"
     )
 
 
@@ -1248,6 +1409,7 @@ async def delete_thread(
 
 @router.post("/project/action")
 async def call_action(
+    request: Request,
     payload: CallActionRequest,
     current_user: UserParam,
 ):
@@ -1258,6 +1420,17 @@ async def call_action(
     from chainlit.session import WebsocketSession
 
     session = WebsocketSession.get_by_id(payload.sessionId)
+
+    if not session:
+        if forwarded := await forward_to_session_owner(
+            request, payload.sessionId, json=payload.model_dump()
+        ):
+            return forwarded
+        raise HTTPException(
+            status_code=404,
+            detail="Session not found",
+        )
+
     context = init_ws_context(session)
     config: ChainlitConfig = session.get_config()
 
@@ -1588,18 +1761,27 @@ async def disconnect_mcp(
 
 @router.post("/project/file")
 async def upload_file(
+    request: Request,
     current_user: UserParam,
     session_id: str,
-    file: UploadFile,
     ask_parent_id: Optional[str] = None,
 ):
-    """Upload a file to the session files directory."""
+    """
+    Upload a file to the session files directory.
+
+    The multipart body is streamed straight to disk, and the upload is aborted as
+    soon as it exceeds the configured max_size_mb.
+    """
 
     from chainlit.session import WebsocketSession
 
     session = WebsocketSession.get_by_id(session_id)
 
     if not session:
+        if forwarded := await forward_to_session_owner(
+            request, session_id, content=request.stream()
+        ):
+            return forwarded
         raise HTTPException(
             status_code=404,
             detail="Session not found",
@@ -1612,41 +1794,47 @@ async def upload_file(
                 detail="You are not authorized to upload files for this session",
             )
 
-    session.files_dir.mkdir(exist_ok=True)
+    spec: AskFileSpec = session.files_spec.get(ask_parent_id, None)
+    if not spec and ask_parent_id:
+        raise HTTPException(
+            status_code=404,
+            detail="Parent message not found",
+        )
 
     try:
-        content = await file.read()
+        upload = MultipartFileStream(request, max_size=get_max_file_size(spec))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
-        assert file.filename, "No filename for uploaded file"
-        assert file.content_type, "No content type for uploaded file"
+    try:
+        if not await upload.open():
+            raise HTTPException(status_code=422, detail="No file in the request")
 
-        spec: AskFileSpec = session.files_spec.get(ask_parent_id, None)
-        if not spec and ask_parent_id:
-            raise HTTPException(
-                status_code=404,
-                detail="Parent message not found",
-            )
+        assert upload.filename, "No filename for uploaded file"
+        assert upload.content_type, "No content type for uploaded file"
 
-        try:
-            validate_file_upload(file, spec=spec)
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=str(e))
+        validate_file_upload(upload, spec=spec)
 
         file_response = await session.persist_file(
-            name=file.filename, content=content, mime=file.content_type
+            name=upload.filename,
+            mime=upload.content_type,
+            stream=upload.chunks(),
+            hash_algorithm=config.project.upload_hash_algorithm,
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        return JSONResponse(content=file_response)
-    finally:
-        await file.close()
+    return JSONResponse(content=file_response)
 
 
-def validate_file_upload(file: UploadFile, spec: Optional[AskFileSpec] = None):
+def validate_file_upload(
+    file: Union[UploadFile, MultipartFileStream], spec: Optional[AskFileSpec] = None
+):
     """Validate the file upload as configured in config.features.spontaneous_file_upload or by AskFileSpec
     for a specific message.
 
     Args:
-        file (UploadFile): The file to validate.
+        file (UploadFile | MultipartFileStream): The file to validate.
         spec (AskFileSpec): The file spec to validate against if any.
     Raises:
         ValueError: If the file is not allowed.
@@ -1662,7 +1850,9 @@ def validate_file_upload(file: UploadFile, spec: Optional[AskFileSpec] = None):
     validate_file_size(file, spec)
 
 
-def validate_file_mime_type(file: UploadFile, spec: Optional[AskFileSpec]):
+def validate_file_mime_type(
+    file: Union[UploadFile, MultipartFileStream], spec: Optional[AskFileSpec]
+):
     """Validate the file mime type as configured in config.features.spontaneous_file_upload.
     Args:
         file (UploadFile): The file to validate.
@@ -1700,30 +1890,41 @@ def validate_file_mime_type(file: UploadFile, spec: Optional[AskFileSpec]):
     raise ValueError("File type not allowed")
 
 
-def validate_file_size(file: UploadFile, spec: Optional[AskFileSpec]):
-    """Validate the file size as configured in config.features.spontaneous_file_upload.
-    Args:
-        file (UploadFile): The file to validate.
-    Raises:
-        ValueError: If the file size is too large.
+def get_max_file_size(spec: Optional[AskFileSpec]) -> Optional[int]:
+    """Maximum size in bytes of an uploaded file, as configured in config.features.spontaneous_file_upload
+    or by AskFileSpec for a specific message.
     """
     if not spec and (
         config.features.spontaneous_file_upload is None
         or config.features.spontaneous_file_upload.max_size_mb is None
     ):
-        return
+        return None
 
     max_size_mb = (
         config.features.spontaneous_file_upload.max_size_mb
         if not spec
         else spec.max_size_mb
     )
-    if file.size is not None and file.size > max_size_mb * 1024 * 1024:
+    return max_size_mb * 1024 * 1024
+
+
+def validate_file_size(
+    file: Union[UploadFile, MultipartFileStream], spec: Optional[AskFileSpec]
+):
+    """Validate the file size as configured in config.features.spontaneous_file_upload.
+    Args:
+        file (UploadFile | MultipartFileStream): The file to validate.
+    Raises:
+        ValueError: If the file size is too large.
+    """
+    max_size = get_max_file_size(spec)
+    if max_size is not None and file.size is not None and file.size > max_size:
         raise ValueError("File size too large")
 
 
 @router.get("/project/file/{file_id}")
 async def get_file(
+    request: Request,
     file_id: str,
     session_id: str,
     current_user: UserParam,
@@ -1733,6 +1934,10 @@ async def get_file(
 
     session = WebsocketSession.get_by_id(session_id) if session_id else None
 
+    if not session and session_id:
+        if forwarded := await forward_to_session_owner(request, session_id):
+            return forwarded
+
     if not session:
         raise HTTPException(
             status_code=401,
@@ -1843,8 +2048,14 @@ async def serve(request: Request):
     root_path = os.getenv("CHAINLIT_PARENT_ROOT_PATH", "") + os.getenv(
         "CHAINLIT_ROOT_PATH", ""
     )
-    html_template = get_html_template(root_path)
-    response = HTMLResponse(content=html_template, status_code=200)
+    html_template, etag = get_cached_html_template(root_path)
+    # Let browsers cache the page, as long as they revalidate it
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    response = HTMLResponse(content=html_template, status_code=200, headers=headers)
 
     return response
 
@@ -1,22 +1,42 @@
 import asyncio
+import hashlib
 import json
 import mimetypes
 import re
 import shutil
 import uuid
 from dataclasses import dataclass, field
-from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Literal, Optional, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Deque,
+    Dict,
+    Literal,
+    Optional,
+    Union,
+)
 
 import aiofiles
 
+from chainlit.file_copy import async_copy_file
+from chainlit.file_store import get_file_store, release_session_files
 from chainlit.logger import logger
-from chainlit.types import AskFileSpec, FileReference
+from chainlit.session_store import (
+    InMemorySessionStore,
+    approximate_size,
+    session_memory,
+)
+from chainlit.types import AskFileSpec, FileDict, FileReference, ResumeCursor
+from chainlit.upload import UPLOAD_CHUNK_SIZE
 
 if TYPE_CHECKING:
     from mcp import ClientSession
 
     from chainlit.config import ChainlitConfig
-    from chainlit.types import FileDict
+    from chainlit.emitter import TokenCoalescer
     from chainlit.user import PersistedUser, User
 
 _CLOSE_TIMEOUT = 10.0  # seconds to wait for a background MCP task to finish
@@ -103,6 +123,8 @@ class BaseSession:
     """Base object."""
 
     thread_id_to_resume: Optional[str] = None
+    # Last step the client holds of the thread to resume, to only send it the rest
+    resume_cursor: Optional[ResumeCursor] = None
     client_type: ClientType
     current_task: Optional[asyncio.Task] = None
     chat_started: bool = False
@@ -156,10 +178,22 @@ class BaseSession:
         mime: str,
         path: Optional[str] = None,
         content: Optional[Union[bytes, str]] = None,
+        stream: Optional[AsyncIterable[bytes]] = None,
+        hash_algorithm: Optional[str] = None,
     ) -> FileReference:
-        if not path and not content:
+        """
+        Write a file to the session files directory and register it in `files`.
+
+        With `project.deduplicate_files`, the content is stored once across sessions
+        by the content-addressed file store, and `hash` is the digest it is stored
+        under. Otherwise a file at `path` is linked or copied in the kernel when the
+        filesystem allows it (see `copy_file`). `content` and `stream` are written chunk by chunk, so
+        that the size and the optional `hash_algorithm` digest are computed without
+        reading the file again. The partial file is removed if writing fails.
+        """
+        if not path and not content and stream is None:
             raise ValueError(
-                "Either path or content must be provided to persist a file"
+                "Either path or content must be provided to persist a file, or a stream"
             )
 
         self.files_dir.mkdir(exist_ok=True)
@@ -173,30 +207,59 @@ class BaseSession:
         if file_extension:
             file_path = file_path.with_suffix(file_extension)
 
-        if path:
-            # Copy the file from the given path
-            async with (
-                aiofiles.open(path, "rb") as src,
-                aiofiles.open(file_path, "wb") as dst,
-            ):
-                await dst.write(await src.read())
-        elif content:
-            # Write the provided content to the file
-            async with aiofiles.open(file_path, "wb") as buffer:
-                if isinstance(content, str):
-                    content = content.encode("utf-8")
-                await buffer.write(content)
-
-        # Get the file size
-        file_size = file_path.stat().st_size
+        async def read_chunks() -> AsyncIterator[bytes]:
+            if stream is not None:
+                async for chunk in stream:
+                    yield chunk
+            elif content:
+                yield content.encode("utf-8") if isinstance(content, str) else content
+
+        digest = hashlib.new(hash_algorithm) if hash_algorithm else None
+        file_size = 0
+        file_hash: Optional[str] = None
+        try:
+            if (file_store := get_file_store()) is not None:
+                # Reference the content in the deduplicating store instead
+                file_path, file_hash, file_size = await file_store.put(
+                    self.id,
+                    file_id,
+                    suffix=file_extension or "",
+                    path=str(path) if path and stream is None else None,
+                    chunks=read_chunks(),
+                )
+            elif path and stream is None:
+                # Copy the file from the given path
+                strategy = await async_copy_file(str(path), str(file_path))
+                logger.debug(f"Persisted {path} to {file_path} ({strategy})")
+                file_size = file_path.stat().st_size
+                if digest:
+                    async with aiofiles.open(file_path, "rb") as src:
+                        while chunk := await src.read(UPLOAD_CHUNK_SIZE):
+                            digest.update(chunk)
+            else:
+                async with aiofiles.open(file_path, "wb") as buffer:
+                    async for chunk in read_chunks():
+                        file_size += len(chunk)
+                        if digest:
+                            digest.update(chunk)
+                        await buffer.write(chunk)
+        except BaseException:
+            file_path.unlink(missing_ok=True)
+            raise
+
         # Store the file content in memory
-        self.files[file_id] = {
+        file_dict: FileDict = {
             "id": file_id,
             "path": file_path,
             "name": name,
             "type": mime,
             "size": file_size,
         }
+        if digest and not file_hash:
+            file_hash = digest.hexdigest()
+        if file_hash:
+            file_dict["hash"] = file_hash
+        self.files[file_id] = file_dict
 
         return {"id": file_id}
 
@@ -251,6 +314,7 @@ class HTTPSession(BaseSession):
         """Delete the session."""
         if self.files_dir.is_dir():
             shutil.rmtree(self.files_dir)
+        release_session_files(self.id)
 
 
 ThreadQueue = Deque[tuple[Callable, object, tuple, Dict]]
@@ -270,6 +334,8 @@ class WebsocketSession(BaseSession):
 
     to_clear: bool = False
 
+    token_coalescer: Optional["TokenCoalescer"] = None
+
     mcp_sessions: dict[str, McpSession]
 
     def __init__(
@@ -329,6 +395,7 @@ class WebsocketSession(BaseSession):
 
         ws_sessions_id[self.id] = self
         ws_sessions_sid[socket_id] = self
+        session_memory.connect(self.id)
 
     def get_config(self) -> "ChainlitConfig":
         """
@@ -357,7 +424,9 @@ class WebsocketSession(BaseSession):
                 if current_profile and getattr(
                     current_profile, "config_overrides", None
                 ):
-                    cfg = global_config.with_overrides(current_profile.config_overrides)
+                    cfg = global_config.with_overrides(
+                        current_profile.config_overrides, profile=current_profile.name
+                    )
             except Exception:
                 pass
         self.config = cfg
@@ -369,13 +438,24 @@ class WebsocketSession(BaseSession):
         ws_sessions_sid[new_socket_id] = self
         self.socket_id = new_socket_id
         self.restored = True
+        session_memory.connect(self.id)
 
     async def delete(self):
         """Delete the session."""
         if self.files_dir.is_dir():
             shutil.rmtree(self.files_dir)
+        release_session_files(self.id)
         ws_sessions_sid.pop(self.socket_id, None)
-        ws_sessions_id.pop(self.id, None)
+        # Along with its user session and chat context, spilled or not
+        session_memory.delete(self.id)
+
+        from chainlit.session_directory import get_session_directory, local_owner
+
+        await get_session_directory().unregister(self.id, local_owner())
+
+        if self.token_coalescer:
+            self.token_coalescer.close()
+            self.token_coalescer = None
 
         for mcp_session in list(self.mcp_sessions.values()):
             try:
@@ -415,5 +495,21 @@ class WebsocketSession(BaseSession):
         raise ValueError("Session not found")
 
 
+def _delete_evicted_session(session_id: str, session: WebsocketSession):
+    """Delete a disconnected session evicted to free memory."""
+    try:
+        asyncio.get_running_loop().create_task(session.delete())
+    except RuntimeError:
+        ws_sessions_sid.pop(session.socket_id, None)
+        session_memory.delete(session_id)
+
+
 ws_sessions_sid: Dict[str, WebsocketSession] = {}
-ws_sessions_id: Dict[str, WebsocketSession] = {}
+# Sessions can't be spilled out of memory, evicting one deletes it
+ws_sessions_id: InMemorySessionStore[WebsocketSession] = InMemorySessionStore(
+    "ws_sessions",
+    # Only account the session itself, its config and files are shared or on disk
+    sizeof=lambda session: approximate_size(session, max_depth=2),
+    on_evict=_delete_evicted_session,
+    spillable=False,
+)
@@ -0,0 +1,259 @@
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import httpx
+import socketio
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from chainlit.logger import logger
+
+# Identifier of this Chainlit process among the nodes sharing the session directory
+NODE_ID = os.environ.get("CHAINLIT_NODE_ID") or str(uuid.uuid4())
+# Internal URL the other nodes can reach this process at, to forward session requests
+NODE_URL = os.environ.get("CHAINLIT_NODE_URL")
+
+# Set on proxied requests, so that they are never forwarded twice
+FORWARDED_HEADER = "X-Chainlit-Forwarded-By"
+# Seconds to wait for the node owning a session when forwarding a request to it
+FORWARD_TIMEOUT = float(os.environ.get("CHAINLIT_FORWARD_TIMEOUT", 60))
+# Response headers dropped when forwarding: hop-by-hop headers, and the ones describing
+# the raw body, which httpx decodes
+DROPPED_RESPONSE_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "trailers",
+    "transfer-encoding",
+    "upgrade",
+    "content-encoding",
+    "content-length",
+}
+# Request headers kept when forwarding: the identity of the user and the body encoding
+FORWARDED_REQUEST_HEADERS = {
+    "authorization",
+    "cookie",
+    "accept-language",
+    "content-type",
+}
+
+
+@dataclass
+class SessionOwner:
+    node_id: str
+    node_url: Optional[str] = None
+
+    @property
+    def is_local(self) -> bool:
+        return self.node_id == NODE_ID
+
+
+class BaseSessionDirectory(ABC):
+    """Keep track of the node owning each websocket session."""
+
+    @abstractmethod
+    async def register(self, session_id: str, owner: SessionOwner):
+        pass
+
+    @abstractmethod
+    async def unregister(self, session_id: str, owner: SessionOwner):
+        """Forget the session, unless it has been taken over by another node."""
+        pass
+
+    @abstractmethod
+    async def lookup(self, session_id: str) -> Optional[SessionOwner]:
+        pass
+
+    async def refresh(self, session_id: str, owner: SessionOwner):
+        """Keep the registration of an active session from expiring."""
+        pass
+
+
+class InMemorySessionDirectory(BaseSessionDirectory):
+    """Process-local directory, used when running a single node and in tests."""
+
+    def __init__(self):
+        self.owners: Dict[str, SessionOwner] = {}
+
+    async def register(self, session_id: str, owner: SessionOwner):
+        self.owners[session_id] = owner
+
+    async def unregister(self, session_id: str, owner: SessionOwner):
+        current = self.owners.get(session_id)
+        if current and current.node_id == owner.node_id:
+            del self.owners[session_id]
+
+    async def lookup(self, session_id: str) -> Optional[SessionOwner]:
+        return self.owners.get(session_id)
+
+
+class RedisSessionDirectory(BaseSessionDirectory):
+    """Directory shared by every node connected to the same Redis server."""
+
+    def __init__(
+        self,
+        url: str,
+        key_prefix: str = "chainlit:session:",
+        ttl: Optional[int] = None,
+    ):
+        try:
+            from redis.asyncio import Redis
+        except ImportError as e:
+            raise ImportError(
+                "The redis package is required to share sessions between nodes. Install it with `pip install redis`."
+            ) from e
+
+        self.client = Redis.from_url(url, decode_responses=True)
+        self.key_prefix = key_prefix
+        self.ttl = ttl
+        # Session id -> when its registration was last renewed (monotonic)
+        self._renewed_at: Dict[str, float] = {}
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.key_prefix}{session_id}"
+
+    async def register(self, session_id: str, owner: SessionOwner):
+        key = self._key(session_id)
+        mapping = {"node_id": owner.node_id, "node_url": owner.node_url or ""}
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=mapping)
+            if self.ttl:
+                pipe.expire(key, self.ttl)
+            await pipe.execute()
+        self._renewed_at[session_id] = time.monotonic()
+
+    async def refresh(self, session_id: str, owner: SessionOwner):
+        # Renewed once half of the time to live has elapsed, not on every message
+        renewed_at = self._renewed_at.get(session_id)
+        if self.ttl and (
+            renewed_at is None or time.monotonic() - renewed_at >= self.ttl / 2
+        ):
+            await self.register(session_id, owner)
+
+    async def unregister(self, session_id: str, owner: SessionOwner):
+        self._renewed_at.pop(session_id, None)
+        key = self._key(session_id)
+        if await self.client.hget(key, "node_id") == owner.node_id:
+            await self.client.delete(key)
+
+    async def lookup(self, session_id: str) -> Optional[SessionOwner]:
+        data = await self.client.hgetall(self._key(session_id))
+        if not data:
+            return None
+        return SessionOwner(
+            node_id=data["node_id"], node_url=data.get("node_url") or None
+        )
+
+
+def get_redis_url() -> Optional[str]:
+    return os.environ.get("CHAINLIT_REDIS_URL")
+
+
+def get_client_manager() -> Optional[socketio.AsyncManager]:
+    """Socket.IO client manager, shared through Redis when CHAINLIT_REDIS_URL is set."""
+    if redis_url := get_redis_url():
+        logger.info("Using Redis to share Socket.IO clients between nodes")
+        return socketio.AsyncRedisManager(redis_url)
+    # Default in-memory manager
+    return None
+
+
+_session_directory: Optional[BaseSessionDirectory] = None
+
+
+def get_session_directory() -> BaseSessionDirectory:
+    global _session_directory
+
+    if _session_directory is None:
+        if redis_url := get_redis_url():
+            from chainlit.config import config
+
+            _session_directory = RedisSessionDirectory(
+                redis_url, ttl=config.project.user_session_timeout
+            )
+        else:
+            _session_directory = InMemorySessionDirectory()
+
+    return _session_directory
+
+
+def local_owner() -> SessionOwner:
+    return SessionOwner(node_id=NODE_ID, node_url=NODE_URL)
+
+
+_forward_client: Optional[httpx.AsyncClient] = None
+
+
+def get_forward_client() -> httpx.AsyncClient:
+    """HTTP client shared by forwarded requests, reusing connections to other nodes."""
+    global _forward_client
+
+    if _forward_client is None or _forward_client.is_closed:
+        _forward_client = httpx.AsyncClient(timeout=FORWARD_TIMEOUT)
+    return _forward_client
+
+
+async def close_forward_client():
+    global _forward_client
+
+    if _forward_client is not None:
+        await _forward_client.aclose()
+        _forward_client = None
+
+
+async def forward_to_session_owner(
+    request: Request, session_id: str, **kwargs: Any
+) -> Optional[Response]:
+    """
+    Proxy the request to the node owning the session, if it lives on another node.
+
+    Returns None when the request should be handled locally. The response of
+    the owner is streamed back as it arrives.
+    Extra keyword arguments are passed to `httpx.AsyncClient.build_request`.
+    """
+    if request.headers.get(FORWARDED_HEADER):
+        return None
+
+    owner = await get_session_directory().lookup(session_id)
+    if not owner or owner.is_local:
+        return None
+    if not owner.node_url:
+        logger.warning(
+            f"Session {session_id} is owned by node {owner.node_id} which has no CHAINLIT_NODE_URL"
+        )
+        return None
+
+    headers = {
+        key: value
+        for key, value in request.headers.items()
+        if key.lower() in FORWARDED_REQUEST_HEADERS
+    }
+    headers[FORWARDED_HEADER] = NODE_ID
+
+    client = get_forward_client()
+    upstream = client.build_request(
+        request.method,
+        owner.node_url.rstrip("/") + request.url.path,
+        params=request.query_params.multi_items(),
+        headers=headers,
+        **kwargs,
+    )
+    response = await client.send(upstream, stream=True)
+
+    forwarded = StreamingResponse(
+        response.aiter_bytes(),
+        status_code=response.status_code,
+        background=BackgroundTask(response.aclose),
+    )
+    for key, value in response.headers.multi_items():
+        if key.lower() not in DROPPED_RESPONSE_HEADERS:
+            forwarded.headers.append(key, value)
+    return forwarded
@@ -0,0 +1,150 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypedDict
+
+from chainlit.logger import logger
+
+
+class SessionReaperStats(TypedDict):
+    pending: int
+    reaped: int
+    cancelled: int
+    failed: int
+    last_sweep_duration: float
+
+
+class SessionReaper:
+    """
+    Expire disconnected sessions from a single background task.
+
+    Expiries are kept in a heap ordered by deadline. Cancelled expiries are
+    dropped lazily when they reach the top of the heap, and the heap is compacted
+    when they make up most of it. Due sessions are reaped in batches of at most
+    `batch_size`, yielding to the event loop between batches.
+    """
+
+    def __init__(
+        self,
+        reap: Callable[[str], Awaitable[None]],
+        batch_size: int = 100,
+    ):
+        self.reap = reap
+        self.batch_size = batch_size
+        self.reaped = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.last_sweep_duration = 0.0
+        # (deadline, token, session id)
+        self._heap: List[Tuple[float, int, str]] = []
+        # Token of the live expiry of each session
+        self._tokens: Dict[str, int] = {}
+        self._counter = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        """Number of sessions waiting to expire."""
+        return len(self._tokens)
+
+    def schedule(self, session_id: str, timeout: float):
+        """Reap the session in `timeout` seconds, replacing any previous expiry."""
+        deadline = time.monotonic() + timeout
+        token = next(self._counter)
+        self._tokens[session_id] = token
+        heapq.heappush(self._heap, (deadline, token, session_id))
+
+        if (
+            self._worker is None
+            or self._worker.done()
+            or self._worker.get_loop() is not asyncio.get_running_loop()
+        ):
+            self._wakeup = asyncio.Event()
+            # Run the worker in a blank context, it outlives the session scheduling it
+            self._worker = contextvars.Context().run(asyncio.create_task, self._run())
+        elif self._wakeup and self._heap[0][1] == token:
+            # The new expiry is the earliest one, wake the worker up
+            self._wakeup.set()
+
+    def cancel(self, session_id: str) -> bool:
+        """Cancel the expiry of a session, typically when its client reconnects."""
+        if self._tokens.pop(session_id, None) is None:
+            return False
+
+        self.cancelled += 1
+        if len(self._heap) > 2 * len(self._tokens) + self.batch_size:
+            self._compact()
+        return True
+
+    def _compact(self):
+        self._heap = [
+            entry for entry in self._heap if self._tokens.get(entry[2]) == entry[1]
+        ]
+        heapq.heapify(self._heap)
+
+    def _pop_due(self, now: float) -> List[str]:
+        due: List[str] = []
+        while self._heap and len(due) < self.batch_size:
+            deadline, token, session_id = self._heap[0]
+            if self._tokens.get(session_id) != token:
+                # Cancelled or rescheduled
+                heapq.heappop(self._heap)
+                continue
+            if deadline > now:
+                break
+            heapq.heappop(self._heap)
+            del self._tokens[session_id]
+            due.append(session_id)
+        return due
+
+    async def _sweep(self, session_ids: List[str]):
+        start = time.monotonic()
+        for session_id in session_ids:
+            try:
+                await self.reap(session_id)
+                self.reaped += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Failed to reap session {session_id}: {e!s}")
+        self.last_sweep_duration = time.monotonic() - start
+
+    async def _run(self):
+        wakeup = self._wakeup
+        assert wakeup is not None
+
+        while True:
+            now = time.monotonic()
+            if due := self._pop_due(now):
+                await self._sweep(due)
+                # Let other tasks run between batches
+                await asyncio.sleep(0)
+                continue
+
+            wakeup.clear()
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> SessionReaperStats:
+        return {
+            "pending": self.pending,
+            "reaped": self.reaped,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+            "last_sweep_duration": self.last_sweep_duration,
+        }
+
+    async def close(self):
+        """Stop the worker, leaving the pending sessions unreaped."""
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
@@ -0,0 +1,420 @@
+import pickle
+import sqlite3
+import sys
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    MutableMapping,
+    Optional,
+    Set,
+    TypedDict,
+    TypeVar,
+)
+
+from chainlit.logger import logger
+
+V = TypeVar("V")
+
+
+class SessionStoreStats(TypedDict):
+    count: int
+    bytes: int
+
+
+class SessionMemoryStats(TypedDict):
+    sessions: int
+    connected: int
+    bytes: int
+    max_bytes: int
+    evicted: int
+    stores: Dict[str, SessionStoreStats]
+
+
+def approximate_size(obj: Any, max_depth: int = 4) -> int:
+    """Approximate the memory used by an object and the objects it references, in bytes."""
+    seen: Set[int] = set()
+
+    def sizeof(o: Any, depth: int) -> int:
+        if id(o) in seen:
+            return 0
+        seen.add(id(o))
+
+        try:
+            size = sys.getsizeof(o)
+        except Exception:
+            return 0
+
+        if depth >= max_depth or isinstance(o, (str, bytes, bytearray, int, float)):
+            return size
+
+        if isinstance(o, dict):
+            size += sum(
+                sizeof(key, depth + 1) + sizeof(value, depth + 1)
+                for key, value in o.items()
+            )
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            size += sum(sizeof(item, depth + 1) for item in o)
+        elif isinstance(attributes := getattr(o, "__dict__", None), dict):
+            size += sizeof(attributes, depth + 1)
+
+        return size
+
+    return sizeof(obj, 0)
+
+
+class SessionStore(MutableMapping[str, V], ABC):
+    """Values scoped to a session, keyed by session id."""
+
+    name: str
+
+    @abstractmethod
+    def stats(self) -> SessionStoreStats:
+        pass
+
+
+class InMemorySessionStore(SessionStore[V]):
+    """
+    Process-local session store, accounting the approximate size of each value.
+
+    Disconnected sessions are evicted by the shared `SessionMemory` when the memory
+    limit is exceeded. Evicted values spill to the SQLite store when one is configured,
+    and are transparently loaded back on the next access.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        sizeof: Callable[[V], int] = approximate_size,
+        on_evict: Optional[Callable[[str, V], None]] = None,
+        spillable: bool = True,
+        memory: Optional["SessionMemory"] = None,
+    ):
+        self.name = name
+        self.sizeof = sizeof
+        self.on_evict = on_evict
+        self.spillable = spillable
+        self.memory = memory or session_memory
+        self.bytes = 0
+        self._data: Dict[str, V] = {}
+        self._sizes: Dict[str, int] = {}
+        self.memory.register(self)
+
+    @property
+    def spill(self) -> Optional[SessionStore[V]]:
+        return self.memory.get_spill(self.name) if self.spillable else None
+
+    def __getitem__(self, session_id: str) -> V:
+        if session_id not in self._data:
+            spill = self.spill
+            if spill is None or session_id not in spill:
+                raise KeyError(session_id)
+            # Load the spilled value back in memory
+            self[session_id] = spill.pop(session_id)
+
+        self.memory.touch(session_id)
+        return self._data[session_id]
+
+    def __setitem__(self, session_id: str, value: V):
+        size = self.sizeof(value)
+        self.bytes += size - self._sizes.get(session_id, 0)
+        self._sizes[session_id] = size
+        self._data[session_id] = value
+
+        self.memory.touch(session_id)
+        self.memory.enforce(exclude=session_id)
+
+    def __delitem__(self, session_id: str):
+        if not self.discard(session_id):
+            raise KeyError(session_id)
+
+    def discard(self, session_id: str) -> bool:
+        """Delete the value from memory and from the spill, if any, without loading it."""
+        found = False
+        if session_id in self._data:
+            del self._data[session_id]
+            self.bytes -= self._sizes.pop(session_id, 0)
+            found = True
+        if (spill := self.spill) is not None and session_id in spill:
+            del spill[session_id]
+            found = True
+        return found
+
+    def _keys(self) -> List[str]:
+        keys = list(self._data)
+        if (spill := self.spill) is not None:
+            keys.extend(key for key in spill if key not in self._data)
+        return keys
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def copy(self) -> Dict[str, V]:
+        """Shallow copy of the values, without loading the spilled ones back in memory."""
+        spill = self.spill
+        values = dict(spill.items()) if spill is not None else {}
+        values.update(self._data)
+        return values
+
+    def resize(self, session_id: str):
+        """Account a value mutated in place."""
+        if session_id in self._data:
+            self[session_id] = self._data[session_id]
+
+    def grow(self, session_id: str, size: int):
+        """Account bytes added to (or removed from, if negative) a value mutated in place."""
+        if session_id in self._data:
+            self._sizes[session_id] += size
+            self.bytes += size
+            self.memory.touch(session_id)
+            self.memory.enforce(exclude=session_id)
+
+    def evict(self, session_id: str) -> int:
+        """Move the value out of memory, returning the number of bytes freed."""
+        if session_id not in self._data:
+            return 0
+
+        value = self._data[session_id]
+        if (spill := self.spill) is not None:
+            try:
+                spill[session_id] = value
+            except Exception as e:
+                logger.warning(
+                    f"Failed to spill {self.name} for session {session_id}, keeping it in memory: {e!s}"
+                )
+                return 0
+
+        del self._data[session_id]
+        size = self._sizes.pop(session_id, 0)
+        self.bytes -= size
+
+        if self.on_evict:
+            self.on_evict(session_id, value)
+
+        return size
+
+    def stats(self) -> SessionStoreStats:
+        return {"count": len(self._data), "bytes": self.bytes}
+
+
+class SQLiteSessionStore(SessionStore[V]):
+    """
+    Session store persisted to a SQLite database, used to spill sessions out of memory.
+
+    The spilled session ids and sizes are indexed in memory, so lookups of sessions
+    that were never spilled don't query the database. Writes and deletes run in a
+    background thread, the values waiting to be written are served from memory.
+    """
+
+    def __init__(self, path: str, name: str):
+        self.path = path
+        self.name = name
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS session_store (
+                store TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                value BLOB NOT NULL,
+                PRIMARY KEY (store, session_id)
+            )
+            """
+        )
+        # Pickled size of each spilled value, by session id
+        self._sizes: Dict[str, int] = dict(
+            self._fetch(
+                "SELECT session_id, LENGTH(value) FROM session_store WHERE store = ?"
+            )
+        )
+        # Pickled values not written to the database yet
+        self._pending: Dict[str, bytes] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"session-spill-{name}"
+        )
+
+    def _fetch(self, query: str, *params: Any) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(query, (self.name, *params)).fetchall()
+
+    def _write(self, session_id: str, data: bytes):
+        self._fetch(
+            "INSERT OR REPLACE INTO session_store (store, session_id, value) VALUES (?, ?, ?)",
+            session_id,
+            data,
+        )
+        with self._lock:
+            if self._pending.get(session_id) is data:
+                del self._pending[session_id]
+
+    def _delete(self, session_id: str):
+        self._fetch(
+            "DELETE FROM session_store WHERE store = ? AND session_id = ?",
+            session_id,
+        )
+
+    def __getitem__(self, session_id: str) -> V:
+        if session_id not in self._sizes:
+            raise KeyError(session_id)
+        with self._lock:
+            data = self._pending.get(session_id)
+        if data is None:
+            rows = self._fetch(
+                "SELECT value FROM session_store WHERE store = ? AND session_id = ?",
+                session_id,
+            )
+            if not rows:
+                raise KeyError(session_id)
+            data = rows[0][0]
+        return pickle.loads(data)
+
+    def __setitem__(self, session_id: str, value: V):
+        # Pickle right away, so that values which can't be pickled fail the caller
+        data = pickle.dumps(value)
+        with self._lock:
+            self._pending[session_id] = data
+        self._sizes[session_id] = len(data)
+        self._executor.submit(self._write, session_id, data)
+
+    def __delitem__(self, session_id: str):
+        if session_id not in self._sizes:
+            raise KeyError(session_id)
+        del self._sizes[session_id]
+        with self._lock:
+            self._pending.pop(session_id, None)
+        self._executor.submit(self._delete, session_id)
+
+    def __contains__(self, session_id: object) -> bool:
+        return session_id in self._sizes
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._sizes))
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    def stats(self) -> SessionStoreStats:
+        return {"count": len(self._sizes), "bytes": sum(self._sizes.values())}
+
+    def flush(self):
+        """Wait for the pending writes and deletes to reach the database."""
+        self._executor.submit(lambda: None).result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
+
+
+class SessionMemory:
+    """
+    Account the memory used by the in-memory session stores.
+
+    Disconnected sessions are tracked in least recently used order. When the stores
+    exceed `project.session_memory_limit_mb`, the least recently used disconnected
+    sessions are evicted from every store at once.
+    """
+
+    def __init__(self):
+        self.stores: List[InMemorySessionStore] = []
+        self.connected: Set[str] = set()
+        self.evicted = 0
+        # Overrides the configured limit when set
+        self.max_bytes: Optional[int] = None
+        # Disconnected sessions, least recently used first
+        self._idle: OrderedDict[str, None] = OrderedDict()
+        self._spills: Dict[str, SQLiteSessionStore] = {}
+
+    @property
+    def limit(self) -> int:
+        if self.max_bytes is not None:
+            return self.max_bytes
+
+        from chainlit.config import config
+
+        return config.project.session_memory_limit_mb * 1024 * 1024
+
+    @property
+    def bytes(self) -> int:
+        return sum(store.bytes for store in self.stores)
+
+    def register(self, store: InMemorySessionStore):
+        self.stores.append(store)
+
+    def get_spill(self, name: str) -> Optional[SQLiteSessionStore]:
+        from chainlit.config import config
+
+        if not (path := config.project.session_spill_path):
+            return None
+
+        spill = self._spills.get(name)
+        if spill is None or spill.path != path:
+            spill = self._spills[name] = SQLiteSessionStore(path, name)
+        return spill
+
+    def touch(self, session_id: str):
+        if session_id in self.connected:
+            return
+        self._idle[session_id] = None
+        self._idle.move_to_end(session_id)
+
+    def connect(self, session_id: str):
+        """Protect the session from eviction while its client is connected."""
+        self.connected.add(session_id)
+        self._idle.pop(session_id, None)
+
+    def disconnect(self, session_id: str):
+        self.connected.discard(session_id)
+        self.touch(session_id)
+
+    def delete(self, session_id: str):
+        """Delete the session from every store, spilled values included."""
+        for store in self.stores:
+            store.discard(session_id)
+        self.connected.discard(session_id)
+        self._idle.pop(session_id, None)
+
+    def evict(self, session_id: str) -> int:
+        """Evict the session from every store, returning the number of bytes freed."""
+        freed = sum(store.evict(session_id) for store in self.stores)
+        self._idle.pop(session_id, None)
+        self.evicted += 1
+        logger.debug(f"Evicted session {session_id} ({freed} bytes)")
+        return freed
+
+    def enforce(self, exclude: Optional[str] = None):
+        """Evict least recently used disconnected sessions until under the limit."""
+        if not (limit := self.limit):
+            return
+
+        total = self.bytes
+        while total > limit and self._idle:
+            session_id = next(iter(self._idle))
+            # The excluded session was just used, so it is the last one left
+            if session_id == exclude:
+                break
+            total -= self.evict(session_id)
+
+    def stats(self) -> SessionMemoryStats:
+        return {
+            "sessions": len(self.connected) + len(self._idle),
+            "connected": len(self.connected),
+            "bytes": self.bytes,
+            "max_bytes": self.limit,
+            "evicted": self.evicted,
+            "stores": {store.name: store.stats() for store in self.stores},
+        }
+
+
+session_memory = SessionMemory()
@@ -4,7 +4,7 @@ from typing import Any, Dict, Literal, Optional, Tuple, TypedDict, Union
 from urllib.parse import unquote
 
 from starlette.requests import cookie_parser
-from typing_extensions import TypeAlias
+from typing_extensions import NotRequired, TypeAlias
 
 from chainlit.auth import (
     get_current_user,
@@ -15,14 +15,20 @@ from chainlit.chat_context import chat_context
 from chainlit.config import ChainlitConfig, config
 from chainlit.context import init_ws_context
 from chainlit.data import get_data_layer
+from chainlit.data.utils import thread_delta
 from chainlit.logger import logger
 from chainlit.message import ErrorMessage, Message
 from chainlit.server import sio
 from chainlit.session import ClientType, WebsocketSession
+from chainlit.session_directory import get_session_directory, local_owner
+from chainlit.session_reaper import SessionReaper
+from chainlit.session_store import session_memory
 from chainlit.types import (
     InputAudioChunk,
     InputAudioChunkPayload,
     MessagePayload,
+    ResumeCursor,
+    ThreadDelta,
 )
 from chainlit.user import PersistedUser, User
 from chainlit.user_session import user_sessions
@@ -36,6 +42,7 @@ class WebSocketSessionAuth(TypedDict):
     clientType: ClientType
     chatProfile: str | None
     threadId: str | None
+    resumeCursor: NotRequired[ResumeCursor | None]
 
 
 def _session_owner_matches_user(
@@ -50,6 +57,17 @@ def _session_owner_matches_user(
     return session.user.identifier == user.identifier
 
 
+async def clear_session(session_id: str):
+    """Delete a session along with its user session."""
+    if session := WebsocketSession.get_by_id(session_id):
+        # Deleting the session cleans up its user session as well
+        await session.delete()
+
+
+# Expires the sessions of disconnected clients after config.project.session_timeout
+session_reaper = SessionReaper(reap=clear_session)
+
+
 def restore_existing_session(
     sid,
     session_id,
@@ -57,6 +75,7 @@ def restore_existing_session(
     emit_call_fn,
     environ,
     user: User | PersistedUser | None = None,
+    resume_cursor: ResumeCursor | None = None,
 ):
     """Restore a session from the sessionId provided by the client."""
     if session := WebsocketSession.get_by_id(session_id):
@@ -64,10 +83,12 @@ def restore_existing_session(
             logger.error("Authorization for the session failed.")
             raise ConnectionRefusedError("authorization failed")
 
+        session_reaper.cancel(session_id)
         session.restore(new_socket_id=sid)
         session.emit = emit_fn
         session.emit_call = emit_call_fn
         session.environ = environ
+        session.resume_cursor = resume_cursor
         return True
     return False
 
@@ -101,6 +122,32 @@ async def resume_thread(session: WebsocketSession):
         return thread
 
 
+async def resume_thread_delta(session: WebsocketSession) -> Optional[ThreadDelta]:
+    """Get the steps the client missed, if the data layer supports it."""
+    data_layer = get_data_layer()
+    if (
+        not data_layer
+        or not session.user
+        or not session.thread_id_to_resume
+        or not session.resume_cursor
+    ):
+        return None
+    return await data_layer.get_thread_steps_since(
+        session.thread_id_to_resume, session.resume_cursor
+    )
+
+
+def _get_resume_cursor(auth: WebSocketSessionAuth) -> Optional[ResumeCursor]:
+    cursor = auth.get("resumeCursor")
+    if (
+        isinstance(cursor, dict)
+        and isinstance(cursor.get("stepId"), str)
+        and isinstance(cursor.get("createdAt"), str)
+    ):
+        return ResumeCursor(stepId=cursor["stepId"], createdAt=cursor["createdAt"])
+    return None
+
+
 def load_user_env(user_env):
     if user_env:
         user_env_dict = json.loads(user_env)
@@ -173,8 +220,18 @@ async def connect(sid: str, environ: WSGIEnvironment, auth: WebSocketSessionAuth
         return sio.call(event, data, timeout=timeout, to=sid)
 
     session_id = auth["sessionId"]
+    # Let the other nodes know this one now owns the session
+    await get_session_directory().register(session_id, local_owner())
+
+    resume_cursor = _get_resume_cursor(auth)
     if restore_existing_session(
-        sid, session_id, emit_fn, emit_call_fn, environ, user=user
+        sid,
+        session_id,
+        emit_fn,
+        emit_call_fn,
+        environ,
+        user=user,
+        resume_cursor=resume_cursor,
     ):
         return True
 
@@ -187,7 +244,7 @@ async def connect(sid: str, environ: WSGIEnvironment, auth: WebSocketSessionAuth
         unquote(url_encoded_chat_profile) if url_encoded_chat_profile else None
     )
 
-    WebsocketSession(
+    session = WebsocketSession(
         id=session_id,
         socket_id=sid,
         emit=emit_fn,
@@ -200,6 +257,7 @@ async def connect(sid: str, environ: WSGIEnvironment, auth: WebSocketSessionAuth
         thread_id=thread_id,
         environ=environ,
     )
+    session.resume_cursor = resume_cursor
 
     return True
 
@@ -220,6 +278,14 @@ async def connection_successful(sid):
         return
 
     if context.session.thread_id_to_resume and config.code.on_chat_resume:
+        # The session outlived the disconnection, along with the chat context and the
+        # state set up by on_chat_resume: the client only needs the steps it missed
+        if context.session.restored and (
+            delta := await resume_thread_delta(context.session)
+        ):
+            await context.emitter.resume_thread_delta(delta)
+            return
+
         thread = await resume_thread(context.session)
         if thread:
             context.session.has_first_interaction = True
@@ -233,7 +299,13 @@ async def connection_successful(sid):
                 if "message" in step["type"]:
                     chat_context.add(Message.from_dict(step))
 
-            await context.emitter.resume_thread(thread)
+            # The client may still hold the thread, e.g. after a server restart
+            if (cursor := context.session.resume_cursor) and (
+                delta := thread_delta(thread, cursor)
+            ):
+                await context.emitter.resume_thread_delta(delta)
+            else:
+                await context.emitter.resume_thread(thread)
             return
         else:
             await context.emitter.send_resume_thread_error("Thread not found.")
@@ -266,23 +338,13 @@ async def disconnect(sid):
     if session.thread_id and session.has_first_interaction:
         await persist_user_session(session.thread_id, session.to_persistable())
 
-    async def clear(_sid):
-        if session := WebsocketSession.get(_sid):
-            # Clean up the user session
-            if session.id in user_sessions:
-                user_sessions.pop(session.id)
-            # Clean up the session
-            await session.delete()
+    # The session can now be evicted if memory runs low
+    session_memory.disconnect(session.id)
 
     if session.to_clear:
-        await clear(sid)
+        await clear_session(session.id)
     else:
-
-        async def clear_on_timeout(_sid):
-            await asyncio.sleep(config.project.session_timeout)
-            await clear(_sid)
-
-        asyncio.ensure_future(clear_on_timeout(sid))
+        session_reaper.schedule(session.id, config.project.session_timeout)
 
 
 @sio.on("stop")  # pyright: ignore [reportOptionalCall]
@@ -408,6 +470,10 @@ async def fetch_favorites(sid):
 async def message(sid, payload: MessagePayload):
     """Handle a message sent by the User."""
     session = WebsocketSession.require(sid)
+    try:
+        await get_session_directory().refresh(session.id, local_owner())
+    except Exception as e:
+        logger.warning(f"Failed to refresh the session directory: {e!s}")
 
     task = asyncio.create_task(process_message(session, payload))
     session.current_task = task
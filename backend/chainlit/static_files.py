@@ -0,0 +1,83 @@
+import mimetypes
+import re
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from asyncer import asyncify
+from fastapi import Request
+from fastapi.responses import FileResponse
+
+from chainlit.precompress import (
+    ENCODINGS,
+    MIN_COMPRESS_SIZE,
+    get_precompressed,
+    is_compressible,
+    supported_encodings,
+)
+
+# Content-hashed files never change, so browsers can keep them for a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Other files may change between releases and must be revalidated
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Vite appends a dash and an 8 characters hash of the content to the name of the files
+# it bundles, e.g. index-D5UwcQeN.js. Requiring a digit tells them apart from names
+# like markdown-renderer.js or Markdown-Renderer.js: a hash without one is merely
+# revalidated, while an unhashed file cached forever would never be updated.
+HASHED_FILENAME = re.compile(
+    r"-(?=[A-Za-z0-9_-]{0,7}[0-9])[A-Za-z0-9_-]{8}\.[a-z0-9]+$"
+)
+
+
+def is_content_hashed(path: Path) -> bool:
+    return bool(HASHED_FILENAME.search(path.name))
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> Set[str]:
+    """Parse an Accept-Encoding header, ignoring the encodings with a zero quality."""
+    accepted: Set[str] = set()
+    for item in (accept_encoding or "").split(","):
+        encoding, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if encoding and quality > 0:
+            accepted.add(encoding.lower())
+
+    if "*" in accepted:
+        accepted.update(encoding for encoding, _ in ENCODINGS)
+    return accepted
+
+
+async def serve_static_file(request: Request, path: Path) -> FileResponse:
+    """
+    Serve a file of a build directory.
+
+    Content-hashed files are cacheable forever. Compressible files are served from
+    their precompressed side file when the client accepts its encoding, so that
+    they are not compressed again on every request.
+    """
+    headers: Dict[str, str] = {
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL
+        if is_content_hashed(path)
+        else REVALIDATE_CACHE_CONTROL
+    }
+    media_type, _ = mimetypes.guess_type(path.name)
+
+    if is_compressible(path) and path.stat().st_size >= MIN_COMPRESS_SIZE:
+        headers["Vary"] = "Accept-Encoding"
+        accepted = accepted_encodings(request.headers.get("accept-encoding"))
+        for encoding, suffix in supported_encodings():
+            if encoding not in accepted:
+                continue
+            side_path = await asyncify(get_precompressed)(path, encoding, suffix)
+            if side_path:
+                headers["Content-Encoding"] = encoding
+                return FileResponse(side_path, media_type=media_type, headers=headers)
+
+    return FileResponse(path, media_type=media_type, headers=headers)
@@ -216,6 +216,9 @@ class Step:
         time.sleep(0.001)
         self._input = ""
         self._output = ""
+        # Tokens streamed since the content was last read, joined lazily
+        self._input_chunks: List[str] = []
+        self._output_chunks: List[str] = []
         self.thread_id = thread_id or context.session.thread_id
         self.name = name or ""
         self.type = type
@@ -287,18 +290,26 @@ class Step:
 
     @property
     def input(self):
+        if self._input_chunks:
+            self._input += "".join(self._input_chunks)
+            self._input_chunks.clear()
         return self._input
 
     @input.setter
     def input(self, content: Union[Dict, str]):
+        self._input_chunks.clear()
         self._input = self._process_content(content, set_language=False)
 
     @property
     def output(self):
+        if self._output_chunks:
+            self._output += "".join(self._output_chunks)
+            self._output_chunks.clear()
         return self._output
 
     @output.setter
     def output(self, content: Union[Dict, str]):
+        self._output_chunks.clear()
         self._output = self._process_content(content, set_language=True)
 
     def to_dict(self) -> StepDict:
@@ -423,11 +434,10 @@ class Step:
                 self.input = token
             else:
                 self.output = token
+        elif is_input:
+            self._input_chunks.append(token)
         else:
-            if is_input:
-                self.input += token
-            else:
-                self.output += token
+            self._output_chunks.append(token)
 
         assert self.id
 
@@ -23,6 +23,7 @@ from dataclasses import field
 from dataclasses_json import DataClassJsonMixin
 from pydantic import BaseModel
 from pydantic.dataclasses import dataclass
+from typing_extensions import NotRequired
 
 InputWidgetType = Literal[
     "switch",
@@ -51,6 +52,21 @@ class ThreadDict(TypedDict):
     elements: Optional[List["ElementDict"]]
 
 
+class ResumeCursor(TypedDict):
+    """Last step a reconnecting client holds of the thread it resumes."""
+
+    stepId: str
+    createdAt: str
+
+
+class ThreadDelta(TypedDict):
+    """Steps of a thread from a resume cursor on, with their elements."""
+
+    id: str
+    steps: List["StepDict"]
+    elements: List["ElementDict"]
+
+
 class Pagination(BaseModel):
     first: int
     cursor: Optional[str] = None
@@ -167,6 +183,8 @@ class FileDict(TypedDict):
     path: Path
     size: int
     type: str
+    # Hex digest of the content, set with project.upload_hash_algorithm or project.deduplicate_files
+    hash: NotRequired[str]
 
 
 class MessagePayload(TypedDict):
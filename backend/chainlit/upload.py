@@ -0,0 +1,143 @@
+from typing import AsyncIterator, Dict, Literal, Optional
+
+from fastapi import Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+# Size of the chunks uploaded files are written to disk in
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    def __init__(self):
+        super().__init__("File size too large")
+
+
+def _decode(value: bytes) -> str:
+    try:
+        return value.decode("utf-8")
+    except UnicodeDecodeError:
+        return value.decode("latin-1")
+
+
+class MultipartFileStream:
+    """
+    File part of a multipart/form-data request, read as the body arrives.
+
+    The body is parsed incrementally, so the file is neither buffered in memory
+    nor spooled to a temporary file. Only the first part of `field_name` carrying
+    a filename is read, and the rest of the body is left unread.
+
+    `size` counts the bytes received so far. Reading stops with an
+    `UploadTooLargeError` as soon as it exceeds `max_size`.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        field_name: str = "file",
+        max_size: Optional[int] = None,
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+    ):
+        content_type, params = parse_options_header(request.headers.get("content-type"))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise ValueError("Expected a multipart/form-data request")
+
+        self.field_name = field_name
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self.size = 0
+
+        self._body = request.stream().__aiter__()
+        self._state: Literal["pending", "reading", "done"] = "pending"
+        self._buffer = bytearray()
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._parser = MultipartParser(
+            params[b"boundary"],
+            callbacks={
+                "on_part_begin": self._on_part_begin,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+            },
+        )
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[bytes(self._header_field).lower()] = bytes(self._header_value)
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def _on_headers_finished(self):
+        if self._state != "pending":
+            return
+
+        _, options = parse_options_header(self._headers.get(b"content-disposition"))
+        filename = options.get(b"filename")
+        if options.get(b"name") != self.field_name.encode() or filename is None:
+            return
+
+        self._state = "reading"
+        self.filename = _decode(filename)
+        if content_type := self._headers.get(b"content-type"):
+            self.content_type = content_type.decode("latin-1")
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._state == "reading":
+            self._buffer += data[start:end]
+            self.size += end - start
+
+    def _on_part_end(self):
+        if self._state == "reading":
+            self._state = "done"
+
+    async def _feed(self) -> bool:
+        """Parse the next chunk of the body, returning False once it is exhausted."""
+        try:
+            chunk = await self._body.__anext__()
+        except StopAsyncIteration:
+            self._parser.finalize()
+            return False
+
+        if chunk:
+            self._parser.write(chunk)
+        if self.max_size is not None and self.size > self.max_size:
+            raise UploadTooLargeError
+        return True
+
+    async def open(self) -> bool:
+        """Read the body up to the file part, returning False if there is none."""
+        while self._state == "pending":
+            if not await self._feed():
+                return False
+        return True
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """Yield the content of the file in chunks of `chunk_size` bytes."""
+        if not await self.open():
+            return
+
+        while True:
+            while len(self._buffer) >= self.chunk_size:
+                yield bytes(self._buffer[: self.chunk_size])
+                del self._buffer[: self.chunk_size]
+            if self._state == "done" or not await self._feed():
+                break
+
+        if self._buffer:
+            yield bytes(self._buffer)
+            self._buffer.clear()
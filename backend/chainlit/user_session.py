@@ -1,8 +1,9 @@
 from typing import Callable, Dict, Generic, Optional, TypeVar
 
 from chainlit.context import context
+from chainlit.session_store import InMemorySessionStore, approximate_size
 
-user_sessions: Dict[str, Dict] = {}
+user_sessions: InMemorySessionStore[Dict] = InMemorySessionStore("user_sessions")
 
 T = TypeVar("T")
 
@@ -41,7 +42,13 @@ class UserSession:
             user_sessions[context.session.id] = {}
 
         user_session = user_sessions[context.session.id]
+        # Account the change in the session memory, without measuring the whole session
+        if key in user_session:
+            delta = approximate_size(value) - approximate_size(user_session[key])
+        else:
+            delta = approximate_size(key) + approximate_size(value)
         user_session[key] = value
+        user_sessions.grow(context.session.id, delta)
 
     def create_accessor(
         self, key: str, default: T, *, apply_fn: Optional[Callable[[T], T]] = None
@@ -0,0 +1,108 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import HTTPException
+
+import chainlit.auth.user_cache as user_cache
+from chainlit.auth import authenticate_user, create_jwt, invalidate_token
+from chainlit.config import ChainlitConfig
+from chainlit.user import PersistedUser, User
+
+
+@pytest.fixture
+def auth_config(test_config: ChainlitConfig, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("CHAINLIT_AUTH_SECRET", "test-secret" * 4)
+    monkeypatch.setattr("chainlit.auth.jwt.config", test_config)
+    monkeypatch.setattr(user_cache, "config", test_config)
+    user_cache.clear_user_cache()
+    return test_config
+
+
+@pytest.fixture
+def data_layer(
+    persisted_test_user: PersistedUser, monkeypatch: pytest.MonkeyPatch
+) -> AsyncMock:
+    data_layer = AsyncMock()
+    data_layer.get_user.return_value = persisted_test_user
+    monkeypatch.setattr("chainlit.auth.get_data_layer", lambda: data_layer)
+    return data_layer
+
+
+async def test_user_is_cached_per_token(auth_config: ChainlitConfig, data_layer):
+    token = create_jwt(User(identifier="test_user_identifier"))
+
+    first = await authenticate_user(token)
+    second = await authenticate_user(token)
+
+    assert first is second
+    assert first.identifier == "test_user_identifier"
+    data_layer.get_user.assert_awaited_once_with("test_user_identifier")
+
+
+async def test_logout_invalidates_token(auth_config: ChainlitConfig, data_layer):
+    token = create_jwt(User(identifier="test_user_identifier"))
+    await authenticate_user(token)
+
+    invalidate_token(token)
+    await authenticate_user(token)
+
+    assert data_layer.get_user.await_count == 2
+
+
+async def test_cache_can_be_disabled(
+    auth_config: ChainlitConfig, data_layer, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(auth_config.project, "auth_cache_ttl", 0)
+    token = create_jwt(User(identifier="test_user_identifier"))
+
+    await authenticate_user(token)
+    await authenticate_user(token)
+
+    assert data_layer.get_user.await_count == 2
+
+
+async def test_missing_token_is_rejected(auth_config: ChainlitConfig, data_layer):
+    with pytest.raises(HTTPException) as exc_info:
+        await authenticate_user(None)  # type: ignore[arg-type]
+
+    assert exc_info.value.status_code == 401
+    data_layer.get_user.assert_not_awaited()
+
+
+async def test_expired_token_is_rejected(
+    auth_config: ChainlitConfig, data_layer, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(auth_config.project, "user_session_timeout", -1)
+    token = create_jwt(User(identifier="test_user_identifier"))
+
+    with pytest.raises(HTTPException) as exc_info:
+        await authenticate_user(token)
+
+    assert exc_info.value.status_code == 401
+    data_layer.get_user.assert_not_awaited()
+
+
+async def test_concurrent_lookups_are_coalesced(
+    auth_config: ChainlitConfig,
+    data_layer,
+    persisted_test_user: PersistedUser,
+):
+    async def slow_get_user(identifier: str):
+        await asyncio.sleep(0.01)
+        return persisted_test_user
+
+    data_layer.get_user.side_effect = slow_get_user
+    # Different tokens of the same user, e.g. issued to several tabs
+    tokens = [
+        create_jwt(User(identifier="test_user_identifier", display_name=name))
+        for name in ("first", "second", "third")
+    ]
+
+    users = await asyncio.gather(*(authenticate_user(token) for token in tokens))
+
+    data_layer.get_user.assert_awaited_once()
+    assert [user.display_name for user in users] == ["first", "second", "third"]
+    # The shared persisted user is left untouched
+    assert persisted_test_user.display_name is None
+    assert user_cache._user_lookups == {}
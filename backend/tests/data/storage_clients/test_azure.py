@@ -0,0 +1,58 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from chainlit.data.storage_clients.azure import AzureStorageClient
+
+
+class DataLakeClient(AzureStorageClient):
+    """The abstract methods the Data Lake client does not implement."""
+
+    async def get_read_url(self, object_key: str) -> str:
+        return object_key
+
+    async def delete_file(self, object_key: str) -> bool:
+        return True
+
+
+@pytest.fixture
+def file_client():
+    with patch(
+        "chainlit.data.storage_clients.azure.DataLakeServiceClient"
+    ) as service_client:
+        file_client = MagicMock()
+        file_client.url = "https://account.dfs.core.windows.net/container/file"
+        container_client = service_client.return_value.get_file_system_client
+        container_client.return_value.get_file_client.return_value = file_client
+        yield file_client
+
+
+@pytest.mark.asyncio
+async def test_upload_stream_appends_parts(file_client: MagicMock):
+    """The stream is appended part by part rather than read in memory at once."""
+    client = DataLakeClient(
+        account_url="https://account.dfs.core.windows.net",
+        container="container",
+        credential="key",
+        sas_token="?sas",
+    )
+    client.part_size = 4
+
+    async def chunks():
+        yield b"hello "
+        yield b"world"
+
+    result = await client.upload_stream("file", chunks(), mime="text/plain")
+
+    assert result == {
+        "object_key": "file",
+        "url": "https://account.dfs.core.windows.net/container/file?sas",
+    }
+    file_client.create_file.assert_called_once()
+    assert [call.args for call in file_client.append_data.call_args_list] == [
+        (b"hell", 0, 4),
+        (b"o wo", 4, 4),
+        (b"rld", 8, 3),
+    ]
+    assert file_client.flush_data.call_args.args == (11,)
+    client.shutdown_upload_executor()
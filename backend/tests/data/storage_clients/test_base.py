@@ -0,0 +1,67 @@
+import io
+from unittest.mock import patch
+
+from chainlit.data.storage_clients.base import SignedUrlCache, iter_parts
+
+
+def test_signed_url_cache_hit_and_miss():
+    cache = SignedUrlCache(ttl=60, max_size=10)
+
+    assert cache.get("key") is None
+    cache.set("key", "https://signed/key")
+
+    assert cache.get("key") == "https://signed/key"
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_signed_url_cache_expires_entries():
+    cache = SignedUrlCache(ttl=60, max_size=10)
+
+    with patch("chainlit.data.storage_clients.base.time.monotonic", return_value=0):
+        cache.set("key", "https://signed/key")
+
+    with patch("chainlit.data.storage_clients.base.time.monotonic", return_value=59):
+        assert cache.get("key") == "https://signed/key"
+
+    with patch("chainlit.data.storage_clients.base.time.monotonic", return_value=60):
+        assert cache.get("key") is None
+
+    assert cache.stats()["size"] == 0
+
+
+def test_signed_url_cache_evicts_least_recently_used():
+    cache = SignedUrlCache(ttl=60, max_size=2)
+
+    cache.set("a", "url-a")
+    cache.set("b", "url-b")
+    cache.get("a")
+    cache.set("c", "url-c")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "url-a"
+    assert cache.get("c") == "url-c"
+
+
+def test_signed_url_cache_disabled_when_margin_exceeds_expiry():
+    cache = SignedUrlCache(ttl=0, max_size=10)
+
+    cache.set("key", "url")
+
+    assert cache.get("key") is None
+
+
+async def test_iter_parts_from_file_object():
+    parts = [part async for part in iter_parts(io.BytesIO(b"abcdefg"), 3)]
+
+    assert parts == [b"abc", b"def", b"g"]
+
+
+async def test_iter_parts_from_async_iterator():
+    async def chunks():
+        yield b"ab"
+        yield b"cdefg"
+        yield b"h"
+
+    parts = [part async for part in iter_parts(chunks(), 3)]
+
+    assert parts == [b"abc", b"def", b"gh"]
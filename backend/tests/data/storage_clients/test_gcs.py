@@ -128,6 +128,31 @@ class TestGCSStorageClient:
 
         assert url == "https://signed-url.example.com"
 
+    @pytest.mark.asyncio
+    async def test_get_read_url_is_cached(self, mock_gcs_client):
+        """Test that signed URLs are reused until they are about to expire."""
+        mock_gcs_client[
+            "blob"
+        ].generate_signed_url.return_value = "https://signed-url.example.com"
+
+        client = GCSStorageClient(
+            bucket_name="test-bucket",
+            project_id="test-project",
+            client_email="test@example.com",
+            private_key="test-key",
+        )
+
+        first = await client.get_read_url("test/path/file.txt")
+        second = await client.get_read_url("test/path/file.txt")
+
+        assert first == second == "https://signed-url.example.com"
+        mock_gcs_client["blob"].generate_signed_url.assert_called_once()
+        assert client.url_cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+        await client.delete_file("test/path/file.txt")
+        await client.get_read_url("test/path/file.txt")
+        assert mock_gcs_client["blob"].generate_signed_url.call_count == 2
+
     def test_sync_upload_file(self, mock_gcs_client):
         """Test uploading a file to GCS."""
         client = GCSStorageClient(
@@ -335,3 +360,28 @@ class TestGCSStorageClient:
         mock_gcs_client["bucket"].blob.assert_called_once_with("test/path/file.txt")
         mock_gcs_client["blob"].delete.assert_called_once()
         assert result is True
+
+    @pytest.mark.asyncio
+    async def test_upload_stream_rounds_chunk_size(self, mock_gcs_client):
+        """Custom part sizes are rounded up to a multiple of 256 KiB."""
+        client = GCSStorageClient(
+            bucket_name="test-bucket",
+            project_id="test-project",
+            client_email="test@example.com",
+            private_key="test-key",
+        )
+        client.part_size = 300 * 1024
+        writer = mock_gcs_client["blob"].open.return_value
+        data = b"x" * (600 * 1024)
+
+        async def chunks():
+            yield data
+
+        await client.upload_stream("test/path/file.bin", chunks(), mime="video/mp4")
+
+        mock_gcs_client["blob"].open.assert_called_once_with(
+            "wb", chunk_size=512 * 1024, content_type="video/mp4"
+        )
+        assert b"".join(call.args[0] for call in writer.write.call_args_list) == data
+        writer.close.assert_called_once()
+        client.shutdown_upload_executor()
@@ -1,4 +1,6 @@
+import io
 import os
+from unittest.mock import patch
 
 import boto3  # type: ignore
 import pytest
@@ -45,3 +47,65 @@ async def test_upload_file(s3_mock):
     # Verify that the file exists in the mock S3
     response = s3_mock.get_object(Bucket="my-test-bucket", Key="test.txt")
     assert response["Body"].read().decode() == "This is a test file"
+
+
+@pytest.mark.asyncio
+async def test_upload_stream_small_file(s3_mock):
+    client = S3StorageClient(bucket="my-test-bucket")
+
+    result = await client.upload_stream(
+        object_key="small.txt", stream=io.BytesIO(b"small content"), mime="text/plain"
+    )
+
+    assert result["object_key"] == "small.txt"
+    response = s3_mock.get_object(Bucket="my-test-bucket", Key="small.txt")
+    assert response["Body"].read() == b"small content"
+
+
+@pytest.mark.asyncio
+async def test_upload_stream_multipart(s3_mock):
+    client = S3StorageClient(bucket="my-test-bucket")
+    client.part_size = 5 * 1024 * 1024
+    client.upload_concurrency = 2
+    data = os.urandom(client.part_size * 2 + 1024)
+
+    async def chunks():
+        for i in range(0, len(data), 1024 * 1024):
+            yield data[i : i + 1024 * 1024]
+
+    result = await client.upload_stream(
+        object_key="large.bin",
+        stream=chunks(),
+        content_disposition='attachment; filename="large.bin"',
+    )
+
+    assert result["object_key"] == "large.bin"
+    response = s3_mock.get_object(Bucket="my-test-bucket", Key="large.bin")
+    assert response["Body"].read() == data
+    assert response["ContentDisposition"] == 'attachment; filename="large.bin"'
+
+
+@pytest.mark.asyncio
+async def test_failed_presign_is_not_cached(s3_mock):
+    client = S3StorageClient(bucket="my-test-bucket")
+    generate_presigned_url = client.client.generate_presigned_url
+
+    with patch.object(
+        client.client,
+        "generate_presigned_url",
+        side_effect=RuntimeError("Service unavailable"),
+    ):
+        with pytest.raises(RuntimeError):
+            await client.get_read_url("test.txt")
+        # The synchronous helper still falls back to the object key
+        assert client.sync_get_read_url("test.txt") == "test.txt"
+
+    assert client.url_cache.stats()["size"] == 0
+
+    with patch.object(
+        client.client, "generate_presigned_url", wraps=generate_presigned_url
+    ):
+        url = await client.get_read_url("test.txt")
+
+    assert url.startswith("https://my-test-bucket.s3.amazonaws.com/test.txt?")
+    assert await client.get_read_url("test.txt") == url
@@ -1,9 +1,28 @@
+import asyncio
 import json
-from unittest.mock import AsyncMock
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import List
+from unittest.mock import AsyncMock, Mock
 
 import pytest
 
-from chainlit.data.chainlit_data_layer import ChainlitDataLayer
+from chainlit.data.chainlit_data_layer import (
+    CREATE_ELEMENT_QUERY,
+    CREATE_STEP_QUERY,
+    GET_THREAD_QUERY,
+    GET_THREAD_STEPS_SINCE_QUERY,
+    INSERT_STEP_PLACEHOLDER_QUERY,
+    INSERT_THREAD_PLACEHOLDER_QUERY,
+    SEARCH_MAX_CHARS,
+    UPSERT_ELEMENT_QUERY,
+    UPSERT_STEP_QUERY,
+    ChainlitDataLayer,
+    full_text_search_migration,
+)
+from chainlit.data.storage_clients.base import BaseStorageClient
+from chainlit.types import Pagination, ThreadFilter
+from tests.conftest import create_chainlit_context
 
 
 @pytest.mark.asyncio
@@ -212,9 +231,7 @@ async def test_create_step_uses_nullif_for_output_and_input():
     initial Step.send() is treated as NULL by COALESCE, preventing it from
     overwriting non-empty content saved by a subsequent Step.update().
     """
-    import inspect
-
-    source = inspect.getsource(ChainlitDataLayer.create_step)
+    source = UPSERT_STEP_QUERY
 
     assert "NULLIF(EXCLUDED.output, '')" in source, (
         "output should use NULLIF to treat empty string as NULL"
@@ -222,3 +239,638 @@ async def test_create_step_uses_nullif_for_output_and_input():
     assert "NULLIF(EXCLUDED.input, '')" in source, (
         "input should use NULLIF to treat empty string as NULL"
     )
+
+
+@pytest.mark.asyncio
+async def test_create_step_batches_queued_writes(mock_chainlit_context):
+    """Queued step writes are merged and persisted in a single batch."""
+    data_layer = ChainlitDataLayer(database_url="postgresql://test")
+    data_layer.execute_batch = AsyncMock()
+    data_layer.execute_query = AsyncMock()
+
+    async with mock_chainlit_context:
+        await data_layer.create_step(
+            {
+                "id": "step-1",
+                "threadId": "thread-1",
+                "parentId": "parent-1",
+                "type": "assistant_message",
+                "output": "",
+                "createdAt": "2024-01-01T00:00:00.000000Z",
+            }
+        )
+        await data_layer.update_step(
+            {
+                "id": "step-1",
+                "threadId": "thread-1",
+                "parentId": "parent-1",
+                "type": "assistant_message",
+                "output": "Hello",
+                "createdAt": "2024-01-01T00:00:01.000000Z",
+            }
+        )
+        await data_layer.create_step(
+            {"id": "step-2", "threadId": "thread-1", "type": "user_message"}
+        )
+        await data_layer.flush()
+
+    data_layer.execute_query.assert_not_called()
+    data_layer.execute_batch.assert_called_once()
+    statements = dict(data_layer.execute_batch.call_args[0][0])
+
+    threads = statements[INSERT_THREAD_PLACEHOLDER_QUERY]
+    assert [thread[0] for thread in threads] == ["thread-1"]
+
+    parents = statements[INSERT_STEP_PLACEHOLDER_QUERY]
+    assert [parent[0] for parent in parents] == ["parent-1"]
+
+    steps = statements[UPSERT_STEP_QUERY]
+    assert [step[0] for step in steps] == ["step-1", "step-2"]
+    # The update is merged into the creation, keeping the earliest start time
+    assert steps[0][6] == "Hello"
+    assert steps[0][8] == datetime(2024, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_only_drops_bad_writes(mock_chainlit_context):
+    """A write failing a batch is retried alone, the other writes are persisted."""
+    data_layer = ChainlitDataLayer(database_url="postgresql://test")
+    data_layer.execute_query = AsyncMock()
+    persisted: List[str] = []
+
+    async def execute_batch(statements):
+        step_ids = [step[0] for step in dict(statements)[UPSERT_STEP_QUERY]]
+        if "bad-step" in step_ids:
+            raise ValueError("violates foreign key constraint")
+        persisted.extend(step_ids)
+
+    data_layer.execute_batch = AsyncMock(side_effect=execute_batch)
+
+    async with mock_chainlit_context:
+        for step_id in ("step-1", "bad-step", "step-2"):
+            await data_layer.create_step(
+                {"id": step_id, "threadId": "thread-1", "type": "user_message"}
+            )
+        await data_layer.flush()
+
+    assert persisted == ["step-1", "step-2"]
+    # The batch, then each write alone
+    assert data_layer.execute_batch.await_count == 4
+
+
+@pytest.mark.asyncio
+async def test_batched_writes_skip_known_rows(mock_chainlit_context):
+    """With write-behind, the default, rows a session wrote get no placeholders."""
+    data_layer = ChainlitDataLayer(database_url="postgresql://test")
+    data_layer.execute_batch = AsyncMock()
+
+    async with mock_chainlit_context:
+        await data_layer.create_step(
+            {"id": "step-1", "threadId": "thread-1", "type": "user_message"}
+        )
+        await data_layer.flush()
+        await data_layer.create_step(
+            {
+                "id": "step-2",
+                "threadId": "thread-1",
+                "parentId": "step-1",
+                "type": "assistant_message",
+            }
+        )
+        await data_layer.flush()
+
+    first, second = (
+        dict(call[0][0]) for call in data_layer.execute_batch.call_args_list
+    )
+    assert [thread[0] for thread in first[INSERT_THREAD_PLACEHOLDER_QUERY]] == [
+        "thread-1"
+    ]
+    assert second[INSERT_THREAD_PLACEHOLDER_QUERY] == []
+    assert second[INSERT_STEP_PLACEHOLDER_QUERY] == []
+    assert [step[0] for step in second[UPSERT_STEP_QUERY]] == ["step-2"]
+
+
+@pytest.mark.asyncio
+async def test_create_step_without_write_behind(mock_chainlit_context):
+    """Without write-behind, steps are upserted right away."""
+    data_layer = ChainlitDataLayer(database_url="postgresql://test", write_behind=False)
+    data_layer.execute_query = AsyncMock(return_value=[{"id": "thread-1"}])
+
+    async with mock_chainlit_context:
+        await data_layer.create_step(
+            {"id": "step-1", "threadId": "thread-1", "type": "user_message"}
+        )
+
+    assert data_layer.write_queue is None
+    # The thread is created, if needed, along with the step
+    data_layer.execute_query.assert_awaited_once()
+    assert data_layer.execute_query.call_args[0][0] == CREATE_STEP_QUERY
+
+
+@pytest.mark.asyncio
+async def test_create_step_skips_known_rows(mock_chainlit_context):
+    """Threads and steps a session wrote are not ensured to exist again."""
+    data_layer = ChainlitDataLayer(database_url="postgresql://test", write_behind=False)
+    data_layer.execute_query = AsyncMock(return_value=[])
+
+    async with mock_chainlit_context:
+        await data_layer.create_step(
+            {"id": "step-1", "threadId": "thread-1", "type": "user_message"}
+        )
+        await data_layer.create_step(
+            {
+                "id": "step-2",
+                "threadId": "thread-1",
+                "parentId": "step-1",
+                "type": "assistant_message",
+            }
+        )
+        await data_layer.update_step(
+            {"id": "step-2", "threadId": "thread-1", "type": "assistant_message"}
+        )
+        # Unknown parent
+        await data_layer.create_step(
+            {
+                "id": "step-3",
+                "threadId": "thread-1",
+                "parentId": "run-1",
+                "type": "tool",
+            }
+        )
+
+    queries = [call[0][0] for call in data_layer.execute_query.call_args_list]
+    assert queries == [
+        CREATE_STEP_QUERY,
+        UPSERT_STEP_QUERY,
+        UPSERT_STEP_QUERY,
+        CREATE_STEP_QUERY,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_known_rows_are_per_session(mock_session_factory):
+    """Another session, or a deleted thread, ensures the rows exist again."""
+    data_layer = ChainlitDataLayer(database_url="postgresql://test", write_behind=False)
+    data_layer.execute_query = AsyncMock(return_value=[])
+    step = {"id": "step-1", "threadId": "thread-1", "type": "user_message"}
+    first_session = mock_session_factory(id="session-1")
+    second_session = mock_session_factory(id="session-2")
+
+    async with create_chainlit_context(first_session):
+        await data_layer.create_step(step)
+        await data_layer.create_step(step)
+    async with create_chainlit_context(second_session):
+        await data_layer.create_step(step)
+    async with create_chainlit_context(first_session):
+        await data_layer.delete_thread("thread-1")
+        await data_layer.create_step(step)
+
+    queries = [
+        call[0][0]
+        for call in data_layer.execute_query.call_args_list
+        if call[0][0] in (CREATE_STEP_QUERY, UPSERT_STEP_QUERY)
+    ]
+    assert queries == [
+        CREATE_STEP_QUERY,
+        UPSERT_STEP_QUERY,
+        CREATE_STEP_QUERY,
+        CREATE_STEP_QUERY,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_create_element_in_single_round_trip(mock_chainlit_context):
+    """Elements are written along with their missing thread and step."""
+    data_layer = ChainlitDataLayer(database_url="postgresql://test", write_behind=False)
+    data_layer.execute_query = AsyncMock(return_value=[])
+    element = Mock(
+        id="element-1",
+        thread_id="thread-1",
+        for_id="step-1",
+        path=None,
+        content=None,
+        url="https://example.com/image.png",
+        mime="image/png",
+        chainlit_key=None,
+        display="inline",
+        size=None,
+        language=None,
+        page=None,
+        props={},
+        type="image",
+    )
+    element.name = "image.png"
+
+    async with mock_chainlit_context:
+        await data_layer.create_element(element)
+        await data_layer.create_element(element)
+
+    (create_query, create_params), (upsert_query, upsert_params) = [
+        call[0] for call in data_layer.execute_query.call_args_list
+    ]
+    assert create_query == CREATE_ELEMENT_QUERY
+    assert len(create_params) == 15
+    assert upsert_query == UPSERT_ELEMENT_QUERY
+    assert len(upsert_params) == 14
+
+
+@pytest.mark.asyncio
+async def test_get_thread_single_round_trip():
+    """Thread, steps and elements are fetched with a single query."""
+    data_layer = ChainlitDataLayer(database_url="postgresql://test")
+    steps = [
+        {
+            "id": "step-1",
+            "threadId": "thread-1",
+            "parentId": None,
+            "name": "step",
+            "type": "assistant_message",
+            "input": "",
+            "output": "hello",
+            "metadata": {"key": "value"},
+            "createdAt": "2024-01-01T00:00:00.123",
+            "startTime": "2024-01-01T00:00:00.123",
+            "endTime": None,
+            "feedback_id": None,
+            "feedback_value": None,
+            "feedback_comment": None,
+        }
+    ]
+    data_layer.execute_query = AsyncMock(
+        return_value=[
+            {
+                "id": "thread-1",
+                "createdAt": datetime(2024, 1, 1),
+                "name": "Thread",
+                "userId": None,
+                "user_identifier": None,
+                "metadata": "{}",
+                "steps": json.dumps(steps),
+                "elements": "[]",
+            }
+        ]
+    )
+
+    thread = await data_layer.get_thread("thread-1")
+
+    data_layer.execute_query.assert_awaited_once_with(
+        GET_THREAD_QUERY, {"thread_id": "thread-1"}
+    )
+    assert thread is not None
+    assert thread["steps"][0]["metadata"] == {"key": "value"}
+    assert thread["steps"][0]["start"] == "2024-01-01T00:00:00.123"
+    assert thread["elements"] == []
+
+
+@pytest.mark.asyncio
+async def test_get_thread_signs_element_urls_concurrently():
+    """Element URLs are signed concurrently, up to url_signing_concurrency at once."""
+    in_flight = 0
+    max_in_flight = 0
+
+    async def get_read_url(object_key: str):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return f"https://signed/{object_key}"
+
+    storage_client = AsyncMock()
+    storage_client.get_read_url = AsyncMock(side_effect=get_read_url)
+    data_layer = ChainlitDataLayer(
+        database_url="postgresql://test",
+        storage_client=storage_client,
+        url_signing_concurrency=3,
+    )
+    elements = [
+        {
+            "id": f"element-{i}",
+            "threadId": "thread-1",
+            "stepId": "step-1",
+            "metadata": {"type": "image"},
+            "url": None,
+            "objectKey": f"key-{i}",
+            "name": f"image-{i}",
+            "mime": "image/png",
+            "display": "inline",
+            "size": None,
+            "language": None,
+            "page": None,
+            "props": None,
+        }
+        for i in range(10)
+    ]
+    data_layer.execute_query = AsyncMock(
+        return_value=[
+            {
+                "id": "thread-1",
+                "createdAt": datetime(2024, 1, 1),
+                "name": "Thread",
+                "userId": None,
+                "user_identifier": None,
+                "metadata": "{}",
+                "steps": "[]",
+                "elements": json.dumps(elements),
+            }
+        ]
+    )
+
+    thread = await data_layer.get_thread("thread-1")
+
+    assert thread is not None
+    assert [e["url"] for e in thread["elements"]] == [
+        f"https://signed/key-{i}" for i in range(10)
+    ]
+    assert storage_client.get_read_url.await_count == 10
+    assert 1 < max_in_flight <= 3
+
+
+@pytest.mark.asyncio
+async def test_get_thread_steps_since():
+    """Only the steps from the cursor step on are loaded, with their elements."""
+    storage_client = AsyncMock()
+    storage_client.get_read_url.return_value = "https://signed/key"
+    data_layer = ChainlitDataLayer(
+        database_url="postgresql://test", storage_client=storage_client
+    )
+    step = {
+        "id": "step-2",
+        "threadId": "thread-1",
+        "parentId": None,
+        "name": "Assistant",
+        "type": "assistant_message",
+        "input": "",
+        "output": "Hi",
+        "metadata": {},
+        "createdAt": "2024-01-01T00:00:02",
+        "startTime": "2024-01-01T00:00:02",
+        "endTime": None,
+        "showInput": None,
+        "isError": False,
+    }
+    element = {
+        "id": "element-1",
+        "threadId": "thread-1",
+        "stepId": "step-2",
+        "metadata": {"type": "image"},
+        "url": None,
+        "objectKey": "key",
+        "name": "image",
+        "mime": "image/png",
+        "display": "inline",
+        "size": None,
+        "language": None,
+        "page": None,
+        "props": None,
+    }
+    data_layer.execute_query = AsyncMock(
+        return_value=[{"steps": json.dumps([step]), "elements": json.dumps([element])}]
+    )
+
+    delta = await data_layer.get_thread_steps_since(
+        "thread-1", {"stepId": "step-2", "createdAt": "2024-01-01T00:00:02"}
+    )
+
+    data_layer.execute_query.assert_awaited_once_with(
+        GET_THREAD_STEPS_SINCE_QUERY, {"thread_id": "thread-1", "step_id": "step-2"}
+    )
+    assert delta is not None
+    assert delta["id"] == "thread-1"
+    assert [s["id"] for s in delta["steps"]] == ["step-2"]
+    assert [e["url"] for e in delta["elements"]] == ["https://signed/key"]
+
+    # Unknown cursor step
+    data_layer.execute_query = AsyncMock(return_value=[])
+    assert (
+        await data_layer.get_thread_steps_since(
+            "thread-1", {"stepId": "missing", "createdAt": "2024-01-01T00:00:02"}
+        )
+        is None
+    )
+
+
+@pytest.mark.asyncio
+async def test_upload_element_streams_file_from_path(tmp_path):
+    """Elements with a path are streamed to the storage client."""
+    file_path = tmp_path / "video.mp4"
+    file_path.write_bytes(b"video content")
+    storage_client = AsyncMock(spec=BaseStorageClient)
+    data_layer = ChainlitDataLayer(
+        database_url="postgresql://test", storage_client=storage_client
+    )
+    element = Mock(
+        id="element-1",
+        thread_id="thread-1",
+        path=str(file_path),
+        content=None,
+        url=None,
+        mime="video/mp4",
+    )
+    element.name = "video.mp4"
+
+    object_key = await data_layer._upload_element(element)
+
+    assert object_key == "threads/thread-1/files/element-1"
+    storage_client.upload_file.assert_not_called()
+    kwargs = storage_client.upload_stream.call_args.kwargs
+    assert kwargs["object_key"] == object_key
+    assert kwargs["mime"] == "video/mp4"
+
+
+class FakeConnection:
+    def __init__(self):
+        self.fetch = AsyncMock(return_value=[])
+
+
+class FakePool:
+    def __init__(self, connections):
+        self.connections = list(connections)
+        self.acquired = 0
+        self.timeouts = []
+
+    @asynccontextmanager
+    async def acquire(self, timeout=None):
+        self.timeouts.append(timeout)
+        connection = self.connections[self.acquired % len(self.connections)]
+        self.acquired += 1
+        yield connection
+
+
+@pytest.mark.asyncio
+async def test_connect_configures_pool(monkeypatch: pytest.MonkeyPatch):
+    """Pool sizing, timeouts and statement cache settings are passed to asyncpg."""
+    create_pool = AsyncMock()
+    monkeypatch.setattr(
+        "chainlit.data.chainlit_data_layer.asyncpg.create_pool", create_pool
+    )
+    data_layer = ChainlitDataLayer(
+        database_url="postgresql://test",
+        pool_min_size=2,
+        pool_max_size=20,
+        command_timeout=30,
+        statement_cache_size=0,
+    )
+
+    await data_layer.connect()
+
+    create_pool.assert_awaited_once_with(
+        "postgresql://test",
+        min_size=2,
+        max_size=20,
+        max_inactive_connection_lifetime=300.0,
+        command_timeout=30,
+        statement_cache_size=0,
+        max_cached_statement_lifetime=300,
+    )
+
+
+def test_pool_settings_from_environment(monkeypatch: pytest.MonkeyPatch):
+    """The pool of the default data layer is tuned with environment variables."""
+    from chainlit.data import _database_pool_settings
+
+    monkeypatch.setenv("DATABASE_POOL_MAX_SIZE", "25")
+    monkeypatch.setenv("DATABASE_COMMAND_TIMEOUT", "12.5")
+    monkeypatch.setenv("DATABASE_STATEMENT_CACHE_SIZE", "not a number")
+
+    with pytest.warns(UserWarning, match="DATABASE_STATEMENT_CACHE_SIZE"):
+        settings = _database_pool_settings()
+
+    assert settings == {"pool_max_size": 25, "command_timeout": 12.5}
+
+
+@pytest.mark.asyncio
+async def test_query_stats():
+    """Executions are counted in total and for each hot path query."""
+    data_layer = ChainlitDataLayer(
+        database_url="postgresql://test", pool_acquire_timeout=5
+    )
+    pool = FakePool([FakeConnection(), FakeConnection()])
+    data_layer.pool = pool  # type: ignore[assignment]
+
+    for _ in range(4):
+        await data_layer.get_user("user")
+    await data_layer.execute_query("SELECT 1")
+
+    stats = data_layer.query_stats()
+    assert stats["executions"] == 5
+    assert stats["hot_path_executions"]["get_user"] == 4
+    assert sum(stats["hot_path_executions"].values()) == 4
+    assert pool.timeouts == [5] * 5
+
+
+def thread_row(thread_id: str) -> dict:
+    return {
+        "id": thread_id,
+        "updatedAt": datetime(2024, 1, 1),
+        "name": "Thread",
+        "userId": "user-1",
+        "user_identifier": "user",
+        "metadata": "{}",
+    }
+
+
+@pytest.mark.asyncio
+async def test_list_threads_does_not_count_total():
+    """Threads are paginated without counting all the matching threads."""
+    data_layer = ChainlitDataLayer(database_url="postgresql://test")
+    data_layer.execute_query = AsyncMock(
+        return_value=[thread_row("thread-1"), thread_row("thread-2")]
+    )
+
+    result = await data_layer.list_threads(
+        Pagination(first=1, cursor="thread-0"),
+        ThreadFilter(userId="user-1", search="hello"),
+    )
+
+    query, params = data_layer.execute_query.call_args[0]
+    assert "COUNT(*)" not in query
+    assert "t.name ILIKE $2" in query
+    assert params == {
+        "user_id": "user-1",
+        "name": "%hello%",
+        "cursor": "thread-0",
+        "limit": 2,
+    }
+    assert [thread["id"] for thread in result.data] == ["thread-1"]
+    assert result.pageInfo.hasNextPage
+
+
+@pytest.mark.asyncio
+async def test_list_threads_full_text_search():
+    """With full-text search, threads are matched on the search index and ranked."""
+    data_layer = ChainlitDataLayer(
+        database_url="postgresql://test",
+        full_text_search=True,
+        search_language="english",
+    )
+    data_layer.execute_query = AsyncMock(return_value=[thread_row("thread-1")])
+
+    result = await data_layer.list_threads(
+        Pagination(first=10, cursor="thread-0"),
+        ThreadFilter(userId="user-1", search="quarterly report"),
+    )
+
+    query, params = data_layer.execute_query.call_args[0]
+    assert "websearch_to_tsquery($2::regconfig, $3)" in query
+    assert '"searchVector" @@ search.query' in query
+    assert "ILIKE" not in query
+    assert 'ORDER BY rank DESC, "updatedAt" DESC LIMIT $5' in query
+    assert params == {
+        "user_id": "user-1",
+        "language": "english",
+        "search": "quarterly report",
+        "cursor": "thread-0",
+        "limit": 11,
+    }
+    assert [thread["id"] for thread in result.data] == ["thread-1"]
+
+
+@pytest.mark.asyncio
+async def test_create_search_index():
+    """The migration adds generated search vectors and their GIN indexes."""
+    data_layer = ChainlitDataLayer(
+        database_url="postgresql://test", search_language="french"
+    )
+    data_layer.execute_query = AsyncMock(return_value=[])
+
+    await data_layer.create_search_index()
+
+    statements = [call[0][0] for call in data_layer.execute_query.call_args_list]
+    assert statements == full_text_search_migration("french")
+    assert any("to_tsvector('french'" in statement for statement in statements)
+    assert sum("USING GIN" in statement for statement in statements) == 2
+
+
+@pytest.mark.asyncio
+async def test_large_output_is_written_with_a_bounded_search_vector(
+    mock_chainlit_context,
+):
+    """The search vector only covers the start of outputs too large to index."""
+    for statement in full_text_search_migration():
+        if "to_tsvector" in statement:
+            assert f", {SEARCH_MAX_CHARS}))" in statement
+
+    data_layer = ChainlitDataLayer(database_url="postgresql://test", write_behind=False)
+    data_layer.execute_query = AsyncMock(return_value=[{"id": "thread-1"}])
+    output = "word " * 1_000_000
+
+    async with mock_chainlit_context:
+        await data_layer.create_step(
+            {
+                "id": "step-1",
+                "threadId": "thread-1",
+                "type": "assistant_message",
+                "output": output,
+            }
+        )
+
+    # The output itself is stored in full
+    assert output in data_layer.execute_query.call_args[0][1].values()
+
+
+def test_search_language_is_validated():
+    with pytest.raises(ValueError, match="Invalid text search configuration"):
+        ChainlitDataLayer(
+            database_url="postgresql://test", search_language="english'); DROP"
+        )
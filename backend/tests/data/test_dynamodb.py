@@ -0,0 +1,168 @@
+import os
+from unittest.mock import AsyncMock, Mock
+
+import boto3  # type: ignore
+import pytest
+from moto import mock_aws
+
+import chainlit.data.dynamodb as dynamodb
+from chainlit.data.dynamodb import BATCH_WRITE_SIZE, DynamoDBDataLayer
+
+TABLE_NAME = "chainlit"
+
+
+@pytest.fixture
+def aws_credentials():
+    """Mocked AWS Credentials for moto."""
+    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+    os.environ["AWS_SECURITY_TOKEN"] = "testing"
+    os.environ["AWS_SESSION_TOKEN"] = "testing"
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+
+
+@pytest.fixture
+def dynamodb_client(aws_credentials):
+    """Moto mock DynamoDB setup, with the table and index of the data layer."""
+    with mock_aws():
+        client = boto3.client("dynamodb", region_name="us-east-1")
+        client.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "PK", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+                {"AttributeName": "UserThreadPK", "AttributeType": "S"},
+                {"AttributeName": "UserThreadSK", "AttributeType": "S"},
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": "UserThread",
+                    "KeySchema": [
+                        {"AttributeName": "UserThreadPK", "KeyType": "HASH"},
+                        {"AttributeName": "UserThreadSK", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                }
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield client
+
+
+@pytest.fixture
+async def data_layer(dynamodb_client):
+    data_layer = DynamoDBDataLayer(table_name=TABLE_NAME, client=dynamodb_client)
+    yield data_layer
+    if data_layer._executor is not None:
+        data_layer._executor.shutdown()
+
+
+def put_step(data_layer: DynamoDBDataLayer, thread_id: str, step_id: str, **fields):
+    item = {
+        "PK": f"THREAD#{thread_id}",
+        "SK": f"STEP#{step_id}",
+        "id": step_id,
+        "threadId": thread_id,
+        "createdAt": f"2024-01-01T00:00:{step_id.zfill(2)}Z",
+        "type": "assistant_message",
+        **fields,
+    }
+    data_layer.client.put_item(
+        TableName=TABLE_NAME, Item=data_layer._serialize_item(item)
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_thread(data_layer: DynamoDBDataLayer):
+    await data_layer.update_thread("thread", name="Thread", user_id="user")
+    for step_id in ("2", "1"):
+        put_step(data_layer, "thread", step_id)
+    data_layer.client.put_item(
+        TableName=TABLE_NAME,
+        Item=data_layer._serialize_item(
+            {
+                "PK": "THREAD#thread",
+                "SK": "ELEMENT#element",
+                "id": "element",
+                "threadId": "thread",
+                "objectKey": "user/element",
+            }
+        ),
+    )
+    data_layer.storage_provider = AsyncMock()
+    data_layer.storage_provider.get_read_url.return_value = "https://example.com/file"
+
+    thread = await data_layer.get_thread("thread")
+
+    assert thread is not None
+    assert thread["name"] == "Thread"
+    assert [step["id"] for step in thread["steps"]] == ["1", "2"]
+    assert thread["elements"] is not None
+    assert [element["url"] for element in thread["elements"]] == [
+        "https://example.com/file"
+    ]
+    assert await data_layer.get_thread("missing") is None
+
+
+@pytest.mark.asyncio
+async def test_delete_thread_with_many_items(data_layer: DynamoDBDataLayer):
+    await data_layer.update_thread("thread", name="Thread", user_id="user")
+    step_count = BATCH_WRITE_SIZE * 2 + 5
+    for index in range(step_count):
+        put_step(data_layer, "thread", str(index))
+
+    batch_write_item = Mock(wraps=data_layer.client.batch_write_item)
+    data_layer.client.batch_write_item = batch_write_item
+
+    await data_layer.delete_thread("thread")
+
+    assert batch_write_item.call_count == 3
+    response = data_layer.client.query(
+        TableName=TABLE_NAME,
+        KeyConditionExpression="PK = :pk",
+        ExpressionAttributeValues={":pk": {"S": "THREAD#thread"}},
+    )
+    assert response["Items"] == []
+
+
+@pytest.mark.asyncio
+async def test_get_favorite_steps(data_layer: DynamoDBDataLayer):
+    for thread_id in ("first", "second"):
+        await data_layer.update_thread(thread_id, user_id="user")
+    put_step(data_layer, "first", "1", metadata={"favorite": True})
+    put_step(data_layer, "first", "2", metadata={})
+    put_step(data_layer, "second", "3", metadata={"favorite": True})
+
+    steps = await data_layer.get_favorite_steps("user")
+
+    assert [step["id"] for step in steps] == ["3", "1"]
+    assert all("PK" not in step and "SK" not in step for step in steps)
+
+
+@pytest.mark.asyncio
+async def test_unprocessed_items_are_retried(monkeypatch: pytest.MonkeyPatch):
+    sleep = AsyncMock()
+    monkeypatch.setattr(dynamodb.asyncio, "sleep", sleep)
+    unprocessed = {TABLE_NAME: [{"DeleteRequest": {"Key": {"PK": {"S": "2"}}}}]}
+    client = Mock()
+    client.batch_write_item.side_effect = [
+        {"UnprocessedItems": unprocessed},
+        {"UnprocessedItems": {}},
+    ]
+    data_layer = DynamoDBDataLayer(table_name=TABLE_NAME, client=client)
+
+    await data_layer._batch_write(
+        [
+            {"DeleteRequest": {"Key": {"PK": {"S": "1"}}}},
+            {"DeleteRequest": {"Key": {"PK": {"S": "2"}}}},
+        ]
+    )
+
+    assert client.batch_write_item.call_count == 2
+    assert client.batch_write_item.call_args.kwargs == {"RequestItems": unprocessed}
+    sleep.assert_awaited_once()
+    await data_layer.close()
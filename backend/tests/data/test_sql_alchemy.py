@@ -10,6 +10,7 @@ from chainlit import User
 from chainlit.data.sql_alchemy import SQLAlchemyDataLayer
 from chainlit.data.storage_clients.base import BaseStorageClient
 from chainlit.element import Text
+from chainlit.types import Pagination, ThreadFilter
 
 
 @pytest.fixture
@@ -325,3 +326,96 @@ async def test_update_thread_name_update_preserves_metadata(
     assert isinstance(result, list)
     assert result
     assert result[0]["name"] == "New Name"
+
+
+async def _create_thread_with_step(
+    data_layer: SQLAlchemyDataLayer,
+    user_id: str,
+    thread_id: str,
+    step_created_at: str,
+    output: str,
+):
+    await data_layer.update_thread(thread_id, user_id=user_id)
+    await data_layer.execute_sql(
+        """
+        INSERT INTO steps ("id", "name", "type", "threadId", "disableFeedback", "streaming", "output", "createdAt")
+        VALUES (:id, 'step', 'assistant_message', :thread_id, false, false, :output, :created_at)
+        """,
+        {
+            "id": str(uuid.uuid4()),
+            "thread_id": thread_id,
+            "output": output,
+            "created_at": step_created_at,
+        },
+    )
+
+
+async def test_list_threads_keyset_pagination(
+    test_user: User, data_layer: SQLAlchemyDataLayer
+):
+    persisted_user = await data_layer.create_user(test_user)
+    assert persisted_user
+
+    for i in range(5):
+        await _create_thread_with_step(
+            data_layer,
+            persisted_user.id,
+            f"thread_{i}",
+            f"2024-01-0{i + 1}T00:00:00Z",
+            f"output {i}",
+        )
+
+    filters = ThreadFilter(userId=persisted_user.id)
+    first_page = await data_layer.list_threads(Pagination(first=2), filters)
+
+    assert [t["id"] for t in first_page.data] == ["thread_4", "thread_3"]
+    assert first_page.pageInfo.hasNextPage
+    # Only thread headers are returned
+    assert first_page.data[0]["steps"] == []
+    assert first_page.data[0]["elements"] == []
+
+    second_page = await data_layer.list_threads(
+        Pagination(first=2, cursor=first_page.pageInfo.endCursor), filters
+    )
+    assert [t["id"] for t in second_page.data] == ["thread_2", "thread_1"]
+
+    last_page = await data_layer.list_threads(
+        Pagination(first=2, cursor=second_page.pageInfo.endCursor), filters
+    )
+    assert [t["id"] for t in last_page.data] == ["thread_0"]
+    assert not last_page.pageInfo.hasNextPage
+
+
+async def test_list_threads_filters(test_user: User, data_layer: SQLAlchemyDataLayer):
+    persisted_user = await data_layer.create_user(test_user)
+    assert persisted_user
+
+    await _create_thread_with_step(
+        data_layer, persisted_user.id, "thread_a", "2024-01-01", "Hello World"
+    )
+    await _create_thread_with_step(
+        data_layer, persisted_user.id, "thread_b", "2024-01-02", "Goodbye"
+    )
+    steps = await data_layer.execute_sql(
+        """SELECT "id" FROM steps WHERE "threadId" = 'thread_b'""", {}
+    )
+    assert isinstance(steps, list)
+    await data_layer.execute_sql(
+        """
+        INSERT INTO feedbacks ("id", "forId", "threadId", "value")
+        VALUES (:id, :for_id, 'thread_b', 1)
+        """,
+        {"id": str(uuid.uuid4()), "for_id": steps[0]["id"]},
+    )
+
+    searched = await data_layer.list_threads(
+        Pagination(first=10),
+        ThreadFilter(userId=persisted_user.id, search="world"),
+    )
+    assert [t["id"] for t in searched.data] == ["thread_a"]
+
+    with_feedback = await data_layer.list_threads(
+        Pagination(first=10),
+        ThreadFilter(userId=persisted_user.id, feedback=1),
+    )
+    assert [t["id"] for t in with_feedback.data] == ["thread_b"]
@@ -0,0 +1,76 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from chainlit.data import sign_element_urls
+
+
+@pytest.mark.asyncio
+async def test_sign_element_urls_bounds_concurrency():
+    in_flight = 0
+    max_in_flight = 0
+
+    async def get_read_url(object_key: str):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return f"https://signed/{object_key}"
+
+    storage_client = AsyncMock()
+    storage_client.get_read_url.side_effect = get_read_url
+    elements = [{"objectKey": f"key-{i}", "url": None} for i in range(10)]
+
+    await sign_element_urls(storage_client, elements, concurrency=4)
+
+    assert [element["url"] for element in elements] == [
+        f"https://signed/key-{i}" for i in range(10)
+    ]
+    assert max_in_flight == 4
+
+
+@pytest.mark.asyncio
+async def test_sign_element_urls_isolates_failures():
+    async def get_read_url(object_key: str):
+        if object_key == "broken":
+            raise RuntimeError("Access denied")
+        return f"https://signed/{object_key}"
+
+    storage_client = AsyncMock()
+    storage_client.get_read_url.side_effect = get_read_url
+    elements = [
+        {"objectKey": "broken", "url": "https://stored/broken"},
+        {"objectKey": "key", "url": "https://stored/key"},
+        {"objectKey": "  ", "url": "https://stored/blank"},
+        {"url": "https://external/file"},
+    ]
+
+    await sign_element_urls(storage_client, elements)
+
+    assert [element["url"] for element in elements] == [
+        "https://stored/broken",
+        "https://signed/key",
+        "https://stored/blank",
+        "https://external/file",
+    ]
+    assert storage_client.get_read_url.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_sign_element_urls_keeps_existing_urls():
+    storage_client = AsyncMock()
+    storage_client.get_read_url.return_value = "https://signed/key"
+    elements = [
+        {"objectKey": "key", "url": "https://stored/key"},
+        {"objectKey": "key", "url": None},
+    ]
+
+    await sign_element_urls(storage_client, elements, overwrite=False)
+
+    assert [element["url"] for element in elements] == [
+        "https://stored/key",
+        "https://signed/key",
+    ]
+    await sign_element_urls(None, elements)
@@ -0,0 +1,86 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from chainlit.data.write_behind import WriteBehindQueue
+
+
+@pytest.mark.asyncio
+async def test_flushes_on_batch_size():
+    flush = AsyncMock()
+    queue = WriteBehindQueue(flush, max_batch_size=2, flush_interval=10)
+
+    for i in range(4):
+        await queue.put(i)
+    await queue.drain()
+
+    assert [call.args[0] for call in flush.call_args_list] == [[0, 1], [2, 3]]
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_flushes_on_interval():
+    flush = AsyncMock()
+    queue = WriteBehindQueue(flush, max_batch_size=100, flush_interval=0.01)
+
+    await queue.put("a")
+    await queue.put("b")
+    await asyncio.sleep(0.05)
+
+    flush.assert_called_once_with(["a", "b"])
+    assert queue.pending == 0
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_flush_error_does_not_stop_worker():
+    flush = AsyncMock(side_effect=[Exception("boom"), None])
+    queue = WriteBehindQueue(flush, max_batch_size=1)
+
+    await queue.put("a")
+    await queue.put("b")
+    await queue.drain()
+
+    assert flush.call_count == 2
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_close_drains_pending_writes():
+    flush = AsyncMock()
+    queue = WriteBehindQueue(flush, max_batch_size=100, flush_interval=10)
+
+    await queue.put("a")
+    await queue.close()
+
+    flush.assert_called_once_with(["a"])
+
+
+@pytest.mark.asyncio
+async def test_drain_does_not_wait_for_later_writes():
+    flushed = []
+
+    async def flush(batch):
+        flushed.extend(batch)
+        await asyncio.sleep(0.001)
+
+    queue = WriteBehindQueue(flush, max_batch_size=2, flush_interval=10)
+    for i in range(4):
+        await queue.put(i)
+
+    async def keep_writing():
+        i = 4
+        while True:
+            await queue.put(i)
+            i += 1
+            await asyncio.sleep(0)
+
+    writer = asyncio.create_task(keep_writing())
+    try:
+        await asyncio.wait_for(queue.drain(), 1)
+    finally:
+        writer.cancel()
+
+    assert flushed[:4] == [0, 1, 2, 3]
+    await queue.close()
@@ -1,3 +1,4 @@
+import asyncio
 import sys
 import threading
 from unittest.mock import Mock, patch
@@ -556,3 +557,147 @@ class TestCacheEdgeCases:
 
         func(5)  # Cache hit
         assert len(cache_module._cache) == 2  # No new entry
+
+
+class TestCacheOptions:
+    """Test suite for the options and statistics of the @cache decorator."""
+
+    def test_maxsize_evicts_least_recently_used(self):
+        """Test that bounded caches evict their least recently used results."""
+        calls = []
+
+        @cache(maxsize=2)
+        def square(x):
+            calls.append(x)
+            return x * x
+
+        square(1)
+        square(2)
+        square(1)  # 1 is now the most recently used
+        square(3)  # Evicts 2
+
+        square(1)
+        square(2)
+
+        assert calls == [1, 2, 3, 2]
+        assert square.cache_info() == {
+            "hits": 2,
+            "misses": 4,
+            "evictions": 2,
+            "size": 2,
+            "disk_hits": 0,
+        }
+
+    def test_ttl_expires_results(self):
+        """Test that results are computed again once expired."""
+        call_count = 0
+
+        @cache(ttl=60)
+        def now():
+            nonlocal call_count
+            call_count += 1
+            return call_count
+
+        with patch.object(cache_module.time, "monotonic", return_value=1000.0):
+            assert now() == 1
+            assert now() == 1
+        with patch.object(cache_module.time, "monotonic", return_value=1061.0):
+            assert now() == 2
+
+    def test_cache_clear(self):
+        """Test that cache_clear drops the results of a single function."""
+
+        @cache
+        def identity(x):
+            return x
+
+        @cache
+        def other(x):
+            return x
+
+        identity(1)
+        other(1)
+        identity.cache_clear()
+
+        assert identity.cache_info()["size"] == 0
+        assert other.cache_info()["size"] == 1
+
+    def test_slow_key_does_not_block_other_keys(self):
+        """Test that computing a key does not hold up the calls for other keys."""
+        slow_started = threading.Event()
+        release_slow = threading.Event()
+
+        @cache
+        def load(name):
+            if name == "slow":
+                slow_started.set()
+                assert release_slow.wait(5)
+            return name
+
+        thread = threading.Thread(target=load, args=("slow",))
+        thread.start()
+        assert slow_started.wait(5)
+
+        # Would deadlock if the cache was locked while computing "slow"
+        assert load("fast") == "fast"
+
+        release_slow.set()
+        thread.join()
+        assert load("slow") == "slow"
+
+    def test_failed_computation_is_retried(self):
+        """Test that errors are not cached."""
+        attempts = 0
+
+        @cache
+        def flaky():
+            nonlocal attempts
+            attempts += 1
+            if attempts == 1:
+                raise ConnectionError("unavailable")
+            return "loaded"
+
+        with pytest.raises(ConnectionError):
+            flaky()
+        assert flaky() == "loaded"
+        assert flaky() == "loaded"
+        assert attempts == 2
+
+    async def test_coroutine_results_are_cached(self):
+        """Test that coroutine functions cache their results, not coroutines."""
+        call_count = 0
+
+        @cache
+        async def fetch(x):
+            nonlocal call_count
+            call_count += 1
+            await asyncio.sleep(0.01)
+            return x * 2
+
+        results = await asyncio.gather(*(fetch(21) for _ in range(5)))
+
+        assert results == [42] * 5
+        assert await fetch(21) == 42
+        # Concurrent misses computed the result once
+        assert call_count == 1
+        assert fetch.cache_info()["misses"] == 1
+
+    def test_disk_tier_survives_new_process(self, tmp_path):
+        """Test that results written to disk are reused by a fresh cache."""
+        path = str(tmp_path / "cache.db")
+        calls = []
+
+        def load_model(name):
+            calls.append(name)
+            return {"name": name}
+
+        cached = cache(disk=path)(load_model)
+        assert cached("small") == {"name": "small"}
+
+        # Simulate a restart: the memory tier is empty
+        cache_module._cache.clear()
+        restarted = cache(disk=path)(load_model)
+        assert restarted("small") == {"name": "small"}
+
+        assert calls == ["small"]
+        assert restarted.cache_info()["disk_hits"] == 1
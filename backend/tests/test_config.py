@@ -125,3 +125,57 @@ class TestLoadTranslation:
             chainlit_config, "config_translation_dir", str(translation_dir)
         )
         assert test_config.load_translation("fr") == {"greeting": "Hello"}
+
+
+class TestWithOverrides:
+    @pytest.fixture
+    def overrides(self) -> chainlit_config.ChainlitConfigOverrides:
+        return chainlit_config.ChainlitConfigOverrides(
+            ui=chainlit_config.UISettings(name="Profile App")
+        )
+
+    def test_merges_overrides(
+        self,
+        test_config: ChainlitConfig,
+        overrides: chainlit_config.ChainlitConfigOverrides,
+    ):
+        merged = test_config.with_overrides(overrides, profile="profile")
+
+        assert merged is not test_config
+        assert merged.ui.name == "Profile App"
+        assert test_config.ui.name != "Profile App"
+
+    def test_shares_merged_config(
+        self,
+        test_config: ChainlitConfig,
+        overrides: chainlit_config.ChainlitConfigOverrides,
+    ):
+        merged = test_config.with_overrides(overrides, profile="profile")
+
+        # Equal overrides, e.g. built again by the chat profiles callback
+        same_overrides = chainlit_config.ChainlitConfigOverrides(
+            ui=chainlit_config.UISettings(name="Profile App")
+        )
+        assert test_config.with_overrides(same_overrides, profile="profile") is merged
+        assert test_config.with_overrides(overrides, profile="other") is not merged
+
+        other_overrides = chainlit_config.ChainlitConfigOverrides(
+            ui=chainlit_config.UISettings(name="Other App")
+        )
+        other = test_config.with_overrides(other_overrides, profile="profile")
+        assert other is not merged
+        assert other.ui.name == "Other App"
+
+    def test_cache_is_dropped_on_reload(
+        self,
+        test_config: ChainlitConfig,
+        overrides: chainlit_config.ChainlitConfigOverrides,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        merged = test_config.with_overrides(overrides, profile="profile")
+        monkeypatch.setattr(chainlit_config, "config", test_config)
+
+        chainlit_config.reload_config()
+
+        assert len(chainlit_config._overrides_cache) == 0
+        assert test_config.with_overrides(overrides, profile="profile") is not merged
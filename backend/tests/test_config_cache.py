@@ -0,0 +1,64 @@
+from unittest.mock import patch
+
+import pytest
+
+import chainlit.config
+from chainlit.config_cache import ConfigCache
+
+
+@pytest.fixture
+def generation(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("chainlit.config._config_generation", 1)
+
+    def bump():
+        chainlit.config._config_generation += 1
+
+    return bump
+
+
+def test_values_are_dropped_when_config_is_reloaded(generation):
+    cache: ConfigCache[str] = ConfigCache()
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+
+    generation()
+
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_values_are_evicted(generation):
+    cache: ConfigCache[int] = ConfigCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_values_expire_after_ttl(generation):
+    cache: ConfigCache[str] = ConfigCache()
+
+    with patch("chainlit.config_cache.time.monotonic", return_value=100.0):
+        cache.set("key", "value", ttl=10)
+        cache.set("forever", "value")
+
+    with patch("chainlit.config_cache.time.monotonic", return_value=105.0):
+        assert cache.get("key") == "value"
+
+    with patch("chainlit.config_cache.time.monotonic", return_value=110.0):
+        assert cache.get("key", "missing") == "missing"
+        assert cache.get("forever") == "value"
+
+
+def test_none_can_be_told_apart_from_missing_values(generation):
+    cache: ConfigCache[None] = ConfigCache()
+    missing = object()
+    cache.set("key", None)
+
+    assert cache.get("key", missing) is None
+    assert cache.get("other", missing) is missing
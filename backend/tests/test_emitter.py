@@ -1,9 +1,11 @@
-from unittest.mock import MagicMock
+import asyncio
+from unittest.mock import MagicMock, call
 
 import pytest
 
+from chainlit.config import config
 from chainlit.element import ElementDict
-from chainlit.emitter import ChainlitEmitter
+from chainlit.emitter import ChainlitEmitter, TokenCoalescer
 from chainlit.step import StepDict
 
 
@@ -209,3 +211,120 @@ async def test_send_toast_invalid_type(emitter: ChainlitEmitter) -> None:
     message = "This is a test message"
     with pytest.raises(ValueError, match="Invalid toast type: invalid"):
         await emitter.send_toast(message, type="invalid")  # type: ignore[arg-type]
+
+
+async def test_send_token_coalesced(
+    emitter: ChainlitEmitter, mock_websocket_session: MagicMock, monkeypatch
+) -> None:
+    monkeypatch.setattr(config.project, "stream_token_interval_ms", 10)
+    monkeypatch.setattr(config.project, "stream_token_max_bytes", 4096)
+    mock_websocket_session.token_coalescer = None
+
+    await emitter.send_token("test_id", "Hello")
+    await emitter.send_token("test_id", " ")
+    await emitter.send_token("test_id", "World")
+    mock_websocket_session.emit.assert_not_called()
+
+    await asyncio.sleep(0.05)
+
+    mock_websocket_session.emit.assert_called_once_with(
+        "stream_token",
+        {
+            "id": "test_id",
+            "token": "Hello World",
+            "isSequence": False,
+            "isInput": False,
+        },
+    )
+
+
+async def test_send_token_coalesced_flushes_on_size(
+    emitter: ChainlitEmitter, mock_websocket_session: MagicMock, monkeypatch
+) -> None:
+    monkeypatch.setattr(config.project, "stream_token_interval_ms", 10_000)
+    monkeypatch.setattr(config.project, "stream_token_max_bytes", 4)
+    mock_websocket_session.token_coalescer = None
+
+    await emitter.send_token("test_id", "ab")
+    mock_websocket_session.emit.assert_not_called()
+    await emitter.send_token("test_id", "cd")
+
+    mock_websocket_session.emit.assert_called_once_with(
+        "stream_token",
+        {"id": "test_id", "token": "abcd", "isSequence": False, "isInput": False},
+    )
+    mock_websocket_session.token_coalescer.close()
+
+
+async def test_send_token_coalesced_sequence_replaces_pending_tokens(
+    emitter: ChainlitEmitter, mock_websocket_session: MagicMock, monkeypatch
+) -> None:
+    monkeypatch.setattr(config.project, "stream_token_interval_ms", 10_000)
+    mock_websocket_session.token_coalescer = None
+
+    await emitter.send_token("test_id", "stale")
+    await emitter.send_token("test_id", "New", is_sequence=True)
+    await emitter.send_token("test_id", " content")
+    await emitter.send_token("test_id", "input", is_input=True)
+    await emitter.flush_tokens("test_id")
+
+    assert mock_websocket_session.emit.call_args_list == [
+        call(
+            "stream_token",
+            {
+                "id": "test_id",
+                "token": "New content",
+                "isSequence": True,
+                "isInput": False,
+            },
+        ),
+        call(
+            "stream_token",
+            {"id": "test_id", "token": "input", "isSequence": False, "isInput": True},
+        ),
+    ]
+    mock_websocket_session.token_coalescer.close()
+
+
+async def test_update_step_flushes_pending_tokens(
+    emitter: ChainlitEmitter, mock_websocket_session: MagicMock, monkeypatch
+) -> None:
+    monkeypatch.setattr(config.project, "stream_token_interval_ms", 10_000)
+    mock_websocket_session.token_coalescer = None
+    step_dict: StepDict = {
+        "id": "test_id",
+        "type": "assistant_message",
+        "name": "Test Step",
+        "output": "Hello",
+    }
+
+    await emitter.send_token("test_id", "Hello")
+    await emitter.update_step(step_dict)
+
+    assert mock_websocket_session.emit.call_args_list == [
+        call(
+            "stream_token",
+            {"id": "test_id", "token": "Hello", "isSequence": False, "isInput": False},
+        ),
+        call("update_message", step_dict),
+    ]
+    mock_websocket_session.token_coalescer.close()
+
+
+async def test_concurrent_flushes_emit_each_frame_once(
+    mock_websocket_session: MagicMock,
+) -> None:
+    async def emit(event, data):
+        await asyncio.sleep(0)
+
+    mock_websocket_session.emit.side_effect = emit
+    coalescer = TokenCoalescer(mock_websocket_session, interval=10, max_bytes=4096)
+    await coalescer.push("first", "Hello")
+    await coalescer.push("second", "World")
+
+    await asyncio.gather(coalescer.flush(), coalescer.flush("second"))
+
+    assert sorted(
+        call.args[1]["id"] for call in mock_websocket_session.emit.call_args_list
+    ) == ["first", "second"]
+    coalescer.close()
@@ -0,0 +1,116 @@
+import errno
+import os
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from chainlit import file_copy
+from chainlit.file_copy import COPY_STRATEGIES, async_copy_file, copy_file
+from chainlit.session import BaseSession
+
+
+def _fail(src: str, dst: str):
+    # Leave a partial file behind, as a strategy failing midway would
+    Path(dst).write_bytes(b"partial")
+    raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+
+@pytest.fixture
+def src(tmp_path: Path) -> Path:
+    src = tmp_path / "src.bin"
+    src.write_bytes(os.urandom(3 * 1024 * 1024 + 17))
+    return src
+
+
+def test_copy_file_links_on_same_filesystem(src: Path, tmp_path: Path):
+    dst = tmp_path / "dst.bin"
+
+    assert copy_file(str(src), str(dst)) == "link"
+    assert dst.stat().st_ino == src.stat().st_ino
+
+
+@pytest.mark.parametrize("strategy_index", range(1, len(COPY_STRATEGIES)))
+def test_copy_file_falls_back(src: Path, tmp_path: Path, strategy_index: int):
+    """Each strategy produces an identical copy when the ones before it fail."""
+    strategies = [
+        (name, _fail if index < strategy_index else strategy)
+        for index, (name, strategy) in enumerate(COPY_STRATEGIES)
+    ]
+    expected = strategies[strategy_index][0]
+    if expected in ("reflink", "sendfile") and not sys.platform.startswith("linux"):
+        pytest.skip(f"{expected} requires Linux")
+
+    dst = tmp_path / "dst.bin"
+    with patch.object(file_copy, "COPY_STRATEGIES", strategies):
+        try:
+            strategy = copy_file(str(src), str(dst))
+        except OSError:
+            # e.g. reflink on a filesystem without copy-on-write
+            pytest.skip(f"{expected} is not supported by this filesystem")
+
+    # Unsupported strategies fall through to the next ones
+    assert [name for name, _ in strategies].index(strategy) >= strategy_index
+    assert dst.read_bytes() == src.read_bytes()
+    assert dst.stat().st_ino != src.stat().st_ino
+
+
+@pytest.mark.parametrize("name", ["copy_file_range", "sendfile"])
+def test_short_kernel_copy_falls_back(src: Path, tmp_path: Path, name: str):
+    """A kernel copy stopping before the end of the source is not kept."""
+    if not sys.platform.startswith("linux"):
+        pytest.skip(f"{name} requires Linux")
+    strategies = [
+        (strategy_name, strategy)
+        for strategy_name, strategy in COPY_STRATEGIES
+        if strategy_name in (name, "chunked")
+    ]
+    dst = tmp_path / "dst.bin"
+
+    # The kernel stops after the first megabyte
+    calls = iter([1024 * 1024, 0])
+    with (
+        patch.object(file_copy, "COPY_STRATEGIES", strategies),
+        patch.object(file_copy.os, name, lambda *args: next(calls)),
+    ):
+        assert copy_file(str(src), str(dst), link=False) == "chunked"
+
+    assert dst.read_bytes() == src.read_bytes()
+
+
+def test_copy_file_raises_when_source_is_missing(tmp_path: Path):
+    with pytest.raises(FileNotFoundError):
+        copy_file(str(tmp_path / "missing"), str(tmp_path / "dst"))
+    assert not (tmp_path / "dst").exists()
+
+
+async def test_async_copy_file(src: Path, tmp_path: Path):
+    dst = tmp_path / "dst.bin"
+
+    assert await async_copy_file(str(src), str(dst)) in dict(COPY_STRATEGIES)
+    assert dst.read_bytes() == src.read_bytes()
+
+
+async def test_persist_file_from_path_does_not_read_the_file(src: Path, tmp_path: Path):
+    with patch("chainlit.config.FILES_DIRECTORY", tmp_path / "files"):
+        (tmp_path / "files").mkdir()
+        session = BaseSession(
+            id="test_id",
+            client_type="webapp",
+            thread_id=None,
+            user=None,
+            token=None,
+            user_env=None,
+        )
+
+        with patch("aiofiles.open") as aiofiles_open:
+            result = await session.persist_file(
+                name="src.bin", mime="application/pdf", path=str(src)
+            )
+
+        aiofiles_open.assert_not_called()
+        file = session.files[result["id"]]
+        assert file["size"] == src.stat().st_size
+        assert file["path"].suffix == ".pdf"
+        assert file["path"].read_bytes() == src.read_bytes()
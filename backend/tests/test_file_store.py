@@ -0,0 +1,163 @@
+import hashlib
+import os
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+import chainlit.file_store as file_store
+from chainlit.config import ChainlitConfig
+from chainlit.file_store import ContentAddressedFileStore, get_file_store
+from chainlit.session import WebsocketSession
+
+
+async def _chunks(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> ContentAddressedFileStore:
+    return ContentAddressedFileStore(tmp_path / "blobs")
+
+
+async def test_identical_content_is_stored_once(store: ContentAddressedFileStore):
+    first, digest, size = await store.put(
+        "session_1", "file_1", suffix=".txt", chunks=_chunks(b"same ", b"content")
+    )
+    second, _, _ = await store.put(
+        "session_2", "file_2", suffix=".txt", chunks=_chunks(b"same content")
+    )
+
+    assert first == second
+    assert first.read_bytes() == b"same content"
+    assert first.suffix == ".txt"
+    assert digest == hashlib.sha256(b"same content").hexdigest()
+    assert size == len(b"same content")
+    assert store.stats() == {
+        "blobs": 1,
+        "references": 2,
+        "bytes": size,
+        "deduplicated_bytes": size,
+    }
+    assert list((store.root / "tmp").iterdir()) == []
+
+
+async def test_path_is_not_copied_when_blob_exists(
+    store: ContentAddressedFileStore, tmp_path: Path
+):
+    source = tmp_path / "source.pdf"
+    source.write_bytes(b"pdf content")
+
+    blob, digest, _ = await store.put("session_1", "file_1", path=str(source))
+    # Hard linking would let later changes to the source alter the blob
+    assert blob.stat().st_ino != source.stat().st_ino
+
+    written_at = blob.stat().st_mtime_ns
+    again, again_digest, _ = await store.put("session_2", "file_2", path=str(source))
+
+    assert again == blob
+    assert blob.stat().st_mtime_ns == written_at
+    assert again_digest == digest
+    assert store.stats()["blobs"] == 1
+
+
+async def test_blob_is_deleted_with_its_last_reference(
+    store: ContentAddressedFileStore,
+):
+    blob, _, _ = await store.put("session_1", "file_1", chunks=_chunks(b"content"))
+    await store.put("session_1", "file_2", chunks=_chunks(b"content"))
+    await store.put("session_2", "file_3", chunks=_chunks(b"content"))
+
+    assert store.release_session("session_1") == 0
+    assert blob.exists()
+
+    assert store.release("session_2", "file_3") is True
+    assert not blob.exists()
+    assert store.stats() == {
+        "blobs": 0,
+        "references": 0,
+        "bytes": 0,
+        "deduplicated_bytes": len(b"content") * 2,
+    }
+
+
+async def test_failed_put_leaves_nothing_behind(store: ContentAddressedFileStore):
+    async def failing_chunks():
+        yield b"partial"
+        raise ValueError("File size too large")
+
+    with pytest.raises(ValueError, match="File size too large"):
+        await store.put("session", "file", chunks=failing_chunks())
+
+    assert store.stats()["blobs"] == 0
+    assert list((store.root / "tmp").iterdir()) == []
+
+
+async def test_websocket_session_delete_collects_blobs(
+    test_config: ChainlitConfig,
+    store: ContentAddressedFileStore,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(test_config.project, "deduplicate_files", True)
+    monkeypatch.setattr("chainlit.file_store._file_store", store)
+    monkeypatch.setattr("chainlit.config.FILES_DIRECTORY", tmp_path / "files")
+
+    sessions = [
+        WebsocketSession(
+            id=f"session_{index}",
+            socket_id=f"socket_{index}",
+            emit=Mock(),
+            emit_call=Mock(),
+            user_env={},
+            client_type="webapp",
+        )
+        for index in range(2)
+    ]
+    (tmp_path / "files").mkdir()
+
+    paths = []
+    for session in sessions:
+        reference = await session.persist_file(
+            name="logo.png", mime="image/png", content=b"logo"
+        )
+        file = session.files[reference["id"]]
+        assert file["hash"] == hashlib.sha256(b"logo").hexdigest()
+        paths.append(file["path"])
+
+    assert paths[0] == paths[1]
+    assert paths[0].suffix == ".png"
+
+    await sessions[0].delete()
+    assert paths[0].exists()
+
+    await sessions[1].delete()
+    assert not paths[0].exists()
+
+
+async def test_blobs_of_dead_processes_are_cleared(
+    test_config: ChainlitConfig, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(test_config.project, "deduplicate_files", True)
+    monkeypatch.setattr("chainlit.config.FILES_DIRECTORY", tmp_path / "files")
+    monkeypatch.setenv("CHAINLIT_NODE_ID", "node")
+    monkeypatch.setattr(file_store, "_file_store", None)
+    monkeypatch.setattr(
+        file_store, "_is_process_alive", lambda pid: pid in (100, os.getpid())
+    )
+    blobs_directory = tmp_path / "files" / ".blobs"
+    for name in ("node-100", "node-200", "other-200"):
+        (blobs_directory / name).mkdir(parents=True)
+
+    store = get_file_store()
+
+    assert store is not None
+    assert store.root == blobs_directory / f"node-{os.getpid()}"
+    # Only the root of the dead process of this node is deleted
+    assert sorted(root.name for root in blobs_directory.iterdir()) == [
+        "node-100",
+        "other-200",
+    ]
+    await store.put("session", "file", chunks=_chunks(b"content"))
+    assert store.root.is_dir()
@@ -376,6 +376,23 @@ class TestMessage:
                 id=msg.id, token=" world", is_sequence=False
             )
 
+    @pytest.mark.asyncio
+    async def test_stream_token_buffers_until_read(self):
+        """Test that streamed tokens are only joined when the content is read."""
+        with mock_chainlit_context():
+            msg = Message(content="Hello")
+            msg.streaming = True
+
+            await msg.stream_token(" big")
+            await msg.stream_token(" world")
+
+            assert msg._content == "Hello"
+            assert msg.to_dict()["output"] == "Hello big world"
+
+            msg.content = "Reset"
+            await msg.stream_token("!")
+            assert msg.content == "Reset!"
+
     @pytest.mark.asyncio
     async def test_stream_token_with_sequence(self):
         """Test stream_token with is_sequence=True."""
@@ -1,13 +1,17 @@
 import datetime
+import hashlib
 import os
 import pathlib
+from functools import partial
 from pathlib import Path
 from typing import Callable
-from unittest.mock import AsyncMock, Mock, create_autospec, mock_open
+from unittest.mock import ANY, AsyncMock, Mock, create_autospec, mock_open
 
 import pytest
+from fastapi import Request
 from fastapi.testclient import TestClient
 
+import chainlit.config
 from chainlit.auth import get_current_user
 from chainlit.config import (
     APP_ROOT,
@@ -55,6 +59,43 @@ def test_project_translations_specific_language(
     mock_load_translation.reset_mock()
 
 
+def test_project_translations_are_cached_with_etag(
+    test_client: TestClient, mock_load_translation: Mock
+):
+    """Test that translations are loaded once per language and revalidated with an ETag."""
+    response = test_client.get("/project/translations?language=fr-FR")
+    assert response.status_code == 200
+    assert response.json() == {"translation": {"key": "value"}}
+    etag = response.headers["etag"]
+
+    response = test_client.get(
+        "/project/translations?language=fr-FR", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+    response = test_client.get("/project/translations?language=de-DE")
+    assert response.status_code == 200
+
+    assert mock_load_translation.call_count == 2
+
+
+def test_project_translations_are_loaded_again_after_config_reload(
+    test_client: TestClient,
+    mock_load_translation: Mock,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Test that reloading the config invalidates the cached translations."""
+    test_client.get("/project/translations?language=fr-FR")
+
+    monkeypatch.setattr(
+        "chainlit.config._config_generation",
+        chainlit.config.get_config_generation() + 1,
+    )
+    test_client.get("/project/translations?language=fr-FR")
+
+    assert mock_load_translation.call_count == 2
+
+
 def test_project_translations_invalid_language(
     test_client: TestClient, mock_load_translation: Mock
 ):
@@ -372,9 +413,101 @@ def test_upload_file_success(
 
     # Verify that persist_file was called with the correct arguments
     mock_session_get_by_id_patched.persist_file.assert_called_once_with(
-        name="test_upload.txt", content=file_content, mime="text/plain"
+        name="test_upload.txt",
+        mime="text/plain",
+        stream=ANY,
+        hash_algorithm=None,
+    )
+
+
+def test_upload_file_streams_to_disk(
+    test_client: TestClient,
+    test_config: ChainlitConfig,
+    mock_session_get_by_id_patched: Mock,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Test that the uploaded file is written to the session files directory as it arrives."""
+    from chainlit.session import BaseSession
+
+    monkeypatch.setattr(test_config.project, "upload_hash_algorithm", "sha256")
+    mock_session_get_by_id_patched.files_dir = tmp_path
+    mock_session_get_by_id_patched.persist_file = partial(
+        BaseSession.persist_file, mock_session_get_by_id_patched
     )
 
+    # Larger than a chunk, so that it is written in several of them
+    file_content = os.urandom(200 * 1024)
+    response = test_client.post(
+        "/project/file",
+        files={"file": ("test_upload.bin", file_content, "application/pdf")},
+        data={"other_field": "value"},
+        params={"session_id": mock_session_get_by_id_patched.id},
+    )
+
+    assert response.status_code == 200
+    file = mock_session_get_by_id_patched.files[response.json()["id"]]
+    assert file["name"] == "test_upload.bin"
+    assert file["type"] == "application/pdf"
+    assert file["size"] == len(file_content)
+    assert file["hash"] == hashlib.sha256(file_content).hexdigest()
+    assert file["path"].read_bytes() == file_content
+
+
+async def test_upload_stream_aborts_once_max_size_is_exceeded():
+    """Test that the body stops being read as soon as the file exceeds max_size."""
+    from chainlit.upload import MultipartFileStream, UploadTooLargeError
+
+    boundary = "boundary"
+    parts = [
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="big.txt"\r\n'
+        "Content-Type: text/plain\r\n\r\n".encode(),
+        *[b"x" * 1024] * 10,
+        f"\r\n--{boundary}--\r\n".encode(),
+    ]
+    received = 0
+
+    async def receive():
+        nonlocal received
+        received += 1
+        return {
+            "type": "http.request",
+            "body": parts[received - 1],
+            "more_body": received < len(parts),
+        }
+
+    request = Request(
+        {
+            "type": "http",
+            "method": "POST",
+            "headers": [
+                (
+                    b"content-type",
+                    f"multipart/form-data; boundary={boundary}".encode(),
+                )
+            ],
+        },
+        receive,
+    )
+    upload = MultipartFileStream(request, max_size=2048, chunk_size=512)
+
+    chunks = []
+
+    async def read_upload():
+        async for chunk in upload.chunks():
+            chunks.append(chunk)
+
+    with pytest.raises(UploadTooLargeError):
+        await read_upload()
+
+    assert upload.filename == "big.txt"
+    assert upload.content_type == "text/plain"
+    assert b"".join(chunks) == b"x" * 2048
+    assert all(len(chunk) == 512 for chunk in chunks)
+    # The rest of the body was never read
+    assert received == 4
+
 
 def test_file_access_by_different_user(
     test_client: TestClient,
@@ -1084,6 +1217,50 @@ def test_project_settings_forwards_chat_profile_to_starter_categories(
     assert categories[0]["starters"][0]["label"] == "Hello"
 
 
+def test_project_settings_etag(test_client: TestClient, mock_get_current_user: Mock):
+    """Test that unchanged settings are answered with a 304."""
+    response = test_client.get("/project/settings")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "private, no-cache"
+
+    response = test_client.get(
+        "/project/settings", headers={"If-None-Match": response.headers["etag"]}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+@pytest.mark.parametrize(("ttl", "expected_calls"), [(0, 3), (60, 2)])
+def test_project_settings_callbacks_cache(
+    test_client: TestClient,
+    test_config: ChainlitConfig,
+    mock_get_current_user: Mock,
+    persisted_test_user: PersistedUser,
+    ttl: int,
+    expected_calls: int,
+):
+    """Test that settings callback results are cached per user, only when a TTL is set."""
+    from chainlit.types import Starter
+
+    set_starters = AsyncMock(return_value=[Starter(label="Hello", message="hello")])
+    test_config.code.set_starters = set_starters
+    test_config.project.settings_callbacks_cache_ttl = ttl
+
+    mock_get_current_user.return_value = persisted_test_user
+    for _ in range(2):
+        response = test_client.get("/project/settings")
+        assert response.json()["starters"][0]["label"] == "Hello"
+
+    mock_get_current_user.return_value = PersistedUser(
+        id="another_user_id",
+        createdAt=datetime.datetime.now().isoformat(),
+        identifier="another_user_identifier",
+    )
+    test_client.get("/project/settings")
+
+    assert set_starters.call_count == expected_calls
+
+
 def test_share_thread_endpoint_sets_flags(
     test_client: TestClient,
     monkeypatch: pytest.MonkeyPatch,
@@ -1152,3 +1329,55 @@ def test_health_check(test_client: TestClient):
     response = test_client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
+
+
+@pytest.fixture
+def html_template_mock(monkeypatch: pytest.MonkeyPatch) -> Mock:
+    monkeypatch.setattr("chainlit.server._html_template_cache", {})
+    mock = Mock(return_value="<html>index</html>")
+    monkeypatch.setattr("chainlit.server.get_html_template", mock)
+    return mock
+
+
+def test_serve_index_is_cached_with_etag(
+    test_client: TestClient, html_template_mock: Mock
+):
+    """Test that the index is rendered once and revalidated with its ETag."""
+    response = test_client.get("/")
+
+    assert response.status_code == 200
+    assert response.text == "<html>index</html>"
+    etag = response.headers["etag"]
+    assert etag.startswith('"')
+
+    response = test_client.get("/some/page", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    html_template_mock.assert_called_once()
+
+    response = test_client.get("/", headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+
+
+def test_serve_index_is_rendered_again_after_config_reload(
+    test_client: TestClient,
+    html_template_mock: Mock,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Test that reloading the config invalidates the cached index."""
+    etag = test_client.get("/").headers["etag"]
+
+    html_template_mock.return_value = "<html>reloaded</html>"
+    monkeypatch.setattr(
+        "chainlit.config._config_generation",
+        chainlit.config.get_config_generation() + 1,
+    )
+
+    response = test_client.get("/", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.text == "<html>reloaded</html>"
+    assert response.headers["etag"] != etag
+    assert html_template_mock.call_count == 2
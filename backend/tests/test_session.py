@@ -1,4 +1,5 @@
 import builtins
+import hashlib
 import json
 import tempfile
 import uuid
@@ -251,6 +252,67 @@ class TestBaseSession:
                 file_id = result["id"]
                 assert session.files[file_id]["size"] > 0
 
+    @pytest.mark.asyncio
+    async def test_base_session_persist_file_with_stream(self):
+        """Test persisting a streamed file, hashing it as it is written."""
+
+        async def stream():
+            yield b"first chunk, "
+            yield b"second chunk"
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch("chainlit.config.FILES_DIRECTORY", Path(tmpdir)):
+                session = BaseSession(
+                    id="test_id",
+                    client_type="webapp",
+                    thread_id=None,
+                    user=None,
+                    token=None,
+                    user_env=None,
+                )
+
+                result = await session.persist_file(
+                    name="test.txt",
+                    mime="text/plain",
+                    stream=stream(),
+                    hash_algorithm="sha256",
+                )
+
+                file = session.files[result["id"]]
+                assert file["path"].read_bytes() == b"first chunk, second chunk"
+                assert file["size"] == len(b"first chunk, second chunk")
+                assert (
+                    file["hash"]
+                    == hashlib.sha256(b"first chunk, second chunk").hexdigest()
+                )
+
+    @pytest.mark.asyncio
+    async def test_base_session_persist_file_removes_partial_file(self):
+        """Test that a stream failing midway leaves no file behind."""
+
+        async def stream():
+            yield b"partial content"
+            raise ValueError("File size too large")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch("chainlit.config.FILES_DIRECTORY", Path(tmpdir)):
+                session = BaseSession(
+                    id="test_id",
+                    client_type="webapp",
+                    thread_id=None,
+                    user=None,
+                    token=None,
+                    user_env=None,
+                )
+
+                with pytest.raises(ValueError, match="File size too large"):
+                    await session.persist_file(
+                        name="test.txt", mime="text/plain", stream=stream()
+                    )
+
+                assert session.files == {}
+                assert list(session.files_dir.iterdir()) == []
+
     @pytest.mark.asyncio
     async def test_base_session_persist_file_without_path_or_content(self):
         """Test that persist_file raises error without path or content."""
@@ -0,0 +1,228 @@
+from typing import Callable, List
+from unittest.mock import AsyncMock, create_autospec, patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from chainlit.auth import get_current_user
+from chainlit.server import app
+from chainlit.session_directory import (
+    FORWARD_TIMEOUT,
+    FORWARDED_HEADER,
+    NODE_ID,
+    InMemorySessionDirectory,
+    RedisSessionDirectory,
+    SessionOwner,
+    close_forward_client,
+    get_client_manager,
+    get_forward_client,
+    local_owner,
+)
+
+
+@pytest.fixture
+def directory():
+    directory = InMemorySessionDirectory()
+    with patch(
+        "chainlit.session_directory.get_session_directory", return_value=directory
+    ):
+        yield directory
+
+
+@pytest.fixture
+def owner_node():
+    """Stand in for the node owning remote sessions, recording forwarded requests."""
+    requests: List[httpx.Request] = []
+    responses: List[Callable[[httpx.Request], httpx.Response]] = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return responses[0](request)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+    with patch("chainlit.session_directory.get_forward_client", return_value=client):
+        yield requests, responses
+
+
+@pytest.fixture
+def test_client():
+    app.dependency_overrides[get_current_user] = create_autospec(lambda: None)
+    yield TestClient(app)
+    del app.dependency_overrides[get_current_user]
+
+
+async def test_in_memory_directory_register_and_lookup():
+    directory = InMemorySessionDirectory()
+
+    await directory.register("session", local_owner())
+
+    owner = await directory.lookup("session")
+    assert owner is not None
+    assert owner.is_local
+    assert await directory.lookup("unknown") is None
+
+
+async def test_unregister_keeps_session_taken_over_by_another_node():
+    directory = InMemorySessionDirectory()
+    other = SessionOwner(node_id="other-node", node_url="http://other:8000")
+
+    await directory.register("session", other)
+    await directory.unregister("session", local_owner())
+    assert await directory.lookup("session") == other
+
+    await directory.unregister("session", other)
+    assert await directory.lookup("session") is None
+
+
+async def test_redis_registration_is_refreshed_on_activity(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    # Built without a Redis client, only the refresh policy is under test
+    directory = RedisSessionDirectory.__new__(RedisSessionDirectory)
+    directory.ttl = 100
+    directory._renewed_at = {"session": 0.0}
+    register = AsyncMock()
+    monkeypatch.setattr(directory, "register", register)
+    owner = local_owner()
+
+    monkeypatch.setattr("time.monotonic", lambda: 10.0)
+    await directory.refresh("session", owner)
+    register.assert_not_awaited()
+
+    monkeypatch.setattr("time.monotonic", lambda: 60.0)
+    await directory.refresh("session", owner)
+    register.assert_awaited_once_with("session", owner)
+
+    # Unknown to this node, e.g. registered before a restart
+    await directory.refresh("other-session", owner)
+    assert register.await_count == 2
+
+
+def test_client_manager_uses_redis_url(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.delenv("CHAINLIT_REDIS_URL", raising=False)
+    assert get_client_manager() is None
+
+    monkeypatch.setenv("CHAINLIT_REDIS_URL", "redis://localhost:6379/0")
+    with patch("socketio.AsyncRedisManager") as redis_manager:
+        assert get_client_manager() is redis_manager.return_value
+    redis_manager.assert_called_once_with("redis://localhost:6379/0")
+
+
+def test_get_file_is_forwarded_to_owner_node(
+    test_client: TestClient, directory: InMemorySessionDirectory, owner_node
+):
+    directory.owners["remote-session"] = SessionOwner(
+        node_id="other-node", node_url="http://other:8000"
+    )
+    requests, responses = owner_node
+
+    async def chunks():
+        yield b"remote "
+        yield b"content"
+
+    responses.append(
+        lambda request: httpx.Response(
+            200,
+            # Streamed back chunk by chunk
+            content=chunks(),
+            headers={
+                "content-type": "text/plain",
+                "content-disposition": 'attachment; filename="notes.txt"',
+                "cache-control": "private, max-age=60",
+                "connection": "keep-alive",
+            },
+        )
+    )
+
+    response = test_client.get(
+        "/project/file/file-id",
+        params={"session_id": "remote-session"},
+        headers={"Authorization": "Bearer token"},
+    )
+
+    assert response.status_code == 200
+    assert response.content == b"remote content"
+    assert response.headers["content-type"] == "text/plain"
+    assert response.headers["content-disposition"] == 'attachment; filename="notes.txt"'
+    assert response.headers["cache-control"] == "private, max-age=60"
+    assert "keep-alive" not in response.headers.get("connection", "")
+
+    (forwarded,) = requests
+    assert forwarded.method == "GET"
+    assert forwarded.url == httpx.URL(
+        "http://other:8000/project/file/file-id?session_id=remote-session"
+    )
+    assert forwarded.headers[FORWARDED_HEADER] == NODE_ID
+    assert forwarded.headers["authorization"] == "Bearer token"
+
+
+def test_forwarded_request_is_not_forwarded_again(
+    test_client: TestClient, directory: InMemorySessionDirectory, owner_node
+):
+    directory.owners["remote-session"] = SessionOwner(
+        node_id="other-node", node_url="http://other:8000"
+    )
+    requests, _ = owner_node
+
+    response = test_client.get(
+        "/project/file/file-id",
+        params={"session_id": "remote-session"},
+        headers={FORWARDED_HEADER: "other-node"},
+    )
+
+    assert response.status_code == 401
+    assert requests == []
+
+
+def test_action_for_unknown_session_is_not_found(
+    test_client: TestClient, directory: InMemorySessionDirectory
+):
+    response = test_client.post(
+        "/project/action",
+        json={"sessionId": "unknown", "action": {"name": "test"}},
+    )
+
+    assert response.status_code == 404
+
+
+def test_upload_is_forwarded_with_file(
+    test_client: TestClient, directory: InMemorySessionDirectory, owner_node
+):
+    directory.owners["remote-session"] = SessionOwner(
+        node_id="other-node", node_url="http://other:8000"
+    )
+    requests, responses = owner_node
+    bodies: List[bytes] = []
+
+    def respond(request: httpx.Request) -> httpx.Response:
+        bodies.append(request.read())
+        return httpx.Response(200, json={"id": "remote-file"})
+
+    responses.append(respond)
+
+    response = test_client.post(
+        "/project/file",
+        files={"file": ("test.txt", b"content", "text/plain")},
+        params={"session_id": "remote-session"},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"id": "remote-file"}
+    # The multipart body is streamed to the owner node as is
+    (forwarded,) = requests
+    assert forwarded.headers["content-type"].startswith("multipart/form-data")
+    assert b'filename="test.txt"' in bodies[0]
+
+
+async def test_forward_client_is_shared(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("chainlit.session_directory._forward_client", None)
+
+    client = get_forward_client()
+
+    assert get_forward_client() is client
+    assert client.timeout.read == FORWARD_TIMEOUT
+    await close_forward_client()
+    assert client.is_closed
+    assert get_forward_client() is not client
+    await close_forward_client()
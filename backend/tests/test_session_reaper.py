@@ -0,0 +1,103 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+from chainlit.session_reaper import SessionReaper
+
+
+async def wait_for_reaps(reap: AsyncMock, count: int):
+    for _ in range(100):
+        if reap.await_count >= count:
+            return
+        await asyncio.sleep(0.01)
+
+
+async def test_reaps_expired_sessions_in_deadline_order():
+    reap = AsyncMock()
+    reaper = SessionReaper(reap=reap)
+
+    reaper.schedule("late", 0.05)
+    reaper.schedule("early", 0.01)
+    assert reaper.pending == 2
+
+    await wait_for_reaps(reap, 2)
+
+    assert [call.args[0] for call in reap.await_args_list] == ["early", "late"]
+    assert reaper.pending == 0
+    assert reaper.stats()["reaped"] == 2
+    await reaper.close()
+
+
+async def test_cancelled_session_is_not_reaped():
+    reap = AsyncMock()
+    reaper = SessionReaper(reap=reap)
+
+    reaper.schedule("restored", 0.01)
+    reaper.schedule("expired", 0.02)
+    assert reaper.cancel("restored")
+    assert not reaper.cancel("unknown")
+
+    await wait_for_reaps(reap, 1)
+    await asyncio.sleep(0.02)
+
+    reap.assert_awaited_once_with("expired")
+    assert reaper.stats()["cancelled"] == 1
+    await reaper.close()
+
+
+async def test_rescheduling_replaces_previous_expiry():
+    reap = AsyncMock()
+    reaper = SessionReaper(reap=reap)
+
+    reaper.schedule("session", 0.01)
+    reaper.schedule("session", 10)
+    await asyncio.sleep(0.05)
+
+    reap.assert_not_awaited()
+    assert reaper.pending == 1
+    await reaper.close()
+
+
+async def test_sweeps_in_bounded_batches():
+    batches = []
+    reaper = SessionReaper(reap=AsyncMock(), batch_size=2)
+    sweep = reaper._sweep
+
+    async def record_sweep(session_ids):
+        batches.append(list(session_ids))
+        await sweep(session_ids)
+
+    reaper._sweep = record_sweep  # type: ignore[method-assign]
+    for i in range(5):
+        reaper.schedule(f"session_{i}", 0)
+
+    await wait_for_reaps(reaper.reap, 5)  # type: ignore[arg-type]
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    await reaper.close()
+
+
+async def test_failed_reap_is_counted_and_worker_keeps_running():
+    reap = AsyncMock(side_effect=[Exception("boom"), None])
+    reaper = SessionReaper(reap=reap)
+
+    reaper.schedule("failing", 0)
+    reaper.schedule("ok", 0.01)
+    await wait_for_reaps(reap, 2)
+
+    assert reaper.stats()["failed"] == 1
+    assert reaper.stats()["reaped"] == 1
+    await reaper.close()
+
+
+async def test_compacts_heap_of_cancelled_expiries():
+    count = 500
+    reaper = SessionReaper(reap=AsyncMock(), batch_size=10)
+
+    for i in range(count):
+        reaper.schedule(f"session_{i}", 60)
+    for i in range(count):
+        reaper.cancel(f"session_{i}")
+
+    assert reaper.pending == 0
+    assert len(reaper._heap) <= reaper.batch_size * 2
+    await reaper.close()
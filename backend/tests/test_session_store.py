@@ -0,0 +1,200 @@
+from unittest.mock import Mock
+
+import pytest
+
+from chainlit.session_store import (
+    InMemorySessionStore,
+    SessionMemory,
+    SQLiteSessionStore,
+    approximate_size,
+)
+
+
+@pytest.fixture
+def memory(test_config):
+    memory = SessionMemory()
+    memory.max_bytes = 0
+    return memory
+
+
+def test_approximate_size_counts_nested_values():
+    small = approximate_size({"key": "value"})
+    large = approximate_size({"key": "value" * 1000})
+
+    assert small > 0
+    assert large > small + 4000
+
+
+def test_approximate_size_handles_cycles():
+    value: dict = {}
+    value["self"] = value
+
+    assert approximate_size(value) > 0
+
+
+def test_store_accounts_bytes(memory: SessionMemory):
+    store: InMemorySessionStore[dict] = InMemorySessionStore("test", memory=memory)
+
+    store["a"] = {"data": "x" * 1000}
+    assert store.bytes > 1000
+    assert store.stats() == {"count": 1, "bytes": store.bytes}
+
+    del store["a"]
+    assert store.bytes == 0
+    assert "a" not in store
+
+
+def test_store_grow_and_resize(memory: SessionMemory):
+    store: InMemorySessionStore[list] = InMemorySessionStore("test", memory=memory)
+    store["a"] = []
+    initial = store.bytes
+
+    store.grow("a", 100)
+    assert store.bytes == initial + 100
+
+    store["a"].append("x" * 1000)
+    store.resize("a")
+    assert store.bytes > initial + 1000
+
+
+def test_evicts_least_recently_used_disconnected_sessions(memory: SessionMemory):
+    store: InMemorySessionStore[str] = InMemorySessionStore("test", memory=memory)
+    store["old"] = "x" * 1000
+    store["new"] = "y" * 1000
+    memory.max_bytes = store.bytes - 1
+
+    store["newest"] = "z"
+
+    assert "old" not in store
+    assert "new" in store
+    assert "newest" in store
+    assert memory.evicted == 1
+
+
+def test_connected_sessions_are_not_evicted(memory: SessionMemory):
+    store: InMemorySessionStore[str] = InMemorySessionStore("test", memory=memory)
+    memory.connect("connected")
+    store["connected"] = "x" * 1000
+    store["disconnected"] = "y" * 1000
+    memory.max_bytes = 1
+
+    store["other"] = "z"
+
+    assert "connected" in store
+    assert "disconnected" not in store
+
+    memory.disconnect("connected")
+    store["other"] = "z"
+    assert "connected" not in store
+
+
+def test_eviction_applies_to_every_store(memory: SessionMemory):
+    on_evict = Mock()
+    first: InMemorySessionStore[str] = InMemorySessionStore(
+        "first", memory=memory, on_evict=on_evict
+    )
+    second: InMemorySessionStore[str] = InMemorySessionStore("second", memory=memory)
+    first["session"] = "x" * 1000
+    second["session"] = "y" * 1000
+
+    memory.evict("session")
+
+    assert "session" not in first
+    assert "session" not in second
+    on_evict.assert_called_once_with("session", "x" * 1000)
+    assert memory.stats()["stores"] == {
+        "first": {"count": 0, "bytes": 0},
+        "second": {"count": 0, "bytes": 0},
+    }
+
+
+def test_evicted_values_spill_to_sqlite(memory: SessionMemory, test_config, tmp_path):
+    test_config.project.session_spill_path = str(tmp_path / "sessions.db")
+    store: InMemorySessionStore[dict] = InMemorySessionStore("test", memory=memory)
+    store["session"] = {"key": "value"}
+
+    memory.evict("session")
+    assert store.stats()["count"] == 0
+    assert store.copy() == {"session": {"key": "value"}}
+    assert list(store) == ["session"]
+
+    # Accessing the session loads it back in memory
+    assert store["session"] == {"key": "value"}
+    assert store.stats()["count"] == 1
+    spill = memory.get_spill("test")
+    assert spill is not None
+    spill.flush()
+    assert "session" not in SQLiteSessionStore(str(tmp_path / "sessions.db"), "test")
+
+
+def test_deleted_sessions_are_removed_from_the_spill(
+    memory: SessionMemory, test_config, tmp_path
+):
+    test_config.project.session_spill_path = str(tmp_path / "sessions.db")
+    first: InMemorySessionStore[dict] = InMemorySessionStore("first", memory=memory)
+    second: InMemorySessionStore[dict] = InMemorySessionStore("second", memory=memory)
+    first["session"] = {"key": "value"}
+    second["session"] = {"key": "value"}
+    memory.evict("session")
+    second["session"] = {"key": "other"}
+
+    memory.delete("session")
+
+    assert "session" not in first
+    assert "session" not in second
+    for name in ("first", "second"):
+        spill = memory.get_spill(name)
+        assert spill is not None
+        spill.flush()
+        assert "session" not in SQLiteSessionStore(str(tmp_path / "sessions.db"), name)
+    assert memory.stats()["sessions"] == 0
+
+
+def test_values_that_cannot_be_pickled_stay_in_memory(
+    memory: SessionMemory, test_config, tmp_path
+):
+    test_config.project.session_spill_path = str(tmp_path / "sessions.db")
+    store: InMemorySessionStore[dict] = InMemorySessionStore("test", memory=memory)
+    store["session"] = {"callback": lambda: None}
+
+    assert memory.evict("session") == 0
+
+    assert store.stats()["count"] == 1
+    assert "session" not in SQLiteSessionStore(str(tmp_path / "sessions.db"), "test")
+
+
+def test_sqlite_store(tmp_path):
+    store: SQLiteSessionStore[list] = SQLiteSessionStore(
+        str(tmp_path / "sessions.db"), "test"
+    )
+
+    store["a"] = [1, 2]
+    store["b"] = [3]
+
+    assert store["a"] == [1, 2]
+    assert len(store) == 2
+    assert store.stats()["count"] == 2
+
+    del store["a"]
+    assert "a" not in store
+    with pytest.raises(KeyError):
+        store["a"]
+
+    store.flush()
+    assert list(SQLiteSessionStore(str(tmp_path / "sessions.db"), "test")) == ["b"]
+    store.close()
+
+
+def test_sqlite_store_misses_do_not_query_the_database(tmp_path):
+    store: SQLiteSessionStore[list] = SQLiteSessionStore(
+        str(tmp_path / "sessions.db"), "test"
+    )
+    store._fetch = Mock(side_effect=AssertionError("Unexpected query"))  # type: ignore[method-assign]
+
+    assert "missing" not in store
+    with pytest.raises(KeyError):
+        store["missing"]
+
+    # Values waiting to be written are served from memory
+    store["a"] = [1]
+    assert store["a"] == [1]
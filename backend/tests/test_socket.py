@@ -6,6 +6,7 @@ import pytest
 from chainlit.session import WebsocketSession
 from chainlit.socket import (
     _authenticate_connection,
+    _get_resume_cursor,
     _get_token,
     _get_token_from_cookie,
     clean_session,
@@ -135,6 +136,23 @@ class TestRestoreExistingSession:
             assert mock_session.emit_call == emit_call_fn
             assert mock_session.environ == environ
 
+    def test_restore_existing_session_cancels_expiry(self):
+        """Test that restoring a session cancels its scheduled expiry."""
+        mock_session = Mock(spec=WebsocketSession)
+        mock_session.user = None
+
+        with (
+            patch.object(WebsocketSession, "get_by_id") as mock_get,
+            patch("chainlit.socket.session_reaper") as mock_reaper,
+        ):
+            mock_get.return_value = mock_session
+
+            restore_existing_session(
+                "new_sid", "session_123", Mock(), Mock(), {"HTTP_COOKIE": "t=t"}
+            )
+
+            mock_reaper.cancel.assert_called_once_with("session_123")
+
     def test_restore_existing_session_with_matching_user(self):
         """Test restoring a session for its authenticated owner."""
         mock_session = Mock(spec=WebsocketSession)
@@ -630,3 +648,130 @@ class TestConnectionSuccessfulIdempotency:
             await connection_successful("sid-1")
 
         assert on_chat_start.call_count == 1
+
+
+class TestResumeThreadDelta:
+    """A client reconnecting with a resume cursor is only sent the steps it missed."""
+
+    cursor = {"stepId": "step_2", "createdAt": "2024-01-01T00:00:02Z"}
+    thread = {
+        "id": "thread_123",
+        "userIdentifier": "test_user_identifier",
+        "metadata": {},
+        "steps": [
+            {
+                "id": "step_1",
+                "type": "user_message",
+                "output": "Hello",
+                "createdAt": "2024-01-01T00:00:01Z",
+            },
+            {
+                "id": "step_2",
+                "type": "assistant_message",
+                "output": "Hi",
+                "createdAt": "2024-01-01T00:00:02Z",
+            },
+            {
+                "id": "step_3",
+                "type": "user_message",
+                "output": "Bye",
+                "createdAt": "2024-01-01T00:00:03Z",
+            },
+        ],
+        "elements": [
+            {"id": "element_1", "forId": "step_1"},
+            {"id": "element_3", "forId": "step_3"},
+        ],
+    }
+
+    def _connect(self, session, data_layer):
+        mock_context = Mock()
+        mock_context.session = session
+        mock_context.emitter = AsyncMock()
+
+        mock_config = Mock()
+        mock_config.code.on_chat_resume = AsyncMock()
+
+        return (
+            mock_context,
+            mock_config,
+            patch.multiple(
+                "chainlit.socket",
+                init_ws_context=Mock(return_value=mock_context),
+                config=mock_config,
+                get_data_layer=Mock(return_value=data_layer),
+                chat_context=Mock(),
+                Message=Mock(),
+            ),
+        )
+
+    def _session(self, mock_session_factory, restored: bool):
+        session = mock_session_factory()
+        session.restored = restored
+        session.thread_id_to_resume = "thread_123"
+        session.resume_cursor = self.cursor
+        return session
+
+    def test_get_resume_cursor(self):
+        assert _get_resume_cursor({"resumeCursor": self.cursor}) == self.cursor
+        assert _get_resume_cursor({"resumeCursor": {"stepId": 1}}) is None
+        assert _get_resume_cursor({}) is None
+
+    @pytest.mark.asyncio
+    async def test_restored_session_is_sent_the_delta(self, mock_session_factory):
+        delta = {"id": "thread_123", "steps": self.thread["steps"][1:], "elements": []}
+        data_layer = AsyncMock()
+        data_layer.get_thread_steps_since.return_value = delta
+        session = self._session(mock_session_factory, restored=True)
+        context, config, patches = self._connect(session, data_layer)
+
+        with patches:
+            await connection_successful("sid-1")
+
+        data_layer.get_thread_steps_since.assert_awaited_once_with(
+            "thread_123", self.cursor
+        )
+        data_layer.get_thread.assert_not_awaited()
+        config.code.on_chat_resume.assert_not_awaited()
+        context.emitter.resume_thread_delta.assert_awaited_once_with(delta)
+        context.emitter.resume_thread.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_unsupported_delta_falls_back_to_full_thread(
+        self, mock_session_factory
+    ):
+        data_layer = AsyncMock()
+        data_layer.get_thread_steps_since.return_value = None
+        data_layer.get_thread.return_value = {**self.thread, "steps": []}
+        session = self._session(mock_session_factory, restored=True)
+        context, config, patches = self._connect(session, data_layer)
+
+        with patches:
+            await connection_successful("sid-1")
+
+        config.code.on_chat_resume.assert_awaited_once()
+        context.emitter.resume_thread.assert_awaited_once()
+        context.emitter.resume_thread_delta.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_new_session_resumes_fully_but_sends_the_delta(
+        self, mock_session_factory
+    ):
+        data_layer = AsyncMock()
+        data_layer.get_thread.return_value = self.thread
+        session = self._session(mock_session_factory, restored=False)
+        context, config, patches = self._connect(session, data_layer)
+
+        with patches:
+            await connection_successful("sid-1")
+
+        data_layer.get_thread_steps_since.assert_not_awaited()
+        config.code.on_chat_resume.assert_awaited_once_with(self.thread)
+        context.emitter.resume_thread_delta.assert_awaited_once_with(
+            {
+                "id": "thread_123",
+                "steps": self.thread["steps"][1:],
+                "elements": [{"id": "element_3", "forId": "step_3"}],
+            }
+        )
+        context.emitter.resume_thread.assert_not_awaited()
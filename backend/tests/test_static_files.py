@@ -0,0 +1,156 @@
+import gzip
+import importlib.util
+import os
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+import chainlit.precompress as precompress
+from chainlit.precompress import get_precompressed, precompress_directory
+from chainlit.server import app
+from chainlit.static_files import (
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    accepted_encodings,
+    is_content_hashed,
+)
+
+BUNDLE = b"console.log('chainlit');\n" * 200
+
+
+@pytest.fixture
+def build_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "assets" / "index-D5UwcQeN.js").write_bytes(BUNDLE)
+    (tmp_path / "assets" / "logo.svg").write_bytes(b"<svg/>")
+    monkeypatch.setattr("chainlit.server.build_dir", str(tmp_path))
+    monkeypatch.setattr(precompress, "brotli", None)
+    monkeypatch.setattr(precompress, "FALLBACK_DIR", tmp_path / "fallback")
+    return tmp_path
+
+
+@pytest.fixture
+def test_client():
+    return TestClient(app)
+
+
+@pytest.mark.parametrize(
+    ("filename", "hashed"),
+    [
+        ("index-D5UwcQeN.js", True),
+        ("index-D5UwcQeN.css", True),
+        ("vendor-a1b2c3d4.js", True),
+        ("vendor.a1b2c3d4.js", False),
+        ("markdown-renderer.js", False),
+        ("Markdown-Renderer.js", False),
+        ("react-DOMClient.js", False),
+        ("index.js", False),
+        ("favicon.svg", False),
+    ],
+)
+def test_is_content_hashed(filename: str, hashed: bool):
+    assert is_content_hashed(Path(filename)) is hashed
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip, deflate, br") == {"gzip", "deflate", "br"}
+    assert accepted_encodings("br;q=0, gzip;q=0.8") == {"gzip"}
+    assert accepted_encodings("*") >= {"br", "gzip"}
+    assert accepted_encodings(None) == set()
+
+
+def test_hashed_asset_is_served_precompressed_and_immutable(
+    test_client: TestClient, build_dir: Path
+):
+    response = test_client.get(
+        "/assets/index-D5UwcQeN.js", headers={"Accept-Encoding": "br, gzip"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.headers["content-type"].startswith(
+        ("application/javascript", "text/javascript")
+    )
+    assert response.content == BUNDLE
+
+    # Compressed on first use, next to the asset
+    side_file = build_dir / "assets" / "index-D5UwcQeN.js.gz"
+    assert gzip.decompress(side_file.read_bytes()) == BUNDLE
+    assert int(response.headers["content-length"]) == side_file.stat().st_size
+
+
+def test_asset_is_not_compressed_when_not_accepted(
+    test_client: TestClient, build_dir: Path
+):
+    response = test_client.get(
+        "/assets/index-D5UwcQeN.js", headers={"Accept-Encoding": "identity"}
+    )
+
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.content == BUNDLE
+
+
+def test_small_unhashed_asset_is_revalidated(test_client: TestClient, build_dir: Path):
+    response = test_client.get("/assets/logo.svg", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+    # Neither precompressed nor compressed by the gzip middleware
+    assert "content-encoding" not in response.headers
+    assert not (build_dir / "assets" / "logo.svg.gz").exists()
+
+
+def test_precompressed_falls_back_to_temporary_directory(
+    build_dir: Path, monkeypatch: pytest.MonkeyPatch
+):
+    asset = build_dir / "assets" / "index-D5UwcQeN.js"
+    write_atomically = precompress._write_atomically
+
+    def read_only_build_dir(path: Path, data: bytes):
+        if path.parent == asset.parent:
+            raise PermissionError("Read-only file system")
+        write_atomically(path, data)
+
+    monkeypatch.setattr(precompress, "_write_atomically", read_only_build_dir)
+
+    side_file = get_precompressed(asset, "gzip", ".gz")
+
+    assert side_file is not None
+    assert side_file.is_relative_to(build_dir / "fallback")
+    assert gzip.decompress(side_file.read_bytes()) == BUNDLE
+    # Reused as long as the asset does not change
+    assert get_precompressed(asset, "gzip", ".gz") == side_file
+
+
+def test_stale_side_file_is_replaced(build_dir: Path):
+    asset = build_dir / "assets" / "index-D5UwcQeN.js"
+    side_file = build_dir / "assets" / "index-D5UwcQeN.js.gz"
+    side_file.write_bytes(gzip.compress(b"stale"))
+    stat = asset.stat()
+    os.utime(side_file, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10**9))
+
+    assert get_precompressed(asset, "gzip", ".gz") == side_file
+    assert gzip.decompress(side_file.read_bytes()) == BUNDLE
+
+
+def test_precompress_directory(build_dir: Path):
+    assert precompress_directory(build_dir) == 1
+    assert (build_dir / "assets" / "index-D5UwcQeN.js.gz").exists()
+
+
+def test_precompress_loads_without_chainlit(build_dir: Path):
+    """The build hook loads the module from its file, without importing chainlit."""
+    spec = importlib.util.spec_from_file_location(
+        "chainlit_precompress", precompress.__file__
+    )
+    assert spec is not None
+    assert spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    assert module.precompress_directory(build_dir) >= 1
+    assert (build_dir / "assets" / "index-D5UwcQeN.js.gz").exists()
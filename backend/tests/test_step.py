@@ -236,6 +236,24 @@ class TestStepClass:
 
             assert test_step.input == "Input text"
 
+    async def test_step_stream_token_buffers_until_read(self, mock_chainlit_context):
+        """Test that streamed tokens are only joined when the output is read."""
+        async with mock_chainlit_context:
+            test_step = Step(name="test_step")
+            test_step.output = "Hello"
+            test_step.streaming = True
+
+            await test_step.stream_token(" ")
+            await test_step.stream_token("World")
+
+            assert test_step._output == "Hello"
+            assert test_step.to_dict()["output"] == "Hello World"
+            assert test_step._output_chunks == []
+
+            test_step.output = "Reset"
+            await test_step.stream_token("!")
+            assert test_step.output == "Reset!"
+
     async def test_step_stream_token_sequence(self, mock_chainlit_context):
         """Test streaming tokens with is_sequence flag."""
         async with mock_chainlit_context:
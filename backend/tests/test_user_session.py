@@ -12,3 +12,28 @@ async def test_user_session_set_get(mock_chainlit_context, user_session):
         # Test getting session-related values
         assert user_session.get("id") == context.session.id
         assert user_session.get("env") == context.session.user_env
+
+
+async def test_user_session_set_accounts_size_delta(
+    mock_chainlit_context, user_session, monkeypatch
+):
+    from chainlit.session_store import approximate_size
+    from chainlit.user_session import user_sessions
+
+    async with mock_chainlit_context as context:
+        user_session.set("small", "x")
+        # The rest of the session is not measured again on every set
+        monkeypatch.setattr(user_sessions, "resize", None)
+        before = user_sessions.bytes
+
+        user_session.set("big", "x" * 10_000)
+        assert user_sessions.bytes - before == approximate_size(
+            "big"
+        ) + approximate_size("x" * 10_000)
+
+        user_session.set("big", "y")
+        assert user_sessions.bytes - before == approximate_size(
+            "big"
+        ) + approximate_size("y")
+
+        user_sessions.pop(context.session.id, None)
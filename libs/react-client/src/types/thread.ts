@@ -11,3 +11,9 @@ export interface IThread {
   steps: IStep[];
   elements?: IElement[];
 }
+
+export interface IThreadDelta {
+  id: string;
+  steps: IStep[];
+  elements: IElement[];
+}
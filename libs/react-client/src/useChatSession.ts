@@ -1,6 +1,7 @@
 import { debounce } from 'lodash';
 import { useCallback, useContext, useEffect } from 'react';
 import {
+  useRecoilCallback,
   useRecoilState,
   useRecoilValue,
   useResetRecoilState,
@@ -44,11 +45,13 @@ import {
   IMode,
   IStep,
   ITasklistElement,
-  IThread
+  IThread,
+  IThreadDelta
 } from 'src/types';
 import {
   addMessage,
   deleteMessageById,
+  getResumeCursor,
   updateMessageById,
   updateMessageContentById
 } from 'src/utils/message';
@@ -98,6 +101,13 @@ const useChatSession = () => {
     }
   }, [currentThreadId]);
 
+  const getMessagesResumeCursor = useRecoilCallback(
+    ({ snapshot }) =>
+      () =>
+        getResumeCursor(snapshot.getLoadable(messagesState).getValue()),
+    []
+  );
+
   const _connect = useCallback(
     async ({
       transports,
@@ -139,6 +149,11 @@ const useChatSession = () => {
         };
       });
 
+      // Tell the server the last step held, to only be sent the steps missed
+      socket.io.on('reconnect_attempt', () => {
+        socket.auth['resumeCursor'] = getMessagesResumeCursor();
+      });
+
       socket.on('connect', () => {
         socket.emit('connection_successful');
         setSession((s) => ({ ...s!, error: false }));
@@ -290,6 +305,36 @@ const useChatSession = () => {
         );
       });
 
+      socket.on('resume_thread_delta', (delta: IThreadDelta) => {
+        setMessages((oldMessages) => {
+          let messages = oldMessages;
+          for (const step of delta.steps) {
+            messages = addMessage(messages, step);
+          }
+          return messages;
+        });
+        const upsert = <T extends IElement>(old: T[], elements: T[]) => {
+          const ids = new Set(elements.map((e) => e.id));
+          return [...old.filter((e) => !ids.has(e.id)), ...elements];
+        };
+        setTasklists((old) =>
+          upsert(
+            old,
+            (delta.elements as ITasklistElement[]).filter(
+              (e) => e.type === 'tasklist'
+            )
+          )
+        );
+        setElements((old) =>
+          upsert(
+            old,
+            (delta.elements as IMessageElement[]).filter(
+              (e) => ['avatar', 'tasklist'].indexOf(e.type) === -1
+            )
+          )
+        );
+      });
+
       socket.on('resume_thread_error', (error?: string) => {
         setThreadResumeError(error);
       });
@@ -233,10 +233,36 @@ const updateMessageContentById = (
   return hasChanges ? nextMessages : messages;
 };
 
+// Last step held by the client, sent on reconnection so that the server only
+// sends the steps created since
+const getResumeCursor = (
+  messages: IStep[]
+): { stepId: string; createdAt: string } | null => {
+  let last: IStep | undefined;
+  let lastTime = -Infinity;
+
+  const visit = (steps: IStep[]) => {
+    for (const step of steps) {
+      const time = new Date(step.createdAt).getTime();
+      if (time >= lastTime) {
+        last = step;
+        lastTime = time;
+      }
+      if (step.steps) {
+        visit(step.steps);
+      }
+    }
+  };
+  visit(messages);
+
+  return last ? { stepId: last.id, createdAt: String(last.createdAt) } : null;
+};
+
 export {
   addMessageToParent,
   addMessage,
   deleteMessageById,
+  getResumeCursor,
   hasMessageById,
   isLastMessage,
   nestMessages,